@@ -1,65 +1,543 @@
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import os
-import json
 from datetime import datetime
 import uuid
 from werkzeug.utils import secure_filename
-from PIL import Image
-import zipfile
-import io
+from werkzeug.security import safe_join
+import atexit
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 
 # Se mantienen las importaciones de tus módulos
-from models.classifier import ImageClassifier
+from models.image_store import ImageStore, FIELDS, DEFAULT_PROJECT
+from models.image_record import ImageRecord
 from models.page_numbering import PageNumbering
-from utils.image_processing import ImageProcessor
+from utils.processing_pool import ProcessingPool
+from utils.job_manager import JobManager
+from utils.derivative_cache import DerivativeCache
+from utils.upload_sessions import UploadSessionManager
+from utils.event_bus import EventBus
+from utils.hot_folder import HotFolderScanner
+from utils.metrics import MetricsRegistry
+from utils.zip_export import IMAGE_FORMATS, plan_export, convert_entries, write_zip, iter_zip
+from utils.ocr_probe import probe_ocr
+from utils.classification_cache import ClassificationCache
 from config import Config
 
+class RecordJSONProvider(DefaultJSONProvider):
+    """Serializa los ImageRecord con la misma forma que un dict de registro."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, ImageRecord):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
+app.json = RecordJSONProvider(app)
 app.config.from_object(Config)
 CORS(app)
 
 # --- Componentes de la aplicación ---
+# El clasificador y el procesador de imágenes (cv2, numpy, Tesseract) se cargan en
+# los procesos del pool con el primer lote o con warm_up(), no al importar la app
 try:
-    classifier = ImageClassifier()
-    page_numberer = PageNumbering()
-    image_processor = ImageProcessor()
+    image_store = ImageStore(app.config['DATABASE_PATH'])
+    # Procesos OCR persistentes del clasificador cuando analiza en este proceso
+    # (arrancan con la primera página que necesita OCR). Con el pool, cada proceso
+    # del pool tiene su propio motor OCR y el servicio no se crea.
+    ocr_service = None
+    if app.config['PROCESSING_WORKERS'] == 0:
+        from utils.ocr_service import OCRService
+
+        ocr_service = OCRService.from_config(app.config['OCR_CONFIG'], app.config['OCR_WORKERS'])
+    processing_pool = ProcessingPool(
+        app.config['PROCESSING_WORKERS'],
+        app.config['ANALYSIS_MAX_DIMENSION'],
+        app.config['CLASSIFICATION_CACHE_PATH'],
+        app.config['CLASSIFICATION_CACHE_MAX_ENTRIES'],
+        {
+            'calibration_grid': app.config['CALIBRATION_GRID'],
+            'text_gate': app.config['TEXT_GATE'],
+            'ocr_config': app.config['OCR_CONFIG'],
+            'ocr_probe_path': app.config['OCR_PROBE_CACHE_PATH']
+        },
+        app.config['METRICS_ENABLED'],
+        ocr_service
+    )
+    job_manager = JobManager(app.config['JOB_WORKERS'], app.config['JOB_HISTORY_LIMIT'])
+    derivative_cache = DerivativeCache(
+        app.config['DERIVATIVE_CACHE_DIR'],
+        app.config['DERIVATIVE_CACHE_MAX_BYTES'],
+        app.config['THUMBNAIL_SIZE'],
+        app.config['PREVIEW_WIDTHS']
+    )
+    # Eventos de progreso para GET /api/events, serializados una vez con el proveedor JSON de la app
+    event_bus = EventBus(app.config['EVENTS_BUFFER_SIZE'], app.json.dumps)
+    upload_sessions = UploadSessionManager(
+        app.config['UPLOAD_FOLDER'],
+        app.config['CHUNKED_UPLOAD_MAX_SIZE'],
+        app.config['CHUNKED_UPLOAD_TTL']
+    )
+    # Carpeta vigilada (None si HOT_FOLDER está vacío)
+    hot_folder = HotFolderScanner(
+        app.config['HOT_FOLDER'],
+        app.config['HOT_FOLDER_STATE_PATH'],
+        app.config['HOT_FOLDER_SETTLE_SECONDS'],
+        app.config['ALLOWED_EXTENSIONS']
+    ) if app.config['HOT_FOLDER'] else None
 except Exception as e:
     # Si los componentes fallan al iniciar, el servidor no debería arrancar.
     raise RuntimeError(f"Failed to initialize application components: {e}")
 
-# --- Base de Datos en Memoria (para desarrollo) ---
-# En un entorno de producción, esto debería ser reemplazado por una base de datos real
-# como SQLite, PostgreSQL, etc.
-images_db = {}
+# atexit ejecuta en orden inverso: el servicio OCR se cierra después del pool que lo usa
+if ocr_service is not None:
+    atexit.register(ocr_service.close)
+atexit.register(processing_pool.shutdown)
+atexit.register(job_manager.shutdown)
+
+# --- Métricas (GET /api/metrics) ---
+# Las etapas del análisis se miden en los procesos del pool y llegan con cada
+# resultado (ver analyze_image); aquí se registran junto a las rutas y la exportación
+metrics = MetricsRegistry(app.config['METRICS_ENABLED'])
+stage_seconds = metrics.histogram(
+    'bookclassifier_stage_seconds',
+    'Duración de cada etapa: read, info, decode, blank, color, text (incluye ocr), ocr, calibration, numbering, '
+    'zip, scan (exploración de la carpeta vigilada)',
+    ['stage']
+)
+request_seconds = metrics.histogram(
+    'bookclassifier_http_request_seconds',
+    'Duración de las peticiones HTTP hasta generar la respuesta (sin el envío de respuestas en streaming)',
+    ['method', 'route', 'status']
+)
+images_total = metrics.counter('bookclassifier_images_total', 'Imágenes analizadas por resultado', ['result'])
+cache_lookups_total = metrics.counter(
+    'bookclassifier_classification_cache_total', 'Consultas a la caché de clasificación (hit, miss)', ['result']
+)
+ocr_total = metrics.counter(
+    'bookclassifier_ocr_total',
+    'Páginas analizadas con OCR (run), omitido por la estimación de texto (skipped) o sin Tesseract (unavailable)',
+    ['result']
+)
+export_files_total = metrics.counter('bookclassifier_export_files_total', 'Archivos escritos en exportaciones ZIP')
+export_bytes_total = metrics.counter('bookclassifier_export_bytes_total', 'Bytes de los ZIP exportados')
+
+
+def warm_up():
+    """
+    Cargar los componentes pesados antes de la primera petición
+
+    Returns:
+        dict: Procesos inicializados, capacidades OCR y tiempo empleado
+    """
+    start = time.perf_counter()
+    ocr = probe_ocr(app.config['OCR_PROBE_CACHE_PATH'])
+    workers = processing_pool.warm_up()
+    with numbering_lock:
+        get_page_numberer(DEFAULT_PROJECT)
+    return {'workers': workers, 'ocr': ocr, 'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+# Hashes de contenido de archivos servidos sin registro (exportaciones)
+file_hashes = {}
+file_hashes_lock = threading.Lock()
+
+# Exportaciones en modo streaming pendientes de descarga: token -> {filename, entries, expires_at}
+export_streams = {}
+export_streams_lock = threading.Lock()
+
+# Campos que se pueden modificar desde la API
+UPDATEABLE_FIELDS = ['type', 'page_number', 'number_type', 'number_exception', 'phantom_number', 'validated']
+
+# Campos que escribe la numeración automática
+NUMBERING_FIELDS = ['page_number', 'number_type', 'phantom_number']
+
+# Numeración de cada proyecto: project_id -> PageNumbering con el índice de sus
+# páginas. Cada pasada de numeración recorre solo las páginas de un libro.
+page_numberers = {}
+
+# Protege los índices de numeración compartidos por los trabajos y las rutas
+numbering_lock = threading.Lock()
 
 # --- Funciones de Ayuda ---
+def collection_etag(version):
+    """ETag de la colección de imágenes en una versión."""
+    return f'v{version}'
+
+def with_collection_etag(response, version):
+    """Añade a una respuesta el ETag de la versión de la colección."""
+    response.set_etag(collection_etag(version))
+    return response
+
 def allowed_file(filename):
     """Verifica si la extensión del archivo está permitida."""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
-def generate_new_filename(image):
-    """Genera un nuevo nombre de archivo basado en metadatos (refactorizado para claridad)."""
-    base_name, extension = os.path.splitext(image['original_filename'])
-    new_name = f"{base_name} {image.get('type', 'unknown')}"
-    
-    if image.get('page_number') is not None:
-        page_num_str = str(image['page_number'])
-        if image.get('phantom_number', False):
-            page_num_str = f"[{page_num_str}]"
-        if image.get('number_exception'):
-            page_num_str = f"{page_num_str} {image['number_exception']}"
-        new_name += f" p {page_num_str}"
-        
-    return f"{new_name}{extension}"
+def project_upload_folder(project_id):
+    """Carpeta de los archivos de un proyecto (el proyecto por defecto usa UPLOAD_FOLDER)."""
+    if project_id == DEFAULT_PROJECT:
+        return str(app.config['UPLOAD_FOLDER'])
+    return os.path.join(app.config['UPLOAD_FOLDER'], 'projects', project_id)
+
+def unknown_project(project_id):
+    """Respuesta 404 para rutas de un proyecto que no existe, o None si existe."""
+    if project_id != DEFAULT_PROJECT and not image_store.has_project(project_id):
+        return jsonify({'error': f'Proyecto no encontrado: {project_id}'}), 404
+    return None
+
+def build_image_record(image_id, filename, filepath, analysis, project_id=DEFAULT_PROJECT):
+    """Construye el registro de una imagen a partir de su análisis."""
+    classification = analysis['classification']
+    return ImageRecord({
+        'id': image_id,
+        'project_id': project_id,
+        'original_filename': filename,
+        'filepath': filepath,
+        'type': classification['type'],
+        'confidence': classification['confidence'],
+        'validated': False,
+        'page_number': None,
+        'number_type': 'arabic',
+        'number_exception': '',
+        'phantom_number': False,
+        'created_at': datetime.now().isoformat(),
+        'content_hash': analysis['content_hash'],
+        **analysis['image_info']
+    })
+
+def get_page_numberer(project_id):
+    """Devuelve el numerador de un proyecto con su índice de páginas cargado (requiere numbering_lock)."""
+    numberer = page_numberers.get(project_id)
+    if numberer is None:
+        numberer = page_numberers[project_id] = PageNumbering()
+    if numberer.index is None:
+        numberer.load_pages(image_store.list(project_id=project_id))
+    return numberer
+
+def update_numbering_index(images):
+    """Sustituye en el índice de numeración de su proyecto las imágenes modificadas (requiere numbering_lock)."""
+    by_project = {}
+    for image in images:
+        by_project.setdefault(image['project_id'], []).append(image.copy())
+    for project_id, project_images in by_project.items():
+        # Un proyecto sin índice cargado lo leerá actualizado de la base de datos
+        if project_id in page_numberers:
+            page_numberers[project_id].update_pages(project_images)
+
+def analysis_ocr_result(analysis):
+    """Uso del OCR en un análisis: 'run', 'skipped', 'unavailable' o None si no se analizó el texto."""
+    classification = analysis['classification']
+    if classification.get('ocr_unavailable'):
+        return 'unavailable'
+    if 'ocr_skipped' in classification:
+        return 'skipped' if classification['ocr_skipped'] else 'run'
+    return None
+
+def record_analysis(analysis):
+    """Registra en las métricas los tiempos por etapa, la caché y el OCR de un análisis."""
+    images_total.inc(result='classified')
+    if analysis['cached']:
+        cache_lookups_total.inc(result='hit')
+        return
+    if processing_pool.cache_path:
+        cache_lookups_total.inc(result='miss')
+    for stage, seconds in analysis.get('timings', {}).items():
+        stage_seconds.observe(seconds, stage=stage)
+    ocr_result = analysis_ocr_result(analysis)
+    if ocr_result is not None:
+        ocr_total.inc(result=ocr_result)
+
+def record_export(files, size_bytes, elapsed):
+    """Registra en las métricas una exportación ZIP completada."""
+    export_files_total.inc(files)
+    export_bytes_total.inc(size_bytes)
+    stage_seconds.observe(elapsed, stage='zip')
+
+def publish_updates(event_type, images, version):
+    """Publica los registros modificados agrupados por proyecto."""
+    by_project = {}
+    for image in images:
+        by_project.setdefault(image['project_id'], []).append(image)
+    for project_id, project_images in by_project.items():
+        event_bus.publish(event_type, {'version': version, 'images': project_images}, project_id)
+
+def publish_job_event(job):
+    """Publica el estado final de un trabajo (sin sus resultados, que ya se enviaron imagen a imagen)."""
+    summary = {key: value for key, value in job.items() if key not in ('results', 'failures')}
+    summary['failures'] = len(job['failures'])
+    event_bus.publish('job', summary)
+
+job_manager.on_finish = publish_job_event
+
+def process_upload_job(job_id, pending, project_id=DEFAULT_PROJECT):
+    """Clasifica y numera en segundo plano las imágenes ya guardadas en disco."""
+    new_records = []
+    versions = []
+
+    def on_result(index, analysis):
+        image_id, filename, filepath, _ = pending[index]
+        if isinstance(analysis, Exception):
+            # Si una imagen falla, se informa del error pero se continúa con las demás.
+            app.logger.error(f"Error procesando el archivo {filename}: {analysis}")
+            job_manager.add_failure(job_id, filename, analysis)
+            images_total.inc(result='failed')
+            event_bus.publish('failed', {
+                'job_id': job_id, 'filename': filename, 'error': str(analysis),
+                'processed': index + 1, 'total': len(pending)
+            }, project_id)
+            return
+
+        record_analysis(analysis)
+        # Estadísticas del trabajo: OCR ejecutado, omitido por la estimación de texto o no disponible
+        ocr_result = analysis_ocr_result(analysis)
+        if ocr_result is not None:
+            job_manager.increment(job_id, f'ocr_{ocr_result}')
+
+        image_record = build_image_record(image_id, filename, filepath, analysis, project_id)
+        image_record['version'] = image_store.add(image_record)
+        versions.append(image_record['version'])
+        new_records.append(image_record)
+        job_manager.add_result(job_id, image_record)
+        event_bus.publish('classified', {
+            'job_id': job_id, 'image': image_record, 'processed': index + 1, 'total': len(pending)
+        }, project_id)
+
+    # Inspeccionar y clasificar el lote en paralelo (resultados en el orden original).
+    # Las cargas por fragmentos ya traen el hash calculado mientras se recibían.
+    processing_pool.analyze_batch(
+        [(filepath, filename, content_hash) for _, filename, filepath, content_hash in pending], on_result
+    )
+
+    try:
+        # Solo se renumera desde la primera posición donde se insertaron páginas
+        with numbering_lock:
+            start = time.perf_counter()
+            changed = get_page_numberer(project_id).add_pages(new_records)
+            versions.append(image_store.save_fields(changed, NUMBERING_FIELDS))
+            stage_seconds.observe(time.perf_counter() - start, stage='numbering')
+        if changed:
+            # Solo los campos de numeración: el resto del registro no cambia
+            event_bus.publish('numbered', {
+                'version': versions[-1],
+                'images': [{field: image[field] for field in ['id', *NUMBERING_FIELDS]} for image in changed]
+            }, project_id)
+    except Exception as e:
+        app.logger.warning(f"La auto-numeración falló después de la carga: {e}")
+
+    # Miniaturas listas antes de que la galería las pida
+    if app.config['DERIVATIVES_EAGER']:
+        for record in new_records:
+            try:
+                derivative_cache.thumbnail(record['id'], record['filepath'])
+            except Exception as e:
+                app.logger.warning(f"No se pudo generar la miniatura de {record['original_filename']}: {e}")
+
+    # Los resultados del trabajo reflejan la numeración final
+    job = job_manager.get(job_id)
+    text_pages = job['stats'].get('ocr_skipped', 0) + job['stats'].get('ocr_run', 0)
+    if text_pages:
+        app.logger.info(
+            f"Trabajo {job_id}: OCR omitido en {job['stats'].get('ocr_skipped', 0)} de {text_pages} páginas analizadas"
+        )
+    if job['stats'].get('ocr_unavailable'):
+        app.logger.warning(
+            f"Trabajo {job_id}: {job['stats']['ocr_unavailable']} páginas analizadas sin OCR (Tesseract no disponible)"
+        )
+    # Versión de la colección tras el trabajo: GET /api/images?since=<versión anterior>
+    # devuelve las páginas nuevas y las renumeradas
+    job_manager.update(
+        job_id,
+        results=image_store.get_many([record['id'] for record in job['results']]),
+        version=max(versions, default=image_store.version())
+    )
+
+def remove_images(image_ids):
+    """Elimina registros, sus archivos y sus derivados, y avisa a los clientes de cada proyecto."""
+    records = image_store.get_many(image_ids)
+    if not records:
+        return
+    version = image_store.delete_many([record['id'] for record in records])
+    by_project = {}
+    for record in records:
+        by_project.setdefault(record['project_id'], []).append(record)
+        if os.path.isfile(record['filepath']):
+            os.remove(record['filepath'])
+    derivative_cache.discard([record['id'] for record in records])
+    for project_id, project_records in by_project.items():
+        ids = [record['id'] for record in project_records]
+        event_bus.publish('deleted', {'version': version, 'ids': ids}, project_id)
+    try:
+        with numbering_lock:
+            for project_id, project_records in by_project.items():
+                numberer = page_numberers.get(project_id)
+                if numberer is not None and numberer.index is not None:
+                    # Se renumera solo desde la primera página eliminada
+                    changed = numberer.remove_pages(project_records)
+                else:
+                    # Sin índice cargado se lee ya sin las páginas eliminadas y se numera entero
+                    changed = get_page_numberer(project_id).add_pages([])
+                if changed:
+                    event_bus.publish('numbered', {
+                        'version': image_store.save_fields(changed, NUMBERING_FIELDS),
+                        'images': [{field: image[field] for field in ['id', *NUMBERING_FIELDS]} for image in changed]
+                    }, project_id)
+    except Exception as e:
+        app.logger.warning(f"La renumeración falló después de eliminar imágenes: {e}")
+
+def hot_folder_project(relpath, projects):
+    """
+    Proyecto de un archivo de la carpeta vigilada: el de su subcarpeta de primer nivel, por nombre.
+
+    Args:
+        relpath (str): Ruta relativa a la carpeta vigilada
+        projects (dict): Nombre -> id de los proyectos, creado una vez por exploración
+            (se añaden los proyectos que se crean aquí)
+    """
+    parts = relpath.split(os.sep)
+    if len(parts) == 1:
+        return DEFAULT_PROJECT
+    if parts[0] not in projects:
+        projects[parts[0]] = image_store.create_project(parts[0])['id']
+    return projects[parts[0]]
+
+def ingest_hot_folder():
+    """
+    Explora la carpeta vigilada y lanza la clasificación de los archivos
+    nuevos o modificados que ya no cambian, en lotes por proyecto.
+
+    Un archivo modificado sustituye a la imagen ingerida antes desde la misma
+    ruta; si solo cambió su fecha (mismo contenido) no se vuelve a clasificar.
+    Los archivos se registran como ingeridos (y se elimina la imagen a la que
+    sustituyen) solo cuando su trabajo los clasifica (ver process_hot_folder_job).
+
+    Returns:
+        list: Ids de los trabajos lanzados
+    """
+    start = time.perf_counter()
+    ready = hot_folder.scan()
+    stage_seconds.observe(time.perf_counter() - start, stage='scan')
+
+    by_project = {}
+    projects = {project['name']: project['id'] for project in image_store.list_projects()} if ready else {}
+    for item in ready:
+        by_project.setdefault(hot_folder_project(item.relpath, projects), []).append(item)
+
+    job_ids = []
+    batch_size = app.config['HOT_FOLDER_BATCH_SIZE']
+    for project_id, items in by_project.items():
+        upload_folder = project_upload_folder(project_id)
+        os.makedirs(upload_folder, exist_ok=True)
+        for offset in range(0, len(items), batch_size):
+            pending, ingested, unchanged = [], [], []
+            for item in items[offset:offset + batch_size]:
+                image_id = str(uuid.uuid4())
+                filename = secure_filename(os.path.basename(item.path))
+                filepath = os.path.join(upload_folder, f"{image_id}_{filename}")
+                try:
+                    content_hash = HotFolderScanner.copy_file(item, filepath)
+                except (OSError, ValueError) as e:
+                    # Se reintenta cuando el archivo cambie (si cambió durante la copia, en la próxima exploración)
+                    app.logger.warning(f"No se pudo ingerir {item.relpath}: {e}")
+                    hot_folder.mark_failed([item])
+                    continue
+                if item.previous and item.previous['content_hash'] == content_hash:
+                    os.remove(filepath)
+                    unchanged.append((item, content_hash, item.previous['image_id']))
+                    continue
+                pending.append((image_id, filename, filepath, content_hash))
+                ingested.append((item, content_hash, image_id))
+
+            hot_folder.mark_ingested(unchanged)
+            if pending:
+                hot_folder.mark_in_flight([item for item, _, _ in ingested])
+                job_ids.append(job_manager.submit(
+                    'hot_folder', len(pending), process_hot_folder_job, pending, project_id, ingested
+                ))
+    return job_ids
+
+def process_hot_folder_job(job_id, pending, project_id, ingested):
+    """
+    Clasifica un lote de la carpeta vigilada y, al terminar, registra los
+    archivos ingeridos.
+
+    Solo los archivos clasificados se registran y eliminan la imagen a la que
+    sustituyen. Los que fallaron se registran como fallidos (no se reintentan
+    hasta que cambian) y se borra su copia.
+
+    Args:
+        ingested (list): Tuplas (ReadyFile, content_hash, id de imagen) de pending
+    """
+    try:
+        process_upload_job(job_id, pending, project_id)
+    finally:
+        classified = {record['id'] for record in job_manager.get(job_id)['results']}
+        done = [entry for entry in ingested if entry[2] in classified]
+        failed = [entry for entry in ingested if entry[2] not in classified]
+        for image_id, _, filepath, _ in pending:
+            if image_id not in classified and os.path.isfile(filepath):
+                os.remove(filepath)
+        remove_images([item.previous['image_id'] for item, _, _ in done if item.previous])
+        hot_folder.mark_ingested(done)
+        if failed:
+            app.logger.warning(
+                f"Carpeta vigilada: {len(failed)} archivos sin clasificar; se reintentarán cuando cambien"
+            )
+        hot_folder.mark_failed([item for item, _, _ in failed])
+
+def watch_hot_folder():
+    """
+    Bucle de la carpeta vigilada (hilo en segundo plano).
+
+    Solo explora el proceso que tiene el bloqueo de la carpeta; los demás
+    lo vuelven a intentar cada intervalo por si ese proceso termina.
+    """
+    while True:
+        if not hot_folder.acquire_lock():
+            time.sleep(app.config['HOT_FOLDER_INTERVAL'])
+            continue
+        try:
+            job_ids = ingest_hot_folder()
+            if job_ids:
+                app.logger.info(f"Carpeta vigilada: {len(job_ids)} lotes en clasificación")
+        except Exception as e:
+            app.logger.error(f"Error explorando la carpeta vigilada: {e}")
+        time.sleep(app.config['HOT_FOLDER_INTERVAL'])
+
+# --- Métricas de las peticiones ---
+
+@app.before_request
+def start_request_timer():
+    """Marca el inicio de la petición para las métricas."""
+    if metrics.enabled:
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    """Registra la duración de la petición por plantilla de ruta (no por URL, para acotar las series)."""
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_seconds.observe(
+            time.perf_counter() - start, method=request.method, route=route, status=response.status_code
+        )
+    return response
 
 # --- Rutas de la API ---
 
-@app.route('/api/upload', methods=['POST'])
-def upload_images():
-    """Carga y procesa múltiples imágenes."""
+@app.route('/api/upload', methods=['POST'], defaults={'project_id': DEFAULT_PROJECT})
+@app.route('/api/projects/<string:project_id>/upload', methods=['POST'])
+def upload_images(project_id):
+    """Guarda las imágenes y lanza su clasificación como trabajo en segundo plano."""
+    error = unknown_project(project_id)
+    if error:
+        return error
     if 'files' not in request.files:
         return jsonify({'error': 'No se proporcionaron archivos en la clave "files"'}), 400
     
@@ -67,79 +545,292 @@ def upload_images():
     if not files or all(f.filename == '' for f in files):
         return jsonify({'error': 'No se seleccionó ningún archivo'}), 400
         
-    results = []
+    upload_folder = project_upload_folder(project_id)
+    os.makedirs(upload_folder, exist_ok=True)
+    pending = []
     for file in files:
         if file and allowed_file(file.filename):
             try:
                 image_id = str(uuid.uuid4())
                 filename = secure_filename(file.filename)
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{image_id}_{filename}")
+                filepath = os.path.join(upload_folder, f"{image_id}_{filename}")
                 file.save(filepath)
-
-                image_info = image_processor.get_image_info(filepath)
-                classification = classifier.classify_image(filepath, filename)
-                
-                image_record = {
-                    'id': image_id,
-                    'original_filename': filename,
-                    'filepath': filepath,
-                    'type': classification['type'],
-                    'confidence': classification['confidence'],
-                    'validated': False,
-                    'page_number': None,
-                    'number_type': 'arabic',
-                    'number_exception': '',
-                    'phantom_number': False,
-                    'created_at': datetime.now().isoformat(),
-                    **image_info
-                }
-                
-                images_db[image_id] = image_record
-                results.append(image_record)
+                pending.append((image_id, filename, filepath, None))
             except Exception as e:
-                # Si una imagen falla, se informa del error pero se continúa con las demás.
                 app.logger.error(f"Error procesando el archivo {file.filename}: {e}")
-                # Podrías añadir un registro de errores aquí
     
-    if not results:
+    if not pending:
         return jsonify({'error': 'Ninguno de los archivos pudo ser procesado. Verifique los formatos.'}), 400
 
-    try:
-        page_numberer.auto_number_pages(list(images_db.values()))
-    except Exception as e:
-        app.logger.warning(f"La auto-numeración falló después de la carga: {e}")
+    return submit_upload_job(pending, project_id)
+
+def submit_upload_job(pending, project_id):
+    """Lanza la clasificación de las imágenes ya guardadas y responde con el trabajo."""
+    job_id = job_manager.submit('upload', len(pending), process_upload_job, pending, project_id)
 
     return jsonify({
-        'message': f'Se cargaron y procesaron {len(results)} imágenes.',
-        'images': list(images_db.values())
-    }), 201
+        'message': f'Se recibieron {len(pending)} imágenes. La clasificación continúa en segundo plano.',
+        'job_id': job_id,
+        'status_url': f'/api/jobs/{job_id}'
+    }), 202
+
+# --- Cargas por fragmentos reanudables ---
+# POST /api/uploads inicia la carga, PUT /api/uploads/<id>?offset=N añade cada
+# fragmento (cuerpo binario), GET /api/uploads/<id> indica desde dónde reanudar
+# y POST /api/uploads/finalize (o /api/projects/<id>/uploads/finalize) lanza la
+# clasificación de las cargas completas en el proyecto.
+
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    """Inicia una carga por fragmentos."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    filename = data.get('filename')
+    filename = secure_filename(filename) if isinstance(filename, str) else ''
+    if not filename or not allowed_file(filename):
+        return jsonify({'error': 'Nombre de archivo no válido o extensión no permitida'}), 400
+    try:
+        session = upload_sessions.create(filename, int(data.get('size')))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Tamaño no válido: {e}'}), 400
 
-@app.route('/api/images', methods=['GET'])
-def get_images():
-    """Obtiene la lista completa de imágenes, ordenadas por nombre de archivo."""
-    # Convertir el diccionario a una lista y ordenar
-    all_images = sorted(list(images_db.values()), key=lambda x: x['original_filename'])
-    return jsonify({'images': all_images, 'total': len(all_images)})
+    return jsonify({**session, 'chunk_size': app.config['CHUNKED_UPLOAD_CHUNK_SIZE']}), 201
+
+@app.route('/api/uploads/<string:upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Consulta una carga; offset es la posición desde la que continuar."""
+    try:
+        return jsonify(upload_sessions.status(upload_id))
+    except KeyError:
+        return jsonify({'error': 'Carga no encontrada'}), 404
+
+@app.route('/api/uploads/<string:upload_id>', methods=['PUT'])
+def append_upload_chunk(upload_id):
+    """Añade un fragmento; el cuerpo se escribe en disco a medida que llega."""
+    offset = request.args.get('offset', request.headers.get('Upload-Offset'))
+    try:
+        offset = int(offset)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Se requiere el parámetro offset'}), 400
+
+    try:
+        return jsonify(upload_sessions.append(upload_id, offset, request.stream, request.content_length))
+    except KeyError:
+        return jsonify({'error': 'Carga no encontrada'}), 404
+    except ValueError as e:
+        # El cliente reanuda desde el offset devuelto
+        return jsonify({'error': str(e), **upload_sessions.status(upload_id)}), 409
+
+@app.route('/api/uploads/<string:upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    """Cancela una carga y elimina lo recibido."""
+    try:
+        upload_sessions.abort(upload_id)
+    except KeyError:
+        return jsonify({'error': 'Carga no encontrada'}), 404
+    return '', 204
+
+@app.route('/api/uploads/finalize', methods=['POST'], defaults={'project_id': DEFAULT_PROJECT})
+@app.route('/api/projects/<string:project_id>/uploads/finalize', methods=['POST'])
+def finalize_uploads(project_id):
+    """Completa las cargas indicadas y lanza su clasificación como un único lote."""
+    error = unknown_project(project_id)
+    if error:
+        return error
+    data = request.get_json(silent=True)
+    upload_ids = data.get('upload_ids') if isinstance(data, dict) else None
+    if not upload_ids:
+        return jsonify({'error': 'No se indicaron cargas en "upload_ids"'}), 400
+    if not isinstance(upload_ids, list) or not all(isinstance(upload_id, str) for upload_id in upload_ids):
+        return jsonify({'error': '"upload_ids" debe ser una lista de ids'}), 400
+
+    # Comprobar todas antes de mover ningún archivo para no dejar lotes a medias
+    incomplete = []
+    for upload_id in upload_ids:
+        try:
+            status = upload_sessions.status(upload_id)
+        except KeyError:
+            return jsonify({'error': f'Carga no encontrada: {upload_id}'}), 404
+        if status['offset'] != status['size']:
+            incomplete.append(status)
+    if incomplete:
+        return jsonify({'error': 'Hay cargas incompletas', 'incomplete': incomplete}), 409
+
+    pending = []
+    for upload_id in upload_ids:
+        try:
+            pending.append(upload_sessions.finalize(upload_id, project_upload_folder(project_id)))
+        except (KeyError, ValueError) as e:
+            app.logger.error(f"No se pudo completar la carga {upload_id}: {e}")
+
+    if not pending:
+        return jsonify({'error': 'Ninguna de las cargas pudo completarse'}), 409
+
+    return submit_upload_job(pending, project_id)
+
+@app.route('/api/jobs/<string:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Consulta el progreso, los resultados parciales y los fallos de un trabajo."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(job)
+
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    """
+    Eventos de progreso en formato Server-Sent Events:
+    classified (imagen clasificada), failed (imagen que no se pudo procesar),
+    numbered (campos de numeración cambiados), updated (registros modificados),
+    deleted (ids de registros eliminados), job (trabajo terminado) y resync (el cliente perdió eventos y debe
+    resincronizarse con GET /api/images?since=<versión>).
+
+    Con ?project=<id> solo se reciben los eventos de ese proyecto y los
+    generales (job, resync); los de un proyecto llevan su project_id. Al
+    reconectarse, EventSource envía Last-Event-ID y se reenvían los eventos perdidos.
+    """
+    project_id = request.args.get('project')
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    heartbeat = app.config['EVENTS_HEARTBEAT']
+
+    def generate():
+        # La suscripción se abre al empezar a enviar para que finally la cierre siempre
+        subscription = event_bus.subscribe(project_id, last_event_id)
+        try:
+            # Reintento de EventSource tras un corte (ms)
+            yield 'retry: 3000\n\n'
+            while True:
+                events, overflowed = subscription.get(timeout=heartbeat)
+                if overflowed:
+                    # Se descartaron eventos: en lugar de los que quedan, se pide resincronizar
+                    id_line = f'id: {events[-1].id}\n' if events else ''
+                    yield f'{id_line}event: resync\ndata: {{}}\n\n'
+                    continue
+                if not events:
+                    # Comentario para mantener la conexión abierta a través de proxies
+                    yield ': heartbeat\n\n'
+                    continue
+                yield ''.join(EventBus.format(event) for event in events)
+        finally:
+            subscription.close()
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # nginx no debe acumular la respuesta antes de enviarla
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/projects', methods=['GET'])
+def list_projects():
+    """Lista los proyectos (libros) con su número de imágenes."""
+    return jsonify({'projects': image_store.list_projects()})
+
+@app.route('/api/projects', methods=['POST'])
+def create_project():
+    """Crea un proyecto vacío con su propia numeración y carpeta de archivos."""
+    name = ((request.get_json(silent=True) or {}).get('name') or '').strip()
+    if not name:
+        return jsonify({'error': 'Se requiere el nombre del proyecto'}), 400
+    project = image_store.create_project(name)
+    os.makedirs(project_upload_folder(project['id']), exist_ok=True)
+    return jsonify(project), 201
+
+@app.route('/api/projects/<string:project_id>', methods=['GET'])
+def get_project(project_id):
+    """Consulta un proyecto."""
+    project = image_store.get_project(project_id)
+    if project is None:
+        return jsonify({'error': f'Proyecto no encontrado: {project_id}'}), 404
+    return jsonify(project)
+
+@app.route('/api/images', methods=['GET'], defaults={'project_id': DEFAULT_PROJECT})
+@app.route('/api/projects/<string:project_id>/images', methods=['GET'])
+def get_images(project_id):
+    """
+    Obtiene las imágenes de un proyecto ordenadas por nombre de archivo
+    (/api/images es el proyecto por defecto).
+
+    Parámetros opcionales: limit (tamaño de página), cursor (next_cursor de la
+    página anterior) y fields (campos separados por comas, p. ej.
+    fields=id,original_filename,type,validated). Sin limit ni cursor se
+    devuelve la lista completa. Con since=<version> solo se devuelven los
+    registros cambiados desde esa versión y los ids eliminados ('deleted').
+    Todas las respuestas incluyen la versión de la colección y su ETag.
+    """
+    # La versión se lee antes que los registros: un cliente que pida después
+    # ?since=<version> recibe cualquier cambio concurrente con esta respuesta
+    error = unknown_project(project_id)
+    if error:
+        return error
+    version = image_store.version()
+    if collection_etag(version) in request.if_none_match:
+        return with_collection_etag(app.response_class(status=304), version)
+
+    fields = FIELDS
+    if request.args.get('fields'):
+        fields = list(dict.fromkeys(field.strip() for field in request.args['fields'].split(',') if field.strip()))
+        unknown = [field for field in fields if field not in FIELDS]
+        if unknown or not fields:
+            return jsonify({'error': f"Campos desconocidos: {', '.join(unknown) or '(ninguno)'}"}), 400
+
+    since = request.args.get('since')
+    if since is not None:
+        if not since.isdigit():
+            return jsonify({'error': f'Versión inválida: {since}'}), 400
+        version, changed, deleted = image_store.changes_since(int(since), fields, project_id)
+        return with_collection_etag(jsonify({
+            'images': changed,
+            'deleted': deleted,
+            'total': image_store.count(project_id),
+            'version': version
+        }), version)
+
+    limit = request.args.get('limit', type=int)
+    token = request.args.get('cursor')
+    if limit is None and token is None:
+        return with_collection_etag(jsonify({
+            'images': image_store.list(fields, project_id),
+            'total': image_store.count(project_id),
+            'next_cursor': None,
+            'version': version
+        }), version)
+
+    try:
+        cursor = ImageStore.decode_cursor(token) if token else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if limit is None:
+        limit = app.config['IMAGES_PAGE_SIZE']
+    limit = max(1, min(limit, app.config['IMAGES_MAX_PAGE_SIZE']))
+    images, next_cursor = image_store.page(limit, cursor, fields, project_id)
+    return with_collection_etag(jsonify({
+        'images': images,
+        'total': image_store.count(project_id),
+        'next_cursor': ImageStore.encode_cursor(next_cursor) if next_cursor else None,
+        'version': version
+    }), version)
 
 @app.route('/api/images/<string:image_id>', methods=['PUT'])
 def update_image(image_id):
     """Actualiza los metadatos de una sola imagen."""
-    if image_id not in images_db:
+    if image_id not in image_store:
         return jsonify({'error': 'Imagen no encontrada'}), 404
     
     data = request.json
     if not data:
         return jsonify({'error': 'No se proporcionaron datos para actualizar'}), 400
         
-    image = images_db[image_id]
-    updateable_fields = ['type', 'page_number', 'number_type', 'number_exception', 'phantom_number', 'validated']
-    
-    for field in updateable_fields:
-        if field in data:
-            # Aquí se podría añadir validación de tipos de datos
-            image[field] = data[field]
-            
-    return jsonify(image)
+    # Aquí se podría añadir validación de tipos de datos
+    updates = {field: data[field] for field in UPDATEABLE_FIELDS if field in data}
+    image = image_store.update(image_id, updates)
+    with numbering_lock:
+        update_numbering_index([image])
+    publish_updates('updated', [image], image['version'])
+
+    # El registro incluye la versión de la colección en la que se modificó
+    return with_collection_etag(jsonify(image), image['version'])
 
 @app.route('/api/images/bulk-update', methods=['PUT'])
 def bulk_update_images():
@@ -149,40 +840,95 @@ def bulk_update_images():
         return jsonify({'error': 'Formato de petición inválido. Se requieren "image_ids" y "updates"'}), 400
     
     image_ids = data['image_ids']
-    updates = data['updates']
-    updated_images = []
-    
-    for image_id in image_ids:
-        if image_id in images_db:
-            image = images_db[image_id]
-            for field, value in updates.items():
-                if field in ['type', 'page_number', 'number_type', 'number_exception', 'phantom_number', 'validated']:
-                    image[field] = value
-            updated_images.append(image)
+    updates = {field: value for field, value in data['updates'].items() if field in UPDATEABLE_FIELDS}
+    updated_images = image_store.bulk_update(image_ids, updates)
+    with numbering_lock:
+        update_numbering_index(updated_images)
 
-    return jsonify({
+    version = max((image['version'] for image in updated_images), default=image_store.version())
+    publish_updates('updated', updated_images, version)
+    return with_collection_etag(jsonify({
         'message': f'Se actualizaron {len(updated_images)} imágenes.',
-        'updated_images': updated_images
-    })
+        'updated_images': updated_images,
+        'version': version
+    }), version)
+
+def send_content(path, content_hash, max_age, **kwargs):
+    """
+    Sirve un archivo con ETag de contenido, respuestas 304 y soporte de Range.
+
+    El cuerpo se entrega con sendfile (wsgi.file_wrapper) o, con USE_X_SENDFILE,
+    delegando el envío al servidor web frontal.
+    """
+    return send_file(path, conditional=True, etag=content_hash, max_age=max_age, **kwargs)
+
+def file_content_hash(path):
+    """Hash de contenido de un archivo, memorizado mientras no cambie en disco."""
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    content_hash = file_hashes.get(key)
+    if content_hash is None:
+        content_hash = ClassificationCache.hash_file(path)
+        with file_hashes_lock:
+            if len(file_hashes) >= 1024:
+                file_hashes.clear()
+            file_hashes[key] = content_hash
+    return content_hash
 
 @app.route('/api/images/<string:image_id>/file', methods=['GET'])
 def get_image_file(image_id):
     """Sirve el archivo de una imagen específica."""
-    if image_id not in images_db:
+    image = image_store.get(image_id)
+    if image is None:
         return jsonify({'error': 'Imagen no encontrada'}), 404
-    
-    image = images_db[image_id]
-    try:
-        directory = os.path.dirname(image['filepath'])
-        filename = os.path.basename(image['filepath'])
-        return send_from_directory(directory, filename)
-    except FileNotFoundError:
+    if not os.path.isfile(image['filepath']):
+        return jsonify({'error': 'El archivo de la imagen no se encuentra en el servidor'}), 404
+
+    # Registros anteriores al hash de contenido: se calcula una vez y se guarda
+    content_hash = image['content_hash']
+    if content_hash is None:
+        content_hash = ClassificationCache.hash_file(image['filepath'])
+        image_store.set_content_hash(image_id, content_hash)
+
+    return send_content(image['filepath'], content_hash, app.config['IMAGE_FILE_MAX_AGE'])
+
+def send_derivative(image_id, create):
+    """Sirve un derivado de la caché con cabeceras de caché de larga duración."""
+    image = image_store.get(image_id)
+    if image is None:
+        return jsonify({'error': 'Imagen no encontrada'}), 404
+    if not os.path.exists(image['filepath']):
         return jsonify({'error': 'El archivo de la imagen no se encuentra en el servidor'}), 404
 
+    try:
+        path = create(image)
+    except ValueError as e:
+        app.logger.error(f"Error generando el derivado de {image_id}: {e}")
+        return jsonify({'error': 'No se pudo generar la imagen derivada'}), 500
+
+    response = send_file(path, mimetype='image/jpeg', max_age=app.config['DERIVATIVE_MAX_AGE'])
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/api/images/<string:image_id>/thumbnail', methods=['GET'])
+def get_image_thumbnail(image_id):
+    """Sirve la miniatura de una imagen (generada la primera vez)."""
+    return send_derivative(image_id, lambda image: derivative_cache.thumbnail(image_id, image['filepath']))
+
+@app.route('/api/images/<string:image_id>/preview', methods=['GET'])
+def get_image_preview(image_id):
+    """Sirve una versión web de la imagen; ?w= se ajusta a los anchos en caché."""
+    width = request.args.get('w', type=int)
+    return send_derivative(image_id, lambda image: derivative_cache.preview(image_id, image['filepath'], width))
+
 # --- Endpoint de Exportación (AÑADIDO) ---
-@app.route('/api/export', methods=['POST'])
-def export_images():
+@app.route('/api/export', methods=['POST'], defaults={'project_id': DEFAULT_PROJECT})
+@app.route('/api/projects/<string:project_id>/export', methods=['POST'])
+def export_images(project_id):
     """Exporta las imágenes y metadatos seleccionados a un archivo zip."""
+    error = unknown_project(project_id)
+    if error:
+        return error
     data = request.json
     if not data or 'images' not in data or 'metadata' not in data:
         return jsonify({'error': 'Formato de petición de exportación inválido'}), 400
@@ -193,36 +939,48 @@ def export_images():
 
     if not image_ids:
         return jsonify({'error': 'No hay imágenes para exportar'}), 400
+    if config.get('imageFormat', 'original') not in IMAGE_FORMATS:
+        return jsonify({'error': f"Formato de imagen no soportado: {config['imageFormat']}"}), 400
 
     try:
+        # Encontrar los registros a partir del nombre original (consulta indexada)
+        records_by_filename = {}
+        if config.get('includeImages', True):
+            records_by_filename = image_store.get_by_filenames(
+                [item['original_filename'] for item in metadata_list], project_id
+            )
+
+        entries, missing = plan_export(metadata_list, records_by_filename, config, app.config['EXPORT_WEB_WIDTH'])
+        for filepath in missing:
+            app.logger.warning(f"No se encontró el archivo para exportar: {filepath}")
+
         timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
         zip_filename = f"book-export-{timestamp}.zip"
-        zip_filepath = os.path.join(app.config['EXPORT_FOLDER'], zip_filename)
 
-        with zipfile.ZipFile(zip_filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # 1. Añadir archivo de metadatos
-            if config.get('includeMetadata', True):
-                # Usamos un diccionario para asegurar que cada imagen solo aparezca una vez
-                final_metadata = {item['original_filename']: item for item in metadata_list}
-                zipf.writestr('metadata.json', json.dumps(list(final_metadata.values()), indent=4))
-
-            # 2. Añadir imágenes (renombradas si es necesario)
-            if config.get('includeImages', True):
-                for metadata_item in metadata_list:
-                    # Encontrar el ID de la imagen a partir del nombre original
-                    image_id = next((img['id'] for img in images_db.values() if img['original_filename'] == metadata_item['original_filename']), None)
-                    
-                    if image_id and image_id in images_db:
-                        image_record = images_db[image_id]
-                        filepath = image_record['filepath']
-                        
-                        # Determinar el nombre del archivo dentro del ZIP
-                        arcname = metadata_item.get('new_filename') if config.get('renameFiles', True) else image_record['original_filename']
-                        
-                        if os.path.exists(filepath):
-                            zipf.write(filepath, arcname=arcname)
-                        else:
-                            app.logger.warning(f"No se encontró el archivo para exportar: {filepath}")
+        # Trabajo en segundo plano con progreso consultable en /api/jobs/<id>
+        if config.get('background'):
+            job_id = job_manager.submit('export', len(entries), process_export_job, zip_filename, entries)
+            return jsonify({
+                'message': f'Exportación de {len(entries)} archivos en curso.',
+                'job_id': job_id,
+                'status_url': f'/api/jobs/{job_id}'
+            }), 202
+
+        # Modo streaming: el ZIP se genera mientras se descarga, sin escribirlo en disco
+        if config.get('stream', app.config['EXPORT_STREAMING']):
+            token = register_export_stream(zip_filename, entries)
+            return jsonify({'success': True, 'download_url': f"/api/export/stream/{token}"})
+
+        zip_filepath = os.path.join(app.config['EXPORT_FOLDER'], zip_filename)
+        written = []
+        start = time.perf_counter()
+        with export_tmp_dir() as tmp_dir:
+            write_zip(
+                zip_filepath,
+                convert_entries(entries, processing_pool, tmp_dir, log_conversion_error),
+                lambda entry, bytes_written: written.append(entry)
+            )
+        record_export(len(written), os.path.getsize(zip_filepath), time.perf_counter() - start)
 
         # La URL de descarga debe ser relativa para que el frontend la construya
         download_url = f"/exports/{zip_filename}"
@@ -235,20 +993,177 @@ def export_images():
         traceback.print_exc()
         return jsonify({'error': f'Ocurrió un error interno durante la exportación: {e}'}), 500
 
+@contextmanager
+def export_tmp_dir():
+    """Directorio temporal de las imágenes convertidas de una exportación."""
+    os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.export-', dir=app.config['EXPORT_FOLDER'])
+    try:
+        yield tmp_dir
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def log_conversion_error(entry, error):
+    app.logger.error(f"Error convirtiendo {entry.path} para la exportación: {error}")
+
+def process_export_job(job_id, zip_filename, entries):
+    """Escribe el ZIP de una exportación informando de archivos, bytes y tiempo restante."""
+    zip_filepath = os.path.join(app.config['EXPORT_FOLDER'], zip_filename)
+    partial_filepath = f'{zip_filepath}.part'
+    start = time.time()
+    progress = {'files': 0, 'failed': 0}
+
+    def on_entry(entry, bytes_written):
+        progress['files'] += 1
+        done = progress['files'] + progress['failed']
+        elapsed = time.time() - start
+        job_manager.update(job_id, processed=done)
+        job_manager.set_stats(
+            job_id,
+            files_written=progress['files'],
+            bytes_written=bytes_written,
+            elapsed_seconds=round(elapsed, 1),
+            eta_seconds=round(elapsed / done * (len(entries) - done), 1)
+        )
+
+    def on_error(entry, error):
+        log_conversion_error(entry, error)
+        progress['failed'] += 1
+        job_manager.add_failure(job_id, entry.arcname, error)
+
+    with export_tmp_dir() as tmp_dir:
+        try:
+            # Las conversiones se reparten en el pool; el ZIP las recibe en orden
+            write_zip(partial_filepath, convert_entries(entries, processing_pool, tmp_dir, on_error), on_entry)
+            os.replace(partial_filepath, zip_filepath)
+        finally:
+            if os.path.exists(partial_filepath):
+                os.remove(partial_filepath)
+
+    size_bytes = os.path.getsize(zip_filepath)
+    record_export(progress['files'], size_bytes, time.time() - start)
+    job_manager.set_stats(job_id, eta_seconds=0)
+    job_manager.update(job_id, results=[{
+        'download_url': f"/exports/{zip_filename}",
+        'filename': zip_filename,
+        'size_bytes': size_bytes
+    }])
+
+def register_export_stream(zip_filename, entries):
+    """Guarda una exportación pendiente de descarga y devuelve su token."""
+    now = time.time()
+    with export_streams_lock:
+        for token in [token for token, stream in export_streams.items() if stream['expires_at'] < now]:
+            del export_streams[token]
+        token = uuid.uuid4().hex
+        export_streams[token] = {
+            'filename': zip_filename,
+            'entries': entries,
+            'expires_at': now + app.config['EXPORT_STREAM_TTL']
+        }
+    return token
+
+@app.route('/api/export/stream/<string:token>', methods=['GET'])
+def stream_export(token):
+    """Envía el ZIP de una exportación por bloques (transferencia chunked, ZIP64)."""
+    with export_streams_lock:
+        stream = export_streams.get(token)
+    if stream is None or stream['expires_at'] < time.time():
+        return jsonify({'error': 'Exportación no encontrada o caducada'}), 404
+
+    def generate():
+        start = time.perf_counter()
+        written = {'files': 0, 'bytes': 0}
+
+        def count_files(entries):
+            for entry in entries:
+                written['files'] += 1
+                yield entry
+
+        with export_tmp_dir() as tmp_dir:
+            entries = convert_entries(stream['entries'], processing_pool, tmp_dir, log_conversion_error)
+            for chunk in iter_zip(count_files(entries)):
+                written['bytes'] += len(chunk)
+                yield chunk
+        # Solo las descargas completas: si el cliente corta, el generador no llega aquí
+        record_export(written['files'], written['bytes'], time.perf_counter() - start)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f"attachment; filename={stream['filename']}",
+            # Evitar que un proxy (nginx) acumule la respuesta completa
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 # --- Ruta para descargar archivos exportados (AÑADIDO) ---
 @app.route('/exports/<path:filename>')
 def download_export_file(filename):
     """Sirve un archivo desde la carpeta de exportaciones."""
-    return send_from_directory(
-        app.config['EXPORT_FOLDER'],
-        filename,
-        as_attachment=True
-    )
+    path = safe_join(str(app.config['EXPORT_FOLDER']), filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({'error': 'Archivo de exportación no encontrado'}), 404
+
+    # Las exportaciones no cambian una vez creadas
+    return send_content(path, file_content_hash(path), app.config['EXPORT_FILE_MAX_AGE'], as_attachment=True)
     
+# --- Carpeta vigilada ---
+@app.route('/api/hot-folder', methods=['GET'])
+def get_hot_folder():
+    """Estado de la carpeta vigilada: archivos ingeridos y última exploración."""
+    if hot_folder is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **hot_folder.status()})
+
+# --- Ruta de métricas ---
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Expone las métricas en formato de texto de Prometheus."""
+    if not metrics.enabled:
+        return jsonify({'error': 'Las métricas están desactivadas (METRICS_ENABLED)'}), 404
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# --- Ruta de precarga ---
+@app.route('/api/warmup', methods=['POST'])
+def warmup():
+    """Precargar el pool de clasificación (p. ej. desde el health check del despliegue)"""
+    return jsonify(warm_up())
+
+
+# --- Tareas en segundo plano ---
+background_tasks_started = False
+background_tasks_lock = threading.Lock()
+
+def start_background_tasks():
+    """
+    Lanza la precarga y la vigilancia de la carpeta en hilos de fondo.
+
+    No se llama al importar la app: solo en el proceso que sirve peticiones
+    (desde __main__ o desde wsgi.py). En producción hay un único proceso
+    servidor (ver gunicorn.conf.py); si otra instancia ya vigila la carpeta,
+    esta espera su bloqueo (ver HotFolderScanner.acquire_lock).
+    """
+    global background_tasks_started
+    with background_tasks_lock:
+        if background_tasks_started:
+            return
+        background_tasks_started = True
+    # Precarga en segundo plano: el servidor acepta peticiones mientras tanto
+    if app.config['WARM_UP_ON_START']:
+        threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+    if hot_folder is not None:
+        threading.Thread(target=watch_hot_folder, name='hot-folder', daemon=True).start()
+
 # --- Arranque de la aplicación ---
 if __name__ == '__main__':
     # Asegurarse de que los directorios necesarios existan al iniciar
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
-    
+
+    # Con el recargador, este bloque se ejecuta en el proceso que vigila los
+    # archivos y en el que sirve (WERKZEUG_RUN_MAIN): solo el segundo lanza las tareas
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_tasks()
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,304 @@
+"""
+Benchmark del contexto de análisis compartido por página.
+
+Compara el flujo anterior al contexto compartido (cada detector convierte a
+grises y calcula sus propios bordes, y get_image_info vuelve a abrir el
+archivo con PIL) con el flujo que comparte un único ImageAnalysisContext
+entre todos los detectores, a resolución completa y con proxy de análisis
+reducido. El flujo anterior se conserva aquí tal como estaba en el
+clasificador (funciones legacy_*), para medir contra el código real y no
+contra una aproximación. En ambos flujos se omite el OCR.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_analysis_context --dpi 600 --pages 5
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from benchmarks.synthetic_pages import generate_pages
+from models.analysis_context import ImageAnalysisContext
+from models.classifier import ImageClassifier
+from utils.image_processing import ImageProcessor
+
+
+# --- Flujo anterior (ImageProcessor.get_image_info e ImageClassifier sin contexto) ---
+
+def legacy_image_info(image_path):
+    """ImageProcessor.get_image_info anterior: vuelve a abrir el archivo con PIL"""
+    try:
+        with Image.open(image_path) as img:
+            file_stats = os.stat(image_path)
+
+            return {
+                'width': img.width,
+                'height': img.height,
+                'format': img.format,
+                'mode': img.mode,
+                'size_bytes': file_stats.st_size,
+                'has_transparency': img.mode in ('RGBA', 'LA') or 'transparency' in img.info,
+                'dpi': img.info.get('dpi', (72, 72))
+            }
+
+    except Exception as e:
+        raise ValueError(f"Cannot process image {image_path}: {str(e)}")
+
+
+def legacy_detect_blank_page(image):
+    """ImageClassifier._detect_blank_page anterior"""
+    # Convertir a escala de grises
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    # Métrica 1: Desviación estándar de la intensidad
+    std_dev = np.std(gray.astype(np.float32))
+
+    # Métrica 2: Rango de intensidades
+    min_intensity = np.min(gray)
+    max_intensity = np.max(gray)
+    intensity_range = max_intensity - min_intensity
+
+    # Métrica 3: Análisis de histograma
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
+    hist_norm = hist / hist.sum()
+
+    # Calcular entropía del histograma (baja entropía = menos variación)
+    entropy = -np.sum(hist_norm * np.log2(hist_norm + 1e-10))
+
+    # Métrica 4: Detección de bordes
+    edges = cv2.Canny(gray, 30, 100)
+    edge_density = np.sum(edges > 0) / edges.size
+
+    # Métrica 5: Porcentaje de píxeles muy claros
+    very_light_pixels = np.sum(gray > 240) / gray.size
+
+    # Métrica 6: Media de intensidad
+    mean_intensity = np.mean(gray)
+
+    metrics = {
+        'std_dev': std_dev,
+        'intensity_range': intensity_range,
+        'entropy': entropy,
+        'edge_density': edge_density,
+        'very_light_pixels': very_light_pixels,
+        'mean_intensity': mean_intensity
+    }
+
+    is_blank = (
+        std_dev < 5 and
+        intensity_range < 50 and
+        entropy < 3 and
+        edge_density < 0.001 and
+        very_light_pixels > 0.9 and
+        mean_intensity > 230
+    )
+
+    confidence = 0.0
+    if std_dev < 2: confidence += 0.2
+    elif std_dev < 5: confidence += 0.15
+
+    if intensity_range < 20: confidence += 0.2
+    elif intensity_range < 50: confidence += 0.15
+
+    if entropy < 2: confidence += 0.2
+    elif entropy < 3: confidence += 0.15
+
+    if edge_density < 0.0005: confidence += 0.2
+    elif edge_density < 0.001: confidence += 0.15
+
+    if very_light_pixels > 0.95: confidence += 0.2
+    elif very_light_pixels > 0.9: confidence += 0.15
+
+    return {
+        'is_blank': is_blank,
+        'confidence': min(confidence, 0.95) if is_blank else 0.0,
+        'metrics': metrics
+    }
+
+
+def legacy_analyze_color_complexity(image):
+    """ImageClassifier._analyze_color_complexity anterior"""
+    # Calcular histograma de colores
+    hist = cv2.calcHist([image], [0, 1, 2], None, [8, 8, 8], [0, 256, 0, 256, 0, 256])
+
+    # Normalizar histograma
+    hist_norm = hist / hist.sum()
+
+    # Calcular entropía (medida de diversidad de colores)
+    entropy = -np.sum(hist_norm * np.log2(hist_norm + 1e-10))
+
+    # Detectar bordes para analizar complejidad de formas
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 50, 150)
+    edge_density = np.sum(edges > 0) / edges.size
+
+    return {
+        'color_entropy': entropy,
+        'edge_density': edge_density,
+        'is_complex': entropy > 12 or edge_density > 0.1
+    }
+
+
+def legacy_detect_calibration_target(image):
+    """ImageClassifier._detect_calibration_target anterior"""
+    # Convertir a escala de grises
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    # Detectar contornos rectangulares (patches de color típicos en targets)
+    edges = cv2.Canny(gray, 50, 150)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    rectangular_patches = 0
+    regular_patches = 0
+    patch_sizes = []
+
+    for contour in contours:
+        # Aproximar contorno
+        epsilon = 0.02 * cv2.arcLength(contour, True)
+        approx = cv2.approxPolyDP(contour, epsilon, True)
+        area = cv2.contourArea(contour)
+
+        # Contar rectángulos de tamaño apropiado
+        if len(approx) == 4 and 500 < area < 50000:
+            rectangular_patches += 1
+            patch_sizes.append(area)
+
+            # Verificar regularidad (aspecto ratio cercano a 1:1)
+            x, y, w, h = cv2.boundingRect(contour)
+            aspect_ratio = float(w) / h
+            if 0.7 <= aspect_ratio <= 1.3:
+                regular_patches += 1
+
+    # Análisis de color para targets de calibración
+    color_variety = legacy_analyze_color_patches(image)
+
+    is_calibration = (
+        rectangular_patches >= 10 and
+        regular_patches >= 8 and
+        color_variety > 0.7
+    )
+
+    confidence = 0.0
+    if rectangular_patches >= 15: confidence += 0.4
+    elif rectangular_patches >= 10: confidence += 0.3
+
+    if regular_patches >= 10: confidence += 0.3
+    elif regular_patches >= 8: confidence += 0.2
+
+    if color_variety > 0.8: confidence += 0.3
+    elif color_variety > 0.7: confidence += 0.2
+
+    return {
+        'is_calibration': is_calibration,
+        'confidence': min(confidence, 0.9) if is_calibration else 0.0,
+        'rectangular_patches': rectangular_patches,
+        'regular_patches': regular_patches,
+        'color_variety': color_variety
+    }
+
+
+def legacy_analyze_color_patches(image):
+    """ImageClassifier._analyze_color_patches anterior"""
+    # Dividir imagen en grid para analizar parches de color
+    height, width = image.shape[:2]
+    grid_size = 8
+
+    patch_height = height // grid_size
+    patch_width = width // grid_size
+
+    patch_colors = []
+
+    for i in range(grid_size):
+        for j in range(grid_size):
+            y1 = i * patch_height
+            y2 = min((i + 1) * patch_height, height)
+            x1 = j * patch_width
+            x2 = min((j + 1) * patch_width, width)
+
+            patch = image[y1:y2, x1:x2]
+
+            # Calcular color promedio del patch
+            mean_color = np.mean(patch.reshape(-1, 3), axis=0)
+            patch_colors.append(mean_color)
+
+    # Calcular variedad de colores
+    patch_colors = np.array(patch_colors)
+
+    # Calcular distancias entre colores
+    color_distances = []
+    for i in range(len(patch_colors)):
+        for j in range(i + 1, len(patch_colors)):
+            distance = np.linalg.norm(patch_colors[i] - patch_colors[j])
+            color_distances.append(distance)
+
+    if not color_distances:
+        return 0.0
+
+    # Normalizar variedad (0-1)
+    avg_distance = np.mean(color_distances)
+    variety = min(avg_distance / 100.0, 1.0)
+
+    return variety
+
+
+def run_legacy(classifier, processor, path):
+    """Flujo anterior: get_image_info con PIL, cv2.imread y cada detector deriva sus datos"""
+    legacy_image_info(path)
+    image = cv2.imread(path)
+    legacy_detect_blank_page(image)
+    legacy_analyze_color_complexity(image)
+    legacy_detect_calibration_target(image)
+
+
+def run_shared(classifier, processor, path, proxy_max_dimension=None):
+    """Flujo actual: un solo contexto compartido por inspección y detectores"""
+    context = ImageAnalysisContext(path, proxy_max_dimension=proxy_max_dimension)
+    processor.get_image_info(path, context)
+    classifier._detect_blank_page(context)
+    classifier._analyze_color_complexity(context)
+    classifier._detect_calibration_target(context)
+
+
+def time_per_page(func, classifier, processor, paths, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            func(classifier, processor, path)
+        best = min(best, (time.perf_counter() - start) / len(paths))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dpi', type=int, default=600)
+    parser.add_argument('--pages', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--proxy', type=int, default=2000, help='Lado mayor mínimo del proxy')
+    args = parser.parse_args()
+
+    classifier = ImageClassifier()
+    processor = ImageProcessor()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [page['path'] for page in generate_pages(tmp, ['text'], [args.dpi], ['jpeg'], args.pages)]
+
+        legacy = time_per_page(run_legacy, classifier, processor, paths, args.repeat)
+        shared = time_per_page(run_shared, classifier, processor, paths, args.repeat)
+        proxy = time_per_page(
+            lambda c, p, path: run_shared(c, p, path, args.proxy), classifier, processor, paths, args.repeat
+        )
+
+    print(f"Páginas: {args.pages} a {args.dpi} dpi")
+    print(f"  antes (derivación por detector): {legacy * 1000:8.1f} ms/página")
+    print(f"  después (contexto compartido):   {shared * 1000:8.1f} ms/página")
+    print(f"  después + proxy (>= {args.proxy} px): {proxy * 1000:8.1f} ms/página")
+    print(f"  mejora: x{legacy / shared:.2f} (contexto), x{legacy / proxy:.2f} (contexto + proxy)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Benchmark reproducible del clasificador sobre páginas sintéticas.
+
+Genera páginas deterministas (benchmarks.synthetic_pages) en varias
+resoluciones y formatos y mide, por página:
+
+    decode                       Lectura y decodificación (ImageAnalysisContext)
+    _detect_blank_page           Etapas del clasificador, en el orden de
+    _analyze_color_complexity    _classify_by_content y sobre el mismo contexto,
+    _detect_text                 como en producción (cada etapa paga los datos
+    _detect_calibration_target   derivados que calcula primero)
+    classify_image               Recorrido completo con un contexto nuevo
+
+Los resultados se escriben en JSON (entorno, parámetros, tiempos por página y
+resumen por etapa) para comparar ejecuciones con --compare.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_classifier --dpi 150 300 --formats jpeg tiff png --output bench.json
+    python -m benchmarks.bench_classifier --compare bench.json --output bench_new.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+import PIL
+
+from benchmarks.synthetic_pages import FORMATS, PAGE_KINDS, generate_pages
+from config import Config
+from models.analysis_context import ImageAnalysisContext
+from models.classifier import ImageClassifier
+
+STAGES = (
+    'decode', '_detect_blank_page', '_analyze_color_complexity', '_detect_text',
+    '_detect_calibration_target', 'classify_image'
+)
+
+# Tipo esperado de cada página sintética (para seguir también la precisión entre versiones)
+EXPECTED_TYPES = {
+    'blank': 'pagina_blanca',
+    'noisy_blank': 'pagina_blanca',
+    'text': 'texto',
+    'illustration': 'ilustracion',
+    'it8': 'imagen_calibracion',
+}
+
+
+def time_stages(classifier, path, proxy_max_dimension):
+    """Tiempos (s) de cada etapa para una pasada sobre una página"""
+    timings = {}
+
+    start = time.perf_counter()
+    context = ImageAnalysisContext(path, proxy_max_dimension=proxy_max_dimension)
+    context.image
+    timings['decode'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    classifier._detect_blank_page(context)
+    timings['_detect_blank_page'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    color_complexity = classifier._analyze_color_complexity(context)
+    timings['_analyze_color_complexity'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    classifier._detect_text(context, color_complexity)
+    timings['_detect_text'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    classifier._detect_calibration_target(context)
+    timings['_detect_calibration_target'] = time.perf_counter() - start
+
+    # Nombre neutro: la clasificación depende solo del contenido
+    start = time.perf_counter()
+    result = classifier.classify_image(
+        path, 'page.img', ImageAnalysisContext(path, proxy_max_dimension=proxy_max_dimension)
+    )
+    timings['classify_image'] = time.perf_counter() - start
+    return timings, result
+
+
+def summarize(samples):
+    """Estadísticas en milisegundos de una lista de tiempos en segundos"""
+    values = [sample * 1000 for sample in samples]
+    return {
+        'min_ms': round(min(values), 3),
+        'median_ms': round(statistics.median(values), 3),
+        'mean_ms': round(statistics.fmean(values), 3),
+        'runs': len(values)
+    }
+
+
+def environment(classifier, args):
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'pillow': PIL.__version__,
+        'classifier_version': ImageClassifier.VERSION,
+        'ocr_available': classifier.ocr_available,
+        'parameters': {
+            'kinds': args.kinds, 'dpi': args.dpi, 'formats': args.formats,
+            'pages': args.pages, 'repeat': args.repeat, 'proxy': args.proxy
+        }
+    }
+
+
+def run(args):
+    classifier = ImageClassifier(
+        calibration_grid=Config.CALIBRATION_GRID, text_gate=Config.TEXT_GATE,
+        ocr_config=Config.OCR_CONFIG, ocr_probe_path=Config.OCR_PROBE_CACHE_PATH
+    )
+    proxy = args.proxy or None
+    pages = []
+    with tempfile.TemporaryDirectory() as tmp:
+        generated = generate_pages(tmp, args.kinds, args.dpi, args.formats, args.pages)
+        # Una pasada previa para cargar bibliotecas y cachés del sistema de archivos
+        time_stages(classifier, generated[0]['path'], proxy)
+
+        for page in generated:
+            samples = {stage: [] for stage in STAGES}
+            for _ in range(args.repeat):
+                timings, result = time_stages(classifier, page['path'], proxy)
+                for stage, elapsed in timings.items():
+                    samples[stage].append(elapsed)
+            pages.append({
+                **{key: page[key] for key in ('kind', 'dpi', 'format', 'index', 'width', 'height', 'bytes')},
+                'type': result['type'],
+                'expected_type': EXPECTED_TYPES[page['kind']],
+                'stages': {stage: summarize(values) for stage, values in samples.items()}
+            })
+
+    summary = {
+        stage: summarize([page['stages'][stage]['median_ms'] / 1000 for page in pages])
+        for stage in STAGES
+    }
+    correct = sum(page['type'] == page['expected_type'] for page in pages)
+    return {
+        'environment': environment(classifier, args),
+        'pages': pages,
+        'summary': {**summary, 'accuracy': round(correct / len(pages), 3)}
+    }
+
+
+def page_key(page):
+    return (page['kind'], page['dpi'], page['format'], page['index'])
+
+
+def compare(baseline, current):
+    """Imprimir la variación de la mediana por etapa respecto a una ejecución anterior"""
+    print(f"\nComparación con {baseline['environment']['timestamp']} "
+          f"(clasificador {baseline['environment']['classifier_version']}):")
+    print(f"{'etapa':30}{'antes':>12}{'ahora':>12}{'cambio':>10}")
+    for stage in STAGES:
+        before = baseline['summary'].get(stage, {}).get('median_ms')
+        after = current['summary'][stage]['median_ms']
+        if before:
+            print(f"{stage:30}{before:10.1f}ms{after:10.1f}ms{(after / before - 1) * 100:+9.1f}%")
+
+    previous = {page_key(page): page for page in baseline['pages']}
+    changed = [
+        (page, previous[page_key(page)]['type']) for page in current['pages']
+        if page_key(page) in previous and previous[page_key(page)]['type'] != page['type']
+    ]
+    for page, before in changed:
+        print(f"  clasificación cambiada: {page['kind']} {page['dpi']}dpi {page['format']} "
+              f"#{page['index']}: {before} -> {page['type']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--kinds', nargs='+', default=list(PAGE_KINDS), choices=PAGE_KINDS)
+    parser.add_argument('--dpi', nargs='+', type=int, default=[150, 300])
+    parser.add_argument('--formats', nargs='+', default=['jpeg', 'tiff', 'png'], choices=list(FORMATS))
+    parser.add_argument('--pages', type=int, default=1, help='Páginas por tipo y resolución')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--proxy', type=int, default=Config.ANALYSIS_MAX_DIMENSION,
+                        help='Lado mayor mínimo del proxy de análisis (0 = resolución completa)')
+    parser.add_argument('--output', help='Archivo JSON de resultados')
+    parser.add_argument('--compare', help='JSON de una ejecución anterior con el que comparar')
+    args = parser.parse_args()
+
+    results = run(args)
+
+    print(f"{len(results['pages'])} páginas, mediana por página:")
+    print(f"{'etapa':30}{'mín':>10}{'mediana':>10}{'máx':>10}")
+    for stage in STAGES:
+        medians = [page['stages'][stage]['median_ms'] for page in results['pages']]
+        print(f"{stage:30}{min(medians):8.1f}ms{statistics.median(medians):8.1f}ms{max(medians):8.1f}ms")
+    print(f"clasificación esperada: {results['summary']['accuracy']:.0%} de las páginas")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(json.load(f), results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados guardados en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
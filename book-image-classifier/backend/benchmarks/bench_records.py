@@ -0,0 +1,119 @@
+"""
+Benchmark de memoria de los registros de imágenes.
+
+Crea una base de datos temporal con N registros sintéticos y compara, para
+la lectura completa de ImageStore.list(), la memoria retenida por los
+registros como dicts (representación anterior) y como ImageRecord, el tiempo
+de lectura y el de serialización a JSON. Comprueba además que ambos
+producen el mismo JSON.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_records --records 100000
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+from models.image_record import ImageRecord
+from models.image_store import FIELDS, ImageStore
+
+TYPES = ['texto', 'texto', 'texto', 'ilustracion', 'pagina_blanca', 'portada', 'imagen_calibracion', 'inserto']
+
+
+def make_records(count, seed=0):
+    """Registros con la forma de build_image_record para un libro escaneado"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        image_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        filename = f'libro_{i // 500:04d}_{i % 500 + 1:05d}.tif'
+        yield {
+            'id': image_id,
+            'original_filename': filename,
+            'filepath': f'/srv/book-image-classifier/backend/uploads/{image_id}_{filename}',
+            'type': rng.choice(TYPES),
+            'confidence': round(rng.uniform(0.5, 1.0), 3),
+            'validated': rng.random() < 0.3,
+            'page_number': i % 500 + 1,
+            'number_type': 'arabic',
+            'number_exception': '',
+            'phantom_number': False,
+            'created_at': (start + timedelta(seconds=i)).isoformat(),
+            'width': 4960,
+            'height': 7016,
+            'format': 'TIFF',
+            'mode': 'RGB',
+            'size_bytes': rng.randint(20_000_000, 110_000_000),
+            'has_transparency': False,
+            'dpi': (600.0, 600.0),
+            'content_hash': '%064x' % rng.getrandbits(256),
+        }
+
+
+def as_dicts(store):
+    """Lectura con la representación anterior: un dict por registro"""
+    rows = store._connection().execute(f"SELECT {', '.join(FIELDS)} FROM images ORDER BY original_filename, id")
+    return [{field: ImageStore._decode(field, value) for field, value in zip(FIELDS, row)} for row in rows]
+
+
+def measure(load):
+    """Memoria retenida por el resultado de load() y tiempo de la carga"""
+    # El tiempo se mide sin tracemalloc, que ralentiza cada asignación
+    gc.collect()
+    start = time.perf_counter()
+    records = load()
+    elapsed = time.perf_counter() - start
+    del records
+
+    gc.collect()
+    tracemalloc.start()
+    records = load()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return records, retained, elapsed
+
+
+def to_json(records):
+    start = time.perf_counter()
+    data = json.dumps(records, default=lambda o: o.to_dict() if isinstance(o, ImageRecord) else list(o), sort_keys=True)
+    return data, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ImageStore(os.path.join(tmp, 'images.sqlite3'))
+        store.add_many(make_records(args.records))
+
+        results = {}
+        for name, load in (('dict', lambda: as_dicts(store)), ('ImageRecord', store.list)):
+            records, retained, elapsed = measure(load)
+            data, json_s = to_json(records)
+            results[name] = {'retained': retained, 'load_s': elapsed, 'json_s': json_s, 'json': data}
+            del records
+
+    same_json = results['dict']['json'] == results['ImageRecord']['json']
+    print(f"{args.records} registros (JSON idéntico: {'sí' if same_json else 'NO'})")
+    print(f"{'':14}{'memoria':>12}{'por registro':>15}{'lectura':>11}{'JSON':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:14}{result['retained'] / 1024 ** 2:10.1f}MB{result['retained'] / args.records:13.0f} B"
+            f"{result['load_s'] * 1000:9.0f}ms{result['json_s'] * 1000:8.0f}ms"
+        )
+    saved = 1 - results['ImageRecord']['retained'] / results['dict']['retained']
+    print(f"ahorro de memoria: {saved:.0%}")
+
+
+if __name__ == '__main__':
+    main()
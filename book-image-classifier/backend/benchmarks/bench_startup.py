@@ -0,0 +1,87 @@
+"""
+Benchmark de arranque del servidor.
+
+Mide en procesos nuevos el tiempo de importar app.py (lo que paga cada
+reinicio de worker), qué módulos pesados quedan cargados tras la importación,
+el sondeo OCR sin caché y con caché, y el tiempo de la precarga (warm_up).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_startup --repeat 5 --workers 2
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('cv2', 'numpy', 'pytesseract', 'PIL.Image')
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({'import_s': elapsed, 'loaded': [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+PROBE_SCRIPT = """
+import json, sys, time
+from utils.ocr_probe import probe_ocr
+start = time.perf_counter()
+probe_ocr(sys.argv[1])
+print(json.dumps({'probe_s': time.perf_counter() - start}))
+"""
+
+WARM_UP_SCRIPT = """
+import json, time
+import app
+start = time.perf_counter()
+result = app.warm_up()
+app.processing_pool.shutdown()
+print(json.dumps({'warm_up_s': time.perf_counter() - start, 'workers': result['workers']}))
+"""
+
+
+def run(script, env, *args):
+    completed = subprocess.run(
+        [sys.executable, '-c', script, *args], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=2, help='Procesos del pool para la precarga')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        probe_path = os.path.join(tmp, 'ocr_probe.json')
+        env = {
+            **os.environ,
+            'DATABASE_PATH': os.path.join(tmp, 'images.sqlite3'),
+            'CLASSIFICATION_CACHE_PATH': os.path.join(tmp, 'classification.sqlite3'),
+            'OCR_PROBE_CACHE_PATH': probe_path,
+            'PROCESSING_WORKERS': str(args.workers),
+            'WARM_UP_ON_START': '',
+        }
+
+        imports = [run(IMPORT_SCRIPT, env) for _ in range(args.repeat)]
+        probe_cold = run(PROBE_SCRIPT, env, probe_path)['probe_s']
+        probe_cached = min(run(PROBE_SCRIPT, env, probe_path)['probe_s'] for _ in range(args.repeat))
+        warm = run(WARM_UP_SCRIPT, env)
+
+    best_import = min(result['import_s'] for result in imports)
+    print(f"import app:           {best_import * 1000:8.1f} ms (mejor de {args.repeat})")
+    print(f"  módulos pesados cargados: {', '.join(imports[0]['loaded']) or 'ninguno'}")
+    print(f"sondeo OCR sin caché: {probe_cold * 1000:8.1f} ms")
+    print(f"sondeo OCR con caché: {probe_cached * 1000:8.1f} ms")
+    print(f"warm_up ({warm['workers']} procesos):  {warm['warm_up_s'] * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
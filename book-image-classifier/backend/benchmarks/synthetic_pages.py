@@ -0,0 +1,190 @@
+"""
+Generador determinista de páginas de libro sintéticas para los benchmarks.
+
+Cada página depende solo de (tipo, dpi, índice): dos ejecuciones en máquinas
+distintas generan exactamente los mismos píxeles, de modo que los tiempos de
+distintas versiones del clasificador son comparables.
+
+Tipos de página:
+    blank         Página en blanco uniforme
+    noisy_blank   Casi en blanco: tono de papel, grano, motas y transparencia
+    text          Texto denso a una columna
+    illustration  Ilustración a color (degradados y formas)
+    it8           Carta de calibración tipo IT8.7 (22 x 12 parches y rampa de grises)
+"""
+import os
+import zlib
+
+import cv2
+import numpy as np
+
+A4_INCHES = (8.27, 11.69)
+
+PAGE_KINDS = ('blank', 'noisy_blank', 'text', 'illustration', 'it8')
+
+# Formato -> (extensión, parámetros de cv2.imwrite)
+FORMATS = {
+    'jpeg': ('.jpg', [cv2.IMWRITE_JPEG_QUALITY, 90]),
+    'tiff': ('.tif', [cv2.IMWRITE_TIFF_COMPRESSION, 1]),   # sin compresión, como los másteres de digitalización
+    'png': ('.png', [cv2.IMWRITE_PNG_COMPRESSION, 3]),
+}
+
+
+def page_seed(kind, dpi, index):
+    """Semilla estable (no depende de PYTHONHASHSEED) de una página"""
+    return zlib.crc32(f'{kind}:{dpi}:{index}'.encode('ascii'))
+
+
+def page_size(dpi):
+    """Tamaño (ancho, alto) en píxeles de una página A4"""
+    return int(A4_INCHES[0] * dpi), int(A4_INCHES[1] * dpi)
+
+
+def _paper(rng, width, height, tone=240, grain=0):
+    page = np.full((height, width, 3), tone, dtype=np.uint8)
+    if grain:
+        page -= rng.integers(0, grain, size=(height, width, 1), dtype=np.uint8)
+    return page
+
+
+def _blank(rng, width, height, scale):
+    return _paper(rng, width, height, tone=250)
+
+
+def _noisy_blank(rng, width, height, scale):
+    page = _paper(rng, width, height, tone=238, grain=14)
+    # Motas de polvo
+    for _ in range(40):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        cv2.circle(page, center, max(1, int(rng.integers(1, 3) * scale)), (120, 120, 120), -1)
+    # Transparencia del texto del reverso, muy tenue
+    line_height = int(28 * scale)
+    for y in range(int(height * 0.1), int(height * 0.9), line_height * 2):
+        cv2.line(page, (int(width * 0.12), y), (int(width * 0.88), y), (228, 228, 228), max(1, int(4 * scale)))
+    return page
+
+
+def _text(rng, width, height, scale):
+    page = _paper(rng, width, height, tone=235, grain=12)
+    line_height = int(28 * scale)
+    for y in range(int(height * 0.1), int(height * 0.9), line_height):
+        words = ' '.join('lorem' if rng.random() > 0.5 else 'ipsum' for _ in range(12))
+        cv2.putText(page, words, (int(width * 0.1), y), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.6 * scale, (30, 30, 30), max(1, int(scale)))
+    return page
+
+
+def _illustration(rng, width, height, scale):
+    # Fondo en degradado de dos colores
+    top, bottom = rng.integers(40, 220, size=(2, 3))
+    ramp = np.linspace(0, 1, height, dtype=np.float32)[:, None, None]
+    page = (top * (1 - ramp) + bottom * ramp).astype(np.uint8)
+    page = np.ascontiguousarray(np.broadcast_to(page, (height, width, 3)))
+    for _ in range(30):
+        color = tuple(int(c) for c in rng.integers(0, 256, size=3))
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        axes = (int(rng.integers(20, 200) * scale), int(rng.integers(20, 200) * scale))
+        cv2.ellipse(page, center, axes, float(rng.integers(0, 180)), 0, 360, color, -1)
+    for _ in range(15):
+        points = rng.integers(0, [width, height], size=(5, 2)).astype(np.int32)
+        color = tuple(int(c) for c in rng.integers(0, 256, size=3))
+        cv2.fillPoly(page, [points], color)
+    return cv2.GaussianBlur(page, (0, 0), 1.5 * scale)
+
+
+def _it8(rng, width, height, scale):
+    page = _paper(rng, width, height, tone=245)
+    columns, rows = 22, 12
+    margin_x, margin_y = int(width * 0.08), int(height * 0.3)
+    chart_width, chart_height = width - 2 * margin_x, int(height * 0.35)
+    patch_w, patch_h = chart_width // columns, chart_height // (rows + 1)
+    gap = max(1, int(2 * scale))
+    cv2.rectangle(page, (margin_x - gap * 4, margin_y - gap * 4),
+                  (margin_x + chart_width + gap * 4, margin_y + chart_height + gap * 4), (90, 90, 90), -1)
+    for row in range(rows):
+        # Parches de tono y saturación variables por fila, como la zona de color de una IT8.7
+        hue = np.linspace(0, 179, columns, dtype=np.float32)
+        hsv = np.stack([hue, np.full(columns, 60 + row * 16), np.full(columns, 90 + (row % 4) * 40)], axis=1)
+        colors = cv2.cvtColor(hsv.astype(np.uint8)[None], cv2.COLOR_HSV2BGR)[0]
+        for column in range(columns):
+            x, y = margin_x + column * patch_w, margin_y + row * patch_h
+            cv2.rectangle(page, (x + gap, y + gap), (x + patch_w - gap, y + patch_h - gap),
+                          tuple(int(c) for c in colors[column]), -1)
+    # Rampa de grises inferior
+    y = margin_y + rows * patch_h
+    for column in range(columns):
+        level = int(column * 255 / (columns - 1))
+        x = margin_x + column * patch_w
+        cv2.rectangle(page, (x + gap, y + gap), (x + patch_w - gap, y + patch_h - gap), (level, level, level), -1)
+    return page
+
+
+_GENERATORS = {
+    'blank': _blank,
+    'noisy_blank': _noisy_blank,
+    'text': _text,
+    'illustration': _illustration,
+    'it8': _it8,
+}
+
+
+def make_page(kind, dpi, index=0):
+    """
+    Generar una página A4 sintética
+
+    Args:
+        kind (str): Tipo de página (PAGE_KINDS)
+        dpi (int): Resolución
+        index (int): Número de página; cambia el contenido aleatorio
+
+    Returns:
+        numpy.ndarray: Imagen BGR
+    """
+    if kind not in _GENERATORS:
+        raise ValueError(f'Tipo de página desconocido: {kind}')
+    rng = np.random.default_rng(page_seed(kind, dpi, index))
+    width, height = page_size(dpi)
+    return _GENERATORS[kind](rng, width, height, dpi / 150)
+
+
+def write_page(image, path_without_extension, image_format):
+    """
+    Guardar una página en un formato
+
+    Returns:
+        str: Ruta del archivo escrito
+    """
+    extension, params = FORMATS[image_format]
+    path = path_without_extension + extension
+    if not cv2.imwrite(path, image, params):
+        raise OSError(f'No se pudo escribir {path}')
+    return path
+
+
+def generate_pages(output_dir, kinds=PAGE_KINDS, dpis=(300,), formats=('jpeg',), pages=1):
+    """
+    Generar un conjunto de páginas en disco
+
+    Args:
+        output_dir (str): Directorio de salida
+        kinds (iterable): Tipos de página
+        dpis (iterable): Resoluciones
+        formats (iterable): Formatos de archivo (FORMATS)
+        pages (int): Páginas por combinación de tipo y resolución
+
+    Returns:
+        list: [{'path', 'kind', 'dpi', 'format', 'index', 'width', 'height', 'bytes'}]
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    generated = []
+    for kind in kinds:
+        for dpi in dpis:
+            for index in range(pages):
+                image = make_page(kind, dpi, index)
+                for image_format in formats:
+                    path = write_page(image, os.path.join(output_dir, f'{kind}_{dpi}dpi_{index:03d}'), image_format)
+                    generated.append({
+                        'path': path, 'kind': kind, 'dpi': dpi, 'format': image_format, 'index': index,
+                        'width': image.shape[1], 'height': image.shape[0], 'bytes': os.path.getsize(path)
+                    })
+    return generated
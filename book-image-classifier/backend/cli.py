@@ -0,0 +1,242 @@
+"""
+Procesamiento por lotes de carpetas de digitalización, sin servidor ni navegador.
+
+Recorre un árbol de directorios; cada carpeta con imágenes es un libro
+(p. ej. BO0624_001). Las páginas de todos los libros se clasifican en el pool
+de procesos del servidor (con su caché de clasificación) y cada libro se
+numera con PageNumbering cuando terminan sus páginas. La salida de cada libro
+va a <salida>/<carpeta relativa>/:
+
+    copy   Copias renombradas ("<nombre> <tipo> p <número>.<ext>") y metadata.json
+    json   Solo metadata.json
+
+El avance se guarda en un manifiesto JSON Lines (por defecto
+<salida>/manifest.jsonl): al relanzar el mismo comando tras una interrupción
+solo se analizan las páginas nuevas, modificadas o que fallaron.
+
+Uso (desde backend/):
+    python cli.py /scans/2024 /salida/2024 --pattern 'BO0624_*' --workers 8
+    python cli.py /scans/2024 /salida/2024 --mode json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from collections import Counter
+from fnmatch import fnmatch
+
+from config import Config
+from models.page_numbering import PageNumbering
+from utils.batch_manifest import BatchManifest
+from utils.naming import generate_new_filename
+from utils.processing_pool import ProcessingPool, analyze_image
+
+# Campos de cada página en metadata.json
+METADATA_FIELDS = [
+    'original_filename', 'new_filename', 'type', 'confidence', 'page_number', 'number_type',
+    'phantom_number', 'width', 'height', 'format', 'dpi', 'content_hash'
+]
+
+
+def find_books(source, pattern=None):
+    """
+    Carpetas con imágenes bajo source, en orden
+
+    Args:
+        source (str): Directorio raíz
+        pattern (str): Opcional, patrón (fnmatch) del nombre de las carpetas
+
+    Yields:
+        tuple: (carpeta relativa a source, lista ordenada de nombres de archivo)
+    """
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        if pattern and not fnmatch(os.path.basename(root), pattern):
+            continue
+        images = sorted(
+            name for name in files
+            if not name.startswith('.') and name.rsplit('.', 1)[-1].lower() in Config.ALLOWED_EXTENSIONS
+        )
+        if images:
+            yield os.path.relpath(root, source), images
+
+
+def write_book(source_dir, output_dir, files, pages, mode, previous_outputs=()):
+    """
+    Numerar las páginas analizadas de un libro y escribir su salida
+
+    Args:
+        source_dir (str): Carpeta del libro
+        output_dir (str): Carpeta de salida del libro
+        files (list): Archivos del libro, en orden
+        pages (dict): {archivo: entrada del manifiesto} de las páginas analizadas
+        mode (str): 'copy' o 'json'
+        previous_outputs (iterable): Copias de una ejecución anterior, que se
+            eliminan si ya no corresponden a ninguna página
+
+    Returns:
+        list: Registros numerados de las páginas
+    """
+    records = [
+        {
+            'id': filename, 'original_filename': filename, 'type': pages[filename]['type'],
+            'confidence': pages[filename]['confidence'], 'content_hash': pages[filename]['content_hash'],
+            **pages[filename]['image_info']
+        }
+        for filename in files if filename in pages
+    ]
+    PageNumbering().auto_number_pages(records)
+
+    os.makedirs(output_dir, exist_ok=True)
+    for record in records:
+        record['new_filename'] = generate_new_filename(record)
+        if mode == 'copy':
+            shutil.copy2(os.path.join(source_dir, record['id']), os.path.join(output_dir, record['new_filename']))
+
+    # Una página reclasificada cambia de nombre: se elimina su copia anterior
+    stale = set(previous_outputs) - {record['new_filename'] for record in records}
+    for filename in stale:
+        path = os.path.join(output_dir, filename)
+        if os.path.isfile(path):
+            os.remove(path)
+
+    metadata_path = os.path.join(output_dir, 'metadata.json')
+    with open(f'{metadata_path}.part', 'w', encoding='utf-8') as f:
+        json.dump([{field: record.get(field) for field in METADATA_FIELDS} for record in records], f,
+                  indent=4, ensure_ascii=False)
+    os.replace(f'{metadata_path}.part', metadata_path)
+    return records
+
+
+def run(args):
+    """
+    Procesar todos los libros pendientes
+
+    Returns:
+        dict: Contadores de la ejecución (libros, páginas, en caché, fallos, segundos)
+    """
+    manifest = BatchManifest(args.manifest or os.path.join(args.output, 'manifest.jsonl'))
+    # Con procesos de clasificación cada uno tiene su propio motor OCR: el servicio
+    # (procesos OCR_WORKERS) solo se usa al clasificar en el proceso actual
+    ocr_service = None
+    if args.workers == 0:
+        from utils.ocr_service import OCRService
+
+        ocr_service = OCRService.from_config(Config.OCR_CONFIG, Config.OCR_WORKERS)
+    pool = ProcessingPool(
+        args.workers,
+        Config.ANALYSIS_MAX_DIMENSION,
+        None if args.no_cache else args.cache,
+        Config.CLASSIFICATION_CACHE_MAX_ENTRIES,
+        {
+            'calibration_grid': Config.CALIBRATION_GRID,
+            'text_gate': Config.TEXT_GATE,
+            'ocr_config': Config.OCR_CONFIG,
+            'ocr_probe_path': Config.OCR_PROBE_CACHE_PATH
+        },
+        ocr_service=ocr_service
+    )
+    totals = Counter()
+    start = time.perf_counter()
+
+    # Libros con páginas por analizar o cuya salida no está completa
+    plan = []
+    for book, files in find_books(args.source, args.pattern):
+        book_dir = os.path.join(args.source, book)
+        stats = {filename: os.stat(os.path.join(book_dir, filename)) for filename in files}
+        pending = [filename for filename in files if manifest.page(book, filename, stats[filename]) is None]
+        if pending or not manifest.book_done(book, len(files)):
+            plan.append((book, files, stats, pending))
+        else:
+            totals['skipped_books'] += 1
+
+    # Un único flujo de páginas para todos los libros: el pool no espera al final de cada libro
+    results = pool.imap(analyze_image, (
+        (os.path.join(args.source, book, filename), filename)
+        for book, _, _, pending in plan for filename in pending
+    ))
+
+    try:
+        for book, files, stats, pending in plan:
+            failed = 0
+            for filename in pending:
+                analysis = next(results)
+                if isinstance(analysis, Exception):
+                    print(f"  {book}/{filename}: {analysis}", file=sys.stderr)
+                    manifest.record_page(book, filename, stats[filename], error=str(analysis))
+                    failed += 1
+                    continue
+                manifest.record_page(
+                    book, filename, stats[filename],
+                    type=analysis['classification']['type'],
+                    confidence=analysis['classification']['confidence'],
+                    content_hash=analysis['content_hash'],
+                    image_info=analysis['image_info'],
+                    cached=analysis['cached']
+                )
+                totals['cached'] += analysis['cached']
+            totals['pages'] += len(pending) - failed
+            totals['failed'] += failed
+
+            pages = {}
+            for filename in files:
+                entry = manifest.page(book, filename, stats[filename])
+                if entry is not None:
+                    pages[filename] = entry
+            previous = manifest.books.get(book, {}).get('outputs', [])
+            records = write_book(
+                os.path.join(args.source, book), os.path.join(args.output, book), files, pages, args.mode, previous
+            )
+            manifest.record_book(
+                book, len(files), failed=len(files) - len(records),
+                outputs=[record['new_filename'] for record in records] if args.mode == 'copy' else []
+            )
+            totals['books'] += 1
+            types = Counter(record['type'] for record in records)
+            print(f"{book}: {len(records)} páginas ({', '.join(f'{t} {n}' for t, n in types.most_common())})"
+                  + (f", {len(files) - len(records)} con error" if len(files) > len(records) else ''))
+    finally:
+        manifest.close()
+        pool.shutdown()
+        if ocr_service is not None:
+            ocr_service.close()
+
+    totals['seconds'] = time.perf_counter() - start
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='Directorio con las carpetas de los libros')
+    parser.add_argument('output', help='Directorio de salida')
+    parser.add_argument('--pattern', help="Procesar solo las carpetas cuyo nombre coincida (p. ej. 'BO0624_*')")
+    parser.add_argument('--mode', choices=['copy', 'json'], default='copy',
+                        help='copy: copias renombradas y metadata.json; json: solo metadata.json')
+    parser.add_argument('--workers', type=int, default=Config.PROCESSING_WORKERS,
+                        help='Procesos de clasificación (0 = en el proceso actual)')
+    parser.add_argument('--manifest', help='Ruta del manifiesto (por defecto <salida>/manifest.jsonl)')
+    parser.add_argument('--cache', default=Config.CLASSIFICATION_CACHE_PATH, help='Caché de clasificación')
+    parser.add_argument('--no-cache', action='store_true', help='No usar la caché de clasificación')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.source):
+        parser.error(f'No existe el directorio: {args.source}')
+
+    try:
+        totals = run(args)
+    except KeyboardInterrupt:
+        print('\nInterrumpido. Relanzar el mismo comando continúa desde el manifiesto.', file=sys.stderr)
+        sys.exit(130)
+
+    rate = totals['pages'] / totals['seconds'] if totals['seconds'] else 0
+    print(
+        f"\n{totals['books']} libros procesados ({totals['skipped_books']} ya completos), "
+        f"{totals['pages']} páginas analizadas ({totals['cached']} en caché), {totals['failed']} con error"
+    )
+    print(f"{totals['seconds']:.1f} s, {rate:.1f} páginas/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,8 +9,21 @@ class Config:
     UPLOAD_FOLDER = BASE_DIR / 'uploads'
     EXPORT_FOLDER = BASE_DIR / 'exports'
     
+    # Base de datos de registros de imágenes (SQLite)
+    DATABASE_PATH = os.environ.get('DATABASE_PATH', str(BASE_DIR / 'data' / 'images.sqlite3'))
+    
+    # Paginación de GET /api/images (?limit=&cursor=)
+    IMAGES_PAGE_SIZE = 500
+    IMAGES_MAX_PAGE_SIZE = 5000
+    
     # Límites de archivos
-    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB
+    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB por petición (también por fragmento)
+    
+    # Cargas por fragmentos (/api/uploads): cada archivo se escribe en UPLOAD_FOLDER
+    # a medida que llegan los fragmentos y la carga se reanuda desde el último offset
+    CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024       # Tamaño de fragmento recomendado al cliente
+    CHUNKED_UPLOAD_MAX_SIZE = 10 * 1024 ** 3          # 10GB por archivo
+    CHUNKED_UPLOAD_TTL = 24 * 3600                    # Cargas sin actividad que se descartan
     
     # Extensiones permitidas
     ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'tiff', 'tif'}
@@ -18,6 +31,71 @@ class Config:
     # Configuración de clasificación
     CLASSIFICATION_CONFIDENCE_THRESHOLD = 0.7
     
+    # Procesos de trabajo para clasificar imágenes en paralelo (0 = sin pool)
+    PROCESSING_WORKERS = int(os.environ.get('PROCESSING_WORKERS', os.cpu_count() or 1))
+    
+    # Proxy de análisis: los detectores de contenido trabajan sobre una versión
+    # reducida a 1/2, 1/4 o 1/8 cuyo lado mayor no baja de este valor (0 = resolución completa)
+    ANALYSIS_MAX_DIMENSION = int(os.environ.get('ANALYSIS_MAX_DIMENSION', 2000))
+    
+    # Grid (columnas, filas) para analizar la variedad de color de targets de calibración.
+    # Ej.: ColorChecker de 24 parches (6, 4), IT8.7 (22, 12)
+    CALIBRATION_GRID = (8, 8)
+    
+    # Estimación rápida de texto antes del OCR: con menos de no_text_words palabras
+    # estimadas se asume página sin texto; con text_words o más en min_lines líneas,
+    # página de texto. Solo los casos intermedios pasan por Tesseract.
+    TEXT_GATE = {'enabled': True, 'no_text_words': 2, 'text_words': 100, 'min_lines': 15}
+    
+    # Caché persistente de clasificación por hash de contenido (vacío = desactivada)
+    CLASSIFICATION_CACHE_PATH = os.environ.get('CLASSIFICATION_CACHE_PATH', str(BASE_DIR / 'cache' / 'classification.sqlite3'))
+    CLASSIFICATION_CACHE_MAX_ENTRIES = 200000
+    
+    # Caché en disco de miniaturas y previsualizaciones web (LRU acotada por tamaño)
+    DERIVATIVE_CACHE_DIR = os.environ.get('DERIVATIVE_CACHE_DIR', str(BASE_DIR / 'cache' / 'derivatives'))
+    DERIVATIVE_CACHE_MAX_BYTES = int(os.environ.get('DERIVATIVE_CACHE_MAX_BYTES', 2 * 1024 ** 3))  # 2GB
+    THUMBNAIL_SIZE = (200, 200)
+    PREVIEW_WIDTHS = (600, 1200, 2000)   # ?w= se ajusta al ancho admitido más próximo por arriba
+    DERIVATIVES_EAGER = True             # Generar la miniatura al terminar la clasificación
+    DERIVATIVE_MAX_AGE = 365 * 24 * 3600  # Los derivados de una imagen no cambian nunca
+    
+    # Entrega de originales y exportaciones: ETag por hash de contenido, 304 y Range.
+    # Con USE_X_SENDFILE el servidor web frontal (nginx, Apache) envía el archivo.
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+    IMAGE_FILE_MAX_AGE = 24 * 3600   # Tras caducar se revalida con If-None-Match (304)
+    EXPORT_FILE_MAX_AGE = 24 * 3600
+    
+    # Exportación: por defecto el ZIP se genera mientras se descarga (sin pasar por
+    # EXPORT_FOLDER). La URL de descarga caduca tras EXPORT_STREAM_TTL segundos.
+    EXPORT_STREAMING = True
+    EXPORT_STREAM_TTL = 3600
+    EXPORT_WEB_WIDTH = 1200   # Ancho de las imágenes exportadas con imageFormat 'web'
+    
+    # Eventos de progreso (GET /api/events, Server-Sent Events): eventos pendientes
+    # como máximo por cliente (los clientes lentos se resincronizan) y segundos
+    # entre comentarios de mantenimiento de la conexión
+    EVENTS_BUFFER_SIZE = 1000
+    EVENTS_HEARTBEAT = 15
+    
+    # Métricas (GET /api/metrics, formato de Prometheus): duración de cada etapa
+    # del análisis, de las rutas y de la exportación, caché y OCR omitido.
+    # Desactivadas, la instrumentación no mide nada y la ruta responde 404.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    
+    # Carpeta vigilada (hot folder): cada HOT_FOLDER_INTERVAL segundos se buscan
+    # archivos nuevos o modificados; los que no cambian durante HOT_FOLDER_SETTLE_SECONDS
+    # se copian y clasifican en lotes. Cada subcarpeta de primer nivel se ingiere en
+    # el proyecto de su nombre (creado si no existe). Vacío = desactivada.
+    HOT_FOLDER = os.environ.get('HOT_FOLDER', '')
+    HOT_FOLDER_INTERVAL = int(os.environ.get('HOT_FOLDER_INTERVAL', 10))
+    HOT_FOLDER_SETTLE_SECONDS = int(os.environ.get('HOT_FOLDER_SETTLE_SECONDS', 5))
+    HOT_FOLDER_BATCH_SIZE = 200
+    HOT_FOLDER_STATE_PATH = os.environ.get('HOT_FOLDER_STATE_PATH', str(BASE_DIR / 'cache' / 'hot_folder.sqlite3'))
+    
+    # Trabajos en segundo plano (carga, numeración)
+    JOB_WORKERS = 2
+    JOB_HISTORY_LIMIT = 100     # Trabajos terminados que se conservan para consulta
+    
     # Patrones para detección automática
     FILENAME_PATTERNS = {
         'portada': ['00001', '_001', 'cover', 'portada'],
@@ -34,6 +112,19 @@ class Config:
         'oem': 3            # Modo de motor OCR
     }
     
+    # Caché en disco del sondeo de Tesseract (ejecutable, versión e idiomas)
+    OCR_PROBE_CACHE_PATH = os.environ.get('OCR_PROBE_CACHE_PATH', str(BASE_DIR / 'cache' / 'ocr_probe.json'))
+    
+    # Cargar el clasificador en los procesos de trabajo al arrancar, en segundo plano.
+    # Desactivado: se carga con el primer lote o al llamar a POST /api/warmup.
+    WARM_UP_ON_START = os.environ.get('WARM_UP_ON_START', '').lower() in ('1', 'true', 'yes')
+    
+    # Procesos OCR persistentes del servicio OCR que usa el clasificador cuando
+    # analiza en el proceso actual (PROCESSING_WORKERS = 0). Con el pool de
+    # procesos, cada proceso del pool tiene su propio motor OCR persistente
+    # (tesserocr), sin lanzar un proceso tesseract por página.
+    OCR_WORKERS = int(os.environ.get('OCR_WORKERS', 2))
+    
     # Umbrales para clasificación automática
     THRESHOLDS = {
         'white_page_threshold': 0.9,      # % de píxeles blancos
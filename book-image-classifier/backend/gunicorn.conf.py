@@ -0,0 +1,24 @@
+"""
+Configuración de gunicorn para producción (gunicorn la lee desde el directorio actual).
+
+Uso (desde backend/):
+    gunicorn wsgi:app
+
+La app guarda en la memoria de su proceso estado que no se comparte entre
+procesos: los trabajos (GET /api/jobs/<id>), las sesiones de subida por partes
+y su desplazamiento, las exportaciones en streaming pendientes, el bus de
+eventos de GET /api/events y los índices de numeración de cada proyecto. Por
+eso se sirve con un único proceso y varios hilos; el trabajo pesado
+(clasificación y OCR) ya se reparte en el pool de procesos de la app.
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+
+# Un único proceso: no aumentar sin llevar antes ese estado a almacenamiento compartido
+workers = 1
+
+# Cada conexión abierta de GET /api/events ocupa un hilo mientras dura:
+# threads debe cubrir esas conexiones además de las peticiones normales
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
@@ -0,0 +1,252 @@
+import io
+import math
+from functools import cached_property
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Factores de reducción admitidos y su decodificación escalada (DCT) para JPEG
+PROXY_FACTORS = (8, 4, 2)
+REDUCED_DECODE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+# Laplaciano de la estimación de ruido de Immerkær (ver noise_sigma)
+NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+# Umbrales Canny de los bordes excluidos de la estimación
+NOISE_EDGES = (30, 100)
+
+
+class ImageAnalysisContext:
+    """
+    Contexto de análisis de una página.
+
+    Lee el archivo una sola vez y calcula bajo demanda (como máximo una vez)
+    la imagen decodificada, la escala de grises, los histogramas y los mapas
+    de bordes que comparten todos los detectores del clasificador.
+
+    Con proxy_max_dimension los detectores trabajan sobre un proxy reducido a
+    1/2, 1/4 o 1/8 cuyo lado mayor no baja de ese valor. Los JPEG se decodifican
+    directamente a escala reducida (DCT). PNG y TIFF se decodifican completos y
+    se reducen con INTER_AREA: su compresión no permite saltarse la
+    decodificación, y con IMREAD_REDUCED_* OpenCV también decodifica todo y
+    luego reduce sin promediar cada bloque (ahorra poco y el proxy conserva un
+    ruido distinto al que supone la compensación del histograma).
+    La imagen completa solo se decodifica si alguien la pide (p. ej. el OCR).
+
+    Las estadísticas de intensidad (desviación, rango, entropía) se calculan
+    sobre un histograma compensado por el ruido que promedia la reducción
+    (ver gray_hist), de modo que coinciden con las de la imagen completa.
+    """
+
+    def __init__(self, image_path, image=None, proxy_max_dimension=None):
+        """
+        Args:
+            image_path (str): Ruta a la imagen
+            image (numpy.ndarray): Imagen BGR ya decodificada a resolución completa (opcional)
+            proxy_max_dimension (int): Lado mayor mínimo del proxy de análisis (None = sin proxy)
+        """
+        self.image_path = image_path
+        self.proxy_max_dimension = proxy_max_dimension
+        self._edges = {}
+        if image is not None:
+            self.__dict__['full_image'] = image
+
+    @cached_property
+    def data(self):
+        """Contenido del archivo en bytes"""
+        with open(self.image_path, 'rb') as f:
+            return f.read()
+
+    @cached_property
+    def full_image(self):
+        """Imagen BGR a resolución completa (None si no se puede decodificar)"""
+        buffer = np.frombuffer(self.data, dtype=np.uint8)
+        return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+    @cached_property
+    def full_size(self):
+        """Tamaño (ancho, alto) de la imagen a resolución completa"""
+        if 'full_image' in self.__dict__:
+            height, width = self.full_image.shape[:2]
+            return width, height
+        return self.image_info['width'], self.image_info['height']
+
+    @cached_property
+    def proxy_factor(self):
+        """Factor de reducción del proxy de análisis (1 = resolución completa)"""
+        if not self.proxy_max_dimension:
+            return 1
+        try:
+            long_edge = max(self.full_size)
+        except Exception:
+            return 1
+
+        for factor in PROXY_FACTORS:
+            if long_edge / factor >= self.proxy_max_dimension:
+                return factor
+        return 1
+
+    @cached_property
+    def image(self):
+        """Imagen BGR de análisis (proxy reducido o resolución completa)"""
+        factor = self.proxy_factor
+        if factor == 1:
+            return self.full_image
+
+        if 'full_image' not in self.__dict__ and self.image_info['format'] == 'JPEG':
+            buffer = np.frombuffer(self.data, dtype=np.uint8)
+            return cv2.imdecode(buffer, REDUCED_DECODE_FLAGS[factor])
+
+        full = self.full_image
+        if full is None:
+            return None
+        # Promedio exacto de bloques factor x factor (se descartan como mucho factor - 1
+        # filas y columnas del borde): así el ruido se atenúa como supone gray_hist
+        height, width = full.shape[:2]
+        height, width = height - height % factor, width - width % factor
+        return cv2.resize(full[:height, :width], (width // factor, height // factor), interpolation=cv2.INTER_AREA)
+
+    @cached_property
+    def scale(self):
+        """Escala lineal del proxy respecto a la imagen completa (<= 1)"""
+        if self.proxy_factor == 1:
+            return 1.0
+        # Se comparan lados mayores: la decodificación puede aplicar la orientación EXIF
+        return max(self.image.shape[:2]) / max(self.full_size)
+
+    @cached_property
+    def gray(self):
+        """Imagen de análisis en escala de grises"""
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def full_gray(self):
+        """Imagen completa en escala de grises (para OCR)"""
+        if self.proxy_factor == 1:
+            return self.gray
+        return cv2.cvtColor(self.full_image, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def noise_sigma(self):
+        """
+        Desviación típica del ruido de la imagen de análisis (método de Immerkær)
+
+        Media del valor absoluto de un laplaciano que anula los gradientes
+        lineales, fuera de los bordes (el mismo mapa Canny que usa la detección
+        de páginas blancas) y de sus vecinos, donde el texto dominaría la medida.
+        """
+        gray = self.gray
+        if min(gray.shape[:2]) < 3:
+            return 0.0
+        response = cv2.filter2D(gray, cv2.CV_16S, NOISE_KERNEL)[1:-1, 1:-1]
+        mask = cv2.dilate(self.edges(*NOISE_EDGES), np.ones((3, 3), np.uint8))[1:-1, 1:-1] == 0
+        count = np.count_nonzero(mask)
+        if not count:
+            return 0.0
+        return math.sqrt(math.pi / 2) * cv2.norm(response, cv2.NORM_L1, mask.view(np.uint8)) / (6 * count)
+
+    @cached_property
+    def gray_hist(self):
+        """
+        Histograma de 256 niveles de la escala de grises, estimado a resolución completa
+
+        Reducir la imagen promedia bloques de píxeles y atenúa el ruido (grano
+        del papel o del sensor) en un factor igual a la reducción: la desviación
+        típica, el rango y la entropía de una página casi en blanco serían
+        menores en el proxy que en la imagen completa. Con proxy, el histograma
+        se convoluciona con una gaussiana de la varianza de ruido perdida y se
+        escala al número de píxeles de la imagen completa.
+        """
+        hist = cv2.calcHist([self.gray], [0], None, [256], [0, 256]).ravel()
+        if self.proxy_factor == 1:
+            return hist
+
+        factor = 1 / self.scale
+        # El redondeo a enteros del proxy añade ruido (varianza 1/12) que no se reduce con él
+        noise_variance = max(self.noise_sigma ** 2 - 1 / 12, 0)
+        lost_sigma = math.sqrt(noise_variance * max(factor ** 2 - 1, 0))
+        if lost_sigma > 0.1:
+            radius = math.ceil(4 * lost_sigma)
+            offsets = np.arange(-radius, radius + 1)
+            kernel = np.exp(-0.5 * (offsets / lost_sigma) ** 2)
+            spread = np.convolve(hist, kernel / kernel.sum())
+            # Los niveles fuera de 0-255 se saturan, como al guardar la imagen
+            hist = spread[radius:radius + 256].copy()
+            hist[0] += spread[:radius].sum()
+            hist[-1] += spread[radius + 256:].sum()
+        return hist * factor ** 2
+
+    @cached_property
+    def color_hist(self):
+        """Histograma de color 8x8x8"""
+        return cv2.calcHist([self.image], [0, 1, 2], None, [8, 8, 8], [0, 256, 0, 256, 0, 256])
+
+    @cached_property
+    def gray_stats(self):
+        """Estadísticas de intensidad derivadas del histograma (sin recorrer la imagen)"""
+        hist = self.gray_hist
+        total = hist.sum()
+        levels = np.arange(256, dtype=np.float64)
+        # Niveles con al menos un píxel esperado (el histograma estimado no es entero)
+        nonzero = np.flatnonzero(hist >= 0.5)
+
+        mean = float(np.dot(hist, levels) / total)
+        variance = float(np.dot(hist, (levels - mean) ** 2) / total)
+
+        return {
+            'mean': mean,
+            'std': variance ** 0.5,
+            'min': int(nonzero[0]),
+            'max': int(nonzero[-1]),
+            'very_light_ratio': float(hist[241:].sum() / total)
+        }
+
+    def edges(self, low, high):
+        """
+        Mapa de bordes Canny, calculado una vez por par de umbrales
+
+        Args:
+            low (int): Umbral inferior
+            high (int): Umbral superior
+
+        Returns:
+            numpy.ndarray: Mapa de bordes
+        """
+        key = (low, high)
+        if key not in self._edges:
+            self._edges[key] = cv2.Canny(self.gray, low, high)
+        return self._edges[key]
+
+    def edge_density(self, low, high):
+        """
+        Proporción de píxeles de borde, normalizada a resolución completa
+
+        La longitud de los bordes escala con el lado de la imagen y el área con
+        su cuadrado, así que la densidad medida en el proxy se multiplica por la
+        escala para poder compararla con los umbrales de resolución completa.
+        """
+        edges = self.edges(low, high)
+        return np.count_nonzero(edges) / edges.size * self.scale
+
+    def scale_area(self, area):
+        """Convertir un área en píxeles de resolución completa al tamaño del proxy"""
+        return area * self.scale ** 2
+
+    @cached_property
+    def image_info(self):
+        """Información básica del archivo (cabecera leída desde los bytes ya cargados)"""
+        with Image.open(io.BytesIO(self.data)) as img:
+            return {
+                'width': img.width,
+                'height': img.height,
+                'format': img.format,
+                'mode': img.mode,
+                'size_bytes': len(self.data),
+                'has_transparency': img.mode in ('RGBA', 'LA') or 'transparency' in img.info,
+                # TIFF da la resolución como IFDRational, que no se puede serializar en JSON
+                'dpi': tuple(float(value) for value in img.info.get('dpi', (72, 72)))
+            }
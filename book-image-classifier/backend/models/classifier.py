@@ -1,15 +1,35 @@
 import cv2
 import numpy as np
-from PIL import Image
-import pytesseract
 import re
 import os
 from pathlib import Path
 
+from models.analysis_context import ImageAnalysisContext
+from utils.metrics import timed
+from utils.ocr_probe import probe_ocr, supports_languages
+from utils.ocr_service import OCRService
+
 class ImageClassifier:
     """Clasificador automático de páginas de libros"""
     
-    def __init__(self):
+    # Versión de las reglas de clasificación. Incrementarla al cambiar los
+    # detectores o sus umbrales invalida la caché de clasificación.
+    VERSION = '1.4'
+    
+    # Umbrales por defecto de la estimación de texto previa al OCR (ver _text_gate_decides)
+    DEFAULT_TEXT_GATE = {'enabled': True, 'no_text_words': 2, 'text_words': 100, 'min_lines': 15}
+    
+    def __init__(self, calibration_grid=8, text_gate=None, ocr_config=None, ocr_probe_path=None, ocr_service=None):
+        """
+        Args:
+            calibration_grid (int | tuple): Celdas del grid de análisis de color de
+                targets, como lado de un grid cuadrado o (columnas, filas)
+            text_gate (dict): Umbrales de la estimación de texto previa al OCR
+            ocr_config (dict): Configuración de Tesseract ({'lang', 'psm', 'oem'})
+            ocr_probe_path (str): Caché en disco del sondeo de capacidades OCR
+            ocr_service (OCRService): Servicio OCR compartido; si no se indica se
+                crea uno con ocr_config
+        """
         self.page_types = {
             'portada': 'portada',
             'contraportada': 'contraportada', 
@@ -23,52 +43,108 @@ class ImageClassifier:
             'referencia': 'referencia'
         }
         
+        if isinstance(calibration_grid, int):
+            calibration_grid = (calibration_grid, calibration_grid)
+        self.calibration_grid = tuple(calibration_grid)
+        self.text_gate = {**self.DEFAULT_TEXT_GATE, **(text_gate or {})}
+        
+        # Sin servicio compartido, motor OCR persistente del proceso (el clasificador
+        # ya vive en un proceso del pool, así que no se lanzan procesos OCR adicionales)
+        self.ocr = ocr_service or OCRService(workers=0, **(ocr_config or {}))
+        
         # Configurar Tesseract si está disponible
+        self.ocr_probe_path = ocr_probe_path
         self.ocr_available = self._check_ocr_availability()
     
     def _check_ocr_availability(self):
-        """Verificar si Tesseract está disponible"""
-        try:
-            pytesseract.image_to_string(Image.new('RGB', (100, 100), color='white'))
-            return True
-        except:
+        """Verificar si Tesseract y los idiomas configurados están disponibles"""
+        # Sondeo cacheado en disco: no se ejecuta Tesseract en cada arranque
+        probe = probe_ocr(self.ocr_probe_path, self.ocr.engine_options['tesseract_cmd'])
+        if not supports_languages(probe, self.ocr.engine_options['lang']):
             print("Warning: Tesseract OCR not available. Text detection will be limited.")
             return False
+        return True
     
-    def classify_image(self, image_path, original_filename):
+    def classify_image(self, image_path, original_filename, context=None, timings=None):
         """
         Clasificar una imagen automáticamente
         
         Args:
             image_path (str): Ruta a la imagen
             original_filename (str): Nombre original del archivo
+            context (ImageAnalysisContext): Contexto compartido de la página (opcional)
+            timings (dict): Opcional, acumula la duración en segundos de cada etapa
+                (decode, blank, color, text, ocr, calibration)
             
         Returns:
-            dict: {'type': str, 'confidence': float}
+            dict: {'type': str, 'confidence': float}, más 'ocr_skipped': bool
+                cuando se analizó el texto de la página (True si la estimación
+                de texto hizo innecesario el OCR) u 'ocr_unavailable': True si
+                no se pudo ejecutar el OCR por falta de Tesseract
+        """
+        return self.classify(image_path, original_filename, context, timings)[0]
+    
+    def classify(self, image_path, original_filename, context=None, timings=None):
+        """
+        Clasificar una imagen y devolver también su clasificación por contenido
+        
+        Args:
+            image_path (str): Ruta a la imagen
+            original_filename (str): Nombre original del archivo
+            context (ImageAnalysisContext): Contexto compartido de la página (opcional)
+            timings (dict): Opcional, acumula la duración en segundos de cada etapa
+            
+        Returns:
+            tuple: (clasificación de classify_image, clasificación por contenido).
+                La segunda no depende del nombre del archivo (es la que guarda la
+                caché de clasificación; ver combine_with_filename) y es None si el
+                nombre decidió sin analizar el contenido o si el análisis falló.
         """
         try:
             # Cargar imagen
-            image = cv2.imread(image_path)
+            context = context or ImageAnalysisContext(image_path)
+            with timed(timings, 'decode'):
+                image = context.image
             if image is None:
                 raise ValueError(f"Could not load image: {image_path}")
             
             # Análisis basado en nombre de archivo (alta confianza)
             filename_result = self._classify_by_filename(original_filename)
             if filename_result['confidence'] > 0.8:
-                return filename_result
+                return filename_result, None
             
             # Análisis de contenido de imagen
-            content_result = self._classify_by_content(image)
-            
-            # Combinar resultados
-            if filename_result['confidence'] > content_result['confidence']:
-                return filename_result
-            else:
-                return content_result
+            content_result = self._classify_by_content(context, timings)
+            return self.combine_with_filename(original_filename, content_result), content_result
                 
         except Exception as e:
             print(f"Classification error for {image_path}: {e}")
-            return {'type': 'texto', 'confidence': 0.1}  # Fallback
+            return {'type': 'texto', 'confidence': 0.1}, None  # Fallback
+    
+    def combine_with_filename(self, original_filename, content_result):
+        """
+        Combinar una clasificación por contenido (p. ej. de la caché) con la del nombre del archivo
+        
+        Args:
+            original_filename (str): Nombre original del archivo
+            content_result (dict): Clasificación por contenido devuelta por classify
+            
+        Returns:
+            dict: La misma clasificación que classify_image para ese nombre
+        """
+        filename_result = self._classify_by_filename(original_filename)
+        if filename_result['confidence'] > 0.8:
+            return filename_result
+        
+        # Combinar resultados
+        if filename_result['confidence'] > content_result['confidence']:
+            result = dict(filename_result)
+        else:
+            result = dict(content_result)
+        for key in ('ocr_skipped', 'ocr_unavailable'):
+            if key in content_result:
+                result[key] = content_result[key]
+        return result
     
     def _classify_by_filename(self, filename):
         """Clasificar basándose en patrones del nombre de archivo"""
@@ -98,66 +174,69 @@ class ImageClassifier:
         
         return {'type': 'texto', 'confidence': 0.3}
     
-    def _classify_by_content(self, image):
+    def _classify_by_content(self, context, timings=None):
         """Clasificar basándose en el contenido visual de la imagen"""
-        height, width = image.shape[:2]
-        
         # Análisis mejorado de páginas blancas
-        blank_result = self._detect_blank_page(image)
+        with timed(timings, 'blank'):
+            blank_result = self._detect_blank_page(context)
         if blank_result['is_blank']:
             return {'type': 'pagina_blanca', 'confidence': blank_result['confidence']}
         
-        # Detección de texto
-        text_info = self._detect_text(image)
-        
         # Análisis de color y complejidad
-        color_complexity = self._analyze_color_complexity(image)
+        with timed(timings, 'color'):
+            color_complexity = self._analyze_color_complexity(context)
+        
+        # Detección de texto (incluye el OCR, que además se mide aparte)
+        with timed(timings, 'text'):
+            text_info = self._detect_text(context, color_complexity, timings)
         
         # Detección de patrones de calibración
-        calibration_result = self._detect_calibration_target(image)
+        with timed(timings, 'calibration'):
+            calibration_result = self._detect_calibration_target(context)
         if calibration_result['is_calibration']:
-            return {'type': 'imagen_calibracion', 'confidence': calibration_result['confidence']}
-        
-        # Lógica de clasificación combinada
-        return self._combine_content_features(text_info, color_complexity, blank_result)
+            result = {'type': 'imagen_calibracion', 'confidence': calibration_result['confidence']}
+        else:
+            # Lógica de clasificación combinada
+            result = self._combine_content_features(text_info, color_complexity, blank_result)
+        
+        # Sin Tesseract no hay OCR que omitir: se informa aparte de la estimación de texto
+        if text_info.get('ocr_unavailable'):
+            return {**result, 'ocr_unavailable': True}
+        return {**result, 'ocr_skipped': text_info.get('ocr_skipped', False)}
     
-    def _detect_blank_page(self, image):
+    def _detect_blank_page(self, context):
         """
         Detección mejorada de páginas blancas usando múltiples criterios
         
         Args:
-            image: Imagen en formato OpenCV
+            context (ImageAnalysisContext): Contexto de análisis de la página
             
         Returns:
             dict: {'is_blank': bool, 'confidence': float, 'metrics': dict}
         """
-        # Convertir a escala de grises
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # Estadísticas de intensidad derivadas del histograma de grises
+        stats = context.gray_stats
         
         # Métrica 1: Desviación estándar de la intensidad
-        std_dev = np.std(gray.astype(np.float32))
+        std_dev = stats['std']
         
         # Métrica 2: Rango de intensidades
-        min_intensity = np.min(gray)
-        max_intensity = np.max(gray)
-        intensity_range = max_intensity - min_intensity
+        intensity_range = stats['max'] - stats['min']
         
         # Métrica 3: Análisis de histograma
-        hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
-        hist_norm = hist / hist.sum()
+        hist_norm = context.gray_hist / context.gray_hist.sum()
         
         # Calcular entropía del histograma (baja entropía = menos variación)
         entropy = -np.sum(hist_norm * np.log2(hist_norm + 1e-10))
         
         # Métrica 4: Detección de bordes
-        edges = cv2.Canny(gray, 30, 100)
-        edge_density = np.sum(edges > 0) / edges.size
+        edge_density = context.edge_density(30, 100)
         
         # Métrica 5: Porcentaje de píxeles muy claros
-        very_light_pixels = np.sum(gray > 240) / gray.size
+        very_light_pixels = stats['very_light_ratio']
         
         # Métrica 6: Media de intensidad
-        mean_intensity = np.mean(gray)
+        mean_intensity = stats['mean']
         
         # Criterios para página blanca (más restrictivos)
         metrics = {
@@ -202,41 +281,110 @@ class ImageClassifier:
             'metrics': metrics
         }
     
-    def _detect_text(self, image):
+    def _estimate_text(self, context):
+        """
+        Estimar la presencia de texto sin OCR a partir de componentes conexas
+        
+        Binariza el proxy, se queda con las componentes de tamaño y forma de
+        carácter y cuenta las bandas horizontales ocupadas por ellas (líneas).
+        
+        Returns:
+            dict: Mismo formato que _detect_text, con estimaciones
+        """
+        gray = context.gray
+        height = gray.shape[0]
+        binary = cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 25, 15
+        )
+        _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        stats = stats[1:]  # Sin el fondo
+        
+        # Componentes con tamaño y forma de carácter (relativos a la altura de página)
+        widths = stats[:, cv2.CC_STAT_WIDTH]
+        heights = stats[:, cv2.CC_STAT_HEIGHT]
+        fill = stats[:, cv2.CC_STAT_AREA] / (widths * heights)
+        is_char = (
+            (heights >= max(4, height * 0.004)) & (heights <= height * 0.04) &
+            (widths <= heights * 4) & (fill > 0.1) & (fill < 0.95)
+        )
+        chars = stats[is_char]
+        
+        # Filas cubiertas por al menos 3 caracteres; cada banda continua es una línea
+        coverage = np.zeros(height + 1, dtype=np.int64)
+        np.add.at(coverage, chars[:, cv2.CC_STAT_TOP], 1)
+        np.add.at(coverage, chars[:, cv2.CC_STAT_TOP] + chars[:, cv2.CC_STAT_HEIGHT], -1)
+        text_rows = np.cumsum(coverage)[:height] >= 3
+        text_lines = int(np.count_nonzero(np.diff(text_rows.astype(np.int8), prepend=0) == 1))
+        
+        # Longitud media de palabra de unos 5 caracteres
+        word_count = len(chars) // 5
+        
+        return {
+            'has_text': word_count > 3,
+            'text_lines': text_lines,
+            'word_count': word_count,
+            'is_centered_title': False,
+            'confidence': min(word_count / 10, 1.0)
+        }
+    
+    def _text_gate_decides(self, estimate, color_complexity):
+        """
+        Decidir si la estimación basta para omitir el OCR
+        
+        Se omite cuando la página claramente no tiene texto o cuando tiene
+        mucho texto en muchas líneas y no es visualmente compleja (las tramas
+        de grabados también generan componentes con forma de carácter).
+        """
+        if estimate['word_count'] < self.text_gate['no_text_words']:
+            return True
+        return (
+            estimate['word_count'] >= self.text_gate['text_words'] and
+            estimate['text_lines'] >= self.text_gate['min_lines'] and
+            not (color_complexity or {}).get('is_complex', False)
+        )
+    
+    def _detect_text(self, context, color_complexity=None, timings=None):
         """Detectar texto en la imagen"""
+        # Estimación rápida: el OCR solo se ejecuta si el resultado es ambiguo
+        if self.text_gate['enabled']:
+            estimate = self._estimate_text(context)
+            if not self.ocr_available:
+                return {**estimate, 'ocr_unavailable': True}
+            if self._text_gate_decides(estimate, color_complexity):
+                return {**estimate, 'ocr_skipped': True}
+        
         if not self.ocr_available:
-            return {'has_text': False, 'text_lines': 0, 'confidence': 0}
+            return {'has_text': False, 'text_lines': 0, 'word_count': 0, 'confidence': 0, 'ocr_unavailable': True}
         
         try:
-            # Preprocesar imagen para OCR
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Aplicar threshold adaptativo
+            # Preprocesar imagen para OCR (a resolución completa): threshold adaptativo
             processed = cv2.adaptiveThreshold(
-                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+                context.full_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
             )
             
             # Extraer texto
-            text = pytesseract.image_to_string(processed, lang='spa+eng')
+            with timed(timings, 'ocr'):
+                text = self.ocr.recognize(processed)
             
             # Analizar resultado
             text_lines = len([line for line in text.split('\n') if line.strip()])
             word_count = len(text.split())
             
             # Detectar si es título centrado (posible frontispicio)
-            is_centered_title = self._detect_centered_title(text, image.shape)
+            is_centered_title = self._detect_centered_title(text, processed.shape)
             
             return {
                 'has_text': word_count > 3,
                 'text_lines': text_lines,
                 'word_count': word_count,
                 'is_centered_title': is_centered_title,
-                'confidence': min(word_count / 10, 1.0)  # Máximo 1.0
+                'confidence': min(word_count / 10, 1.0),  # Máximo 1.0
+                'ocr_skipped': False
             }
             
         except Exception as e:
             print(f"OCR error: {e}")
-            return {'has_text': False, 'text_lines': 0, 'confidence': 0}
+            return {'has_text': False, 'text_lines': 0, 'word_count': 0, 'confidence': 0}
     
     def _detect_centered_title(self, text, image_shape):
         """Detectar si el texto parece ser un título centrado"""
@@ -250,21 +398,16 @@ class ImageClassifier:
         
         return False
     
-    def _analyze_color_complexity(self, image):
+    def _analyze_color_complexity(self, context):
         """Analizar complejidad de color y formas"""
-        # Calcular histograma de colores
-        hist = cv2.calcHist([image], [0, 1, 2], None, [8, 8, 8], [0, 256, 0, 256, 0, 256])
-        
-        # Normalizar histograma
-        hist_norm = hist / hist.sum()
+        # Normalizar histograma de colores
+        hist_norm = context.color_hist / context.color_hist.sum()
         
         # Calcular entropía (medida de diversidad de colores)
         entropy = -np.sum(hist_norm * np.log2(hist_norm + 1e-10))
         
-        # Detectar bordes para analizar complejidad de formas
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
-        edge_density = np.sum(edges > 0) / edges.size
+        # Bordes para analizar complejidad de formas
+        edge_density = context.edge_density(50, 150)
         
         return {
             'color_entropy': entropy,
@@ -272,43 +415,41 @@ class ImageClassifier:
             'is_complex': entropy > 12 or edge_density > 0.1
         }
     
-    def _detect_calibration_target(self, image):
+    def _detect_calibration_target(self, context):
         """
         Detectar patrones de calibración (IT8, X-Rite, etc.)
         
         Returns:
             dict: {'is_calibration': bool, 'confidence': float}
         """
-        # Convertir a escala de grises
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
         # Detectar contornos rectangulares (patches de color típicos en targets)
-        edges = cv2.Canny(gray, 50, 150)
+        edges = context.edges(50, 150)
         contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
-        rectangular_patches = 0
-        regular_patches = 0
-        patch_sizes = []
+        # Límites de área definidos a resolución completa, ajustados al proxy
+        min_area = context.scale_area(500)
+        max_area = context.scale_area(50000)
         
-        for contour in contours:
-            # Aproximar contorno
-            epsilon = 0.02 * cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, epsilon, True)
-            area = cv2.contourArea(contour)
-            
-            # Contar rectángulos de tamaño apropiado
-            if len(approx) == 4 and 500 < area < 50000:
-                rectangular_patches += 1
-                patch_sizes.append(area)
-                
-                # Verificar regularidad (aspecto ratio cercano a 1:1)
-                x, y, w, h = cv2.boundingRect(contour)
-                aspect_ratio = float(w) / h
-                if 0.7 <= aspect_ratio <= 1.3:  # Aproximadamente cuadrado
-                    regular_patches += 1
+        # Filtrar por área antes de aproximar polígonos (la mayoría son trazos de texto)
+        areas = np.fromiter((cv2.contourArea(c) for c in contours), dtype=np.float64, count=len(contours))
+        candidates = [contours[i] for i in np.flatnonzero((areas > min_area) & (areas < max_area))]
+        
+        # Contar rectángulos de tamaño apropiado
+        rectangles = [
+            c for c in candidates
+            if len(cv2.approxPolyDP(c, 0.02 * cv2.arcLength(c, True), True)) == 4
+        ]
+        rectangular_patches = len(rectangles)
+        
+        # Verificar regularidad (aspecto ratio cercano a 1:1)
+        regular_patches = 0
+        if rectangles:
+            boxes = np.array([cv2.boundingRect(c) for c in rectangles], dtype=np.float64)
+            aspect_ratios = boxes[:, 2] / boxes[:, 3]
+            regular_patches = int(np.count_nonzero((aspect_ratios >= 0.7) & (aspect_ratios <= 1.3)))
         
         # Análisis de color para targets de calibración
-        color_variety = self._analyze_color_patches(image)
+        color_variety = self._analyze_color_patches(context.image)
         
         # Criterios para target de calibración
         is_calibration = (
@@ -338,41 +479,19 @@ class ImageClassifier:
     
     def _analyze_color_patches(self, image):
         """Analizar variedad de colores en la imagen para detectar targets"""
-        # Dividir imagen en grid para analizar parches de color
-        height, width = image.shape[:2]
-        grid_size = 8
+        # Color promedio de cada celda del grid con una sola reducción por área
+        columns, rows = self.calibration_grid
+        patch_colors = cv2.resize(image, (columns, rows), interpolation=cv2.INTER_AREA)
+        patch_colors = patch_colors.reshape(-1, 3).astype(np.float64)
         
-        patch_height = height // grid_size
-        patch_width = width // grid_size
-        
-        patch_colors = []
-        
-        for i in range(grid_size):
-            for j in range(grid_size):
-                y1 = i * patch_height
-                y2 = min((i + 1) * patch_height, height)
-                x1 = j * patch_width
-                x2 = min((j + 1) * patch_width, width)
-                
-                patch = image[y1:y2, x1:x2]
-                
-                # Calcular color promedio del patch
-                mean_color = np.mean(patch.reshape(-1, 3), axis=0)
-                patch_colors.append(mean_color)
-        
-        # Calcular variedad de colores
-        patch_colors = np.array(patch_colors)
-        
-        # Calcular distancias entre colores
-        color_distances = []
-        for i in range(len(patch_colors)):
-            for j in range(i+1, len(patch_colors)):
-                distance = np.linalg.norm(patch_colors[i] - patch_colors[j])
-                color_distances.append(distance)
-        
-        if not color_distances:
+        if len(patch_colors) < 2:
             return 0.0
         
+        # Distancias entre todos los pares de colores en una sola operación
+        differences = patch_colors[:, None, :] - patch_colors[None, :, :]
+        distances = np.sqrt(np.einsum('ijk,ijk->ij', differences, differences))
+        color_distances = distances[np.triu_indices(len(patch_colors), k=1)]
+        
         # Normalizar variedad (0-1)
         avg_distance = np.mean(color_distances)
         variety = min(avg_distance / 100.0, 1.0)  # Normalizar a 0-1
@@ -0,0 +1,135 @@
+import sys
+from collections.abc import MutableMapping
+
+# Campos del registro de una imagen, en el orden que devuelve la API
+FIELDS = [
+    'id', 'original_filename', 'filepath', 'type', 'confidence', 'validated',
+    'page_number', 'number_type', 'number_exception', 'phantom_number', 'created_at',
+    'width', 'height', 'format', 'mode', 'size_bytes', 'has_transparency', 'dpi',
+    'content_hash', 'version', 'project_id'
+]
+
+# Campos con pocos valores distintos ('texto', 'pagina_blanca', 'arabic', 'RGB',
+# 'TIFF', id de proyecto...): se internan para que todos los registros compartan la misma cadena
+INTERNED_FIELDS = frozenset({'type', 'number_type', 'mode', 'format', 'project_id'})
+
+# Campos que suelen repetirse en todas las páginas de un libro (mismas dimensiones
+# y dpi): los registros comparten un único objeto por valor
+SHARED_FIELDS = frozenset({'width', 'height', 'dpi'})
+
+# Valores compartidos que se recuerdan como máximo. Al llenarse la tabla se vacía:
+# los registros conservan sus objetos y los valores siguientes se vuelven a compartir
+SHARED_VALUES_LIMIT = 4096
+
+_FIELD_SET = frozenset(FIELDS)
+_COMPACTED_FIELDS = INTERNED_FIELDS | SHARED_FIELDS
+_shared_values = {}
+
+
+def _compact(field, value):
+    """Valor que guarda el registro: cadena internada, objeto compartido o el propio valor"""
+    if field in INTERNED_FIELDS:
+        return sys.intern(value) if type(value) is str else value
+    if field in SHARED_FIELDS and value is not None:
+        # dpi llega como tupla (PIL) o lista (JSON); se guarda siempre como tupla
+        if field == 'dpi':
+            value = tuple(value)
+        key = (field, value)
+        shared = _shared_values.get(key)
+        if shared is None:
+            if len(_shared_values) >= SHARED_VALUES_LIMIT:
+                _shared_values.clear()
+            shared = _shared_values[key] = value
+        return shared
+    return value
+
+
+class ImageRecord(MutableMapping):
+    """
+    Registro compacto de una imagen.
+
+    Guarda los campos en __slots__ en lugar de un dict por registro, interna
+    los valores enumerados y comparte dimensiones y dpi repetidos, de modo que el coste
+    en memoria de cada registro se reduce a sus valores propios. Se usa como
+    un dict (registro['type'], get, items, {**registro}) y se serializa a JSON
+    con la misma forma (ver to_dict). Los campos no asignados no forman parte
+    del registro, igual que las claves ausentes de un dict.
+    """
+
+    __slots__ = tuple(FIELDS)
+
+    def __init__(self, values=(), **fields):
+        """
+        Args:
+            values (dict | iterable): Campos iniciales, como en dict()
+        """
+        for field, value in dict(values, **fields).items():
+            self[field] = value
+
+    @classmethod
+    def from_row(cls, fields, values):
+        """Construir un registro a partir de los campos y valores ya decodificados de una fila"""
+        record = cls.__new__(cls)
+        for field, value in zip(fields, values):
+            setattr(record, field, _compact(field, value) if field in _COMPACTED_FIELDS else value)
+        return record
+
+    def __getitem__(self, field):
+        if field not in _FIELD_SET:
+            raise KeyError(field)
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def __setitem__(self, field, value):
+        if field not in _FIELD_SET:
+            raise KeyError(f'Campo de registro desconocido: {field}')
+        setattr(self, field, _compact(field, value))
+
+    def __delitem__(self, field):
+        if field not in _FIELD_SET:
+            raise KeyError(field)
+        try:
+            delattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def __contains__(self, field):
+        return field in _FIELD_SET and hasattr(self, field)
+
+    def __iter__(self):
+        return (field for field in FIELDS if hasattr(self, field))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f'ImageRecord({self.to_dict()!r})'
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        for field, value in state.items():
+            self[field] = value
+
+    def copy(self):
+        """Copia superficial del registro"""
+        fields = list(self)
+        return ImageRecord.from_row(fields, [getattr(self, field) for field in fields])
+
+    def to_dict(self):
+        """
+        Convertir el registro en un dict con la forma que devuelve la API
+
+        Returns:
+            dict: Campos asignados, en el orden de FIELDS
+        """
+        result = {}
+        for field in FIELDS:
+            try:
+                result[field] = getattr(self, field)
+            except AttributeError:
+                pass
+        return result
@@ -0,0 +1,498 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+# Las columnas de la tabla de imágenes son los campos del registro (FIELDS)
+from models.image_record import FIELDS, ImageRecord
+
+# Columnas añadidas después de la primera versión del esquema y su tipo,
+# que se crean al abrir bases de datos existentes
+ADDED_COLUMNS = {
+    'content_hash': 'TEXT',
+    'version': 'INTEGER NOT NULL DEFAULT 0',
+    'project_id': "TEXT NOT NULL DEFAULT 'default'"
+}
+
+# Proyecto (libro) de los registros creados sin proyecto y de las bases de datos anteriores
+DEFAULT_PROJECT = 'default'
+
+# Campos que asigna el almacén y no se escriben desde fuera
+# (un registro no cambia de proyecto una vez creado)
+MANAGED_FIELDS = {'id', 'version', 'project_id'}
+
+# Campos que se guardan como entero 0/1 y se devuelven como bool
+BOOL_FIELDS = {'validated', 'phantom_number', 'has_transparency'}
+
+# Campos con valores no escalares o de tipo variable (page_number puede ser int o romano)
+JSON_FIELDS = {'page_number', 'dpi'}
+
+# Máximo de parámetros por consulta IN (...)
+QUERY_CHUNK_SIZE = 500
+
+
+class ImageStore:
+    """
+    Almacén persistente de registros de imágenes sobre SQLite (modo WAL).
+
+    Cada hilo usa su propia conexión. Los registros se devuelven como
+    ImageRecord, que se usan como dicts con la misma forma que espera la API.
+
+    Los registros se reparten en proyectos (uno por libro): las consultas con
+    project_id recorren solo las páginas de ese proyecto a través del índice
+    (project_id, original_filename, id). Sin project_id abarcan todos.
+
+    La colección tiene una versión que aumenta con cada escritura. Cada
+    registro guarda la versión de su última modificación y los registros
+    eliminados dejan una marca (tombstone) con la versión del borrado, de modo
+    que changes_since() devuelve solo lo cambiado desde una versión dada.
+    """
+
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path (str): Ruta del archivo SQLite
+        """
+        self.db_path = str(db_path)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        self._create_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connection()
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS images (
+                id TEXT PRIMARY KEY,
+                original_filename TEXT NOT NULL,
+                filepath TEXT NOT NULL,
+                type TEXT,
+                confidence REAL,
+                validated INTEGER NOT NULL DEFAULT 0,
+                page_number TEXT,
+                number_type TEXT,
+                number_exception TEXT,
+                phantom_number INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT,
+                width INTEGER,
+                height INTEGER,
+                format TEXT,
+                mode TEXT,
+                size_bytes INTEGER,
+                has_transparency INTEGER,
+                dpi TEXT,
+                content_hash TEXT,
+                version INTEGER NOT NULL DEFAULT 0,
+                project_id TEXT NOT NULL DEFAULT 'default'
+            );
+            CREATE TABLE IF NOT EXISTS projects (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                created_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS collection (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO collection (id, version) VALUES (1, 0);
+            CREATE TABLE IF NOT EXISTS tombstones (
+                id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_tombstones_version ON tombstones (version);
+            CREATE INDEX IF NOT EXISTS idx_images_filename ON images (original_filename, id);
+            CREATE INDEX IF NOT EXISTS idx_images_type ON images (type);
+            CREATE INDEX IF NOT EXISTS idx_images_validated ON images (validated);
+        ''')
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(images)')}
+        for column, column_type in ADDED_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f'ALTER TABLE images ADD COLUMN {column} {column_type}')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_images_version ON images (version)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_images_project ON images (project_id, original_filename, id)')
+        conn.execute(
+            'INSERT OR IGNORE INTO projects (id, name, created_at) VALUES (?, ?, ?)',
+            (DEFAULT_PROJECT, 'Proyecto por defecto', datetime.now().isoformat())
+        )
+        conn.commit()
+
+    # --- Conversión entre filas y registros ---
+
+    @staticmethod
+    def _encode(field, value):
+        if field in BOOL_FIELDS:
+            return int(bool(value))
+        if field in JSON_FIELDS:
+            return json.dumps(value)
+        return value
+
+    @staticmethod
+    def _decode(field, value):
+        if field in BOOL_FIELDS:
+            return bool(value)
+        if field in JSON_FIELDS:
+            return json.loads(value) if value is not None else None
+        return value
+
+    def _row_to_record(self, row, fields=FIELDS):
+        return ImageRecord.from_row(fields, [self._decode(field, value) for field, value in zip(fields, row)])
+
+    @staticmethod
+    def _where(conditions, params, project_id=None):
+        """Cláusula WHERE con las condiciones dadas, limitada a un proyecto si se indica"""
+        conditions, params = list(conditions), list(params)
+        if project_id is not None:
+            conditions.insert(0, 'project_id = ?')
+            params.insert(0, project_id)
+        return (f"WHERE {' AND '.join(conditions)}" if conditions else ''), params
+
+    def _select(self, where='', params=(), fields=FIELDS, order_by=''):
+        sql = f"SELECT {', '.join(fields)} FROM images {where} {order_by}"
+        rows = self._connection().execute(sql, params).fetchall()
+        return [self._row_to_record(row, fields) for row in rows]
+
+    # --- Lectura ---
+
+    def get(self, image_id):
+        """
+        Obtener un registro por id
+
+        Returns:
+            ImageRecord: Registro o None si no existe
+        """
+        records = self._select('WHERE id = ?', (image_id,))
+        return records[0] if records else None
+
+    def get_many(self, image_ids):
+        """Obtener varios registros por id, en el orden recibido (omite los inexistentes)"""
+        found = {}
+        for start in range(0, len(image_ids), QUERY_CHUNK_SIZE):
+            chunk = image_ids[start:start + QUERY_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            for record in self._select(f'WHERE id IN ({placeholders})', chunk):
+                found[record['id']] = record
+        return [found[image_id] for image_id in image_ids if image_id in found]
+
+    def get_by_filenames(self, filenames, project_id=None):
+        """
+        Buscar registros por nombre de archivo original usando el índice
+
+        Args:
+            filenames (list): Nombres de archivo originales
+            project_id (str): Opcional, proyecto donde buscar (los nombres solo
+                son únicos dentro de un libro)
+
+        Returns:
+            dict: {original_filename: registro}
+        """
+        filenames = list(dict.fromkeys(filenames))
+        found = {}
+        for start in range(0, len(filenames), QUERY_CHUNK_SIZE):
+            chunk = filenames[start:start + QUERY_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            where, params = self._where([f'original_filename IN ({placeholders})'], chunk, project_id)
+            records = self._select(where, params, order_by='ORDER BY original_filename, id')
+            for record in records:
+                found.setdefault(record['original_filename'], record)
+        return found
+
+    def list(self, fields=FIELDS, project_id=None):
+        """Todos los registros (de un proyecto, si se indica) ordenados por nombre de archivo original"""
+        where, params = self._where([], [], project_id)
+        return self._select(where, params, fields, 'ORDER BY original_filename, id')
+
+    def page(self, limit, cursor=None, fields=FIELDS, project_id=None):
+        """
+        Obtener una página de registros ordenados por nombre de archivo original
+
+        La paginación es por clave (original_filename, id) y recorre el índice
+        idx_images_filename, así que el coste no depende de la posición de la página.
+
+        Args:
+            limit (int): Registros por página
+            cursor (tuple): (original_filename, id) del último registro de la página anterior
+            fields (list): Campos a devolver
+            project_id (str): Opcional, proyecto a recorrer
+
+        Returns:
+            tuple: (registros, cursor de la página siguiente o None si es la última)
+        """
+        # La clave de orden se lee siempre para construir el cursor siguiente
+        selected = list(dict.fromkeys([*fields, 'original_filename', 'id']))
+        conditions, params = [], []
+        if cursor is not None:
+            conditions, params = ['(original_filename, id) > (?, ?)'], list(cursor)
+        where, params = self._where(conditions, params, project_id)
+
+        # Un registro de más indica si hay página siguiente
+        records = self._select(where, params + [limit + 1], selected, 'ORDER BY original_filename, id LIMIT ?')
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = (records[-1]['original_filename'], records[-1]['id'])
+
+        if len(selected) != len(fields):
+            records = [{field: record[field] for field in fields} for record in records]
+        return records, next_cursor
+
+    @staticmethod
+    def encode_cursor(cursor):
+        """Codificar un cursor de page() como token opaco para la API"""
+        return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(token):
+        """
+        Decodificar un token de encode_cursor
+
+        Raises:
+            ValueError: Si el token no es válido
+        """
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        except (ValueError, UnicodeEncodeError) as e:
+            raise ValueError(f'Cursor inválido: {token}') from e
+        if not (isinstance(cursor, list) and len(cursor) == 2 and all(isinstance(part, str) for part in cursor)):
+            raise ValueError(f'Cursor inválido: {token}')
+        return tuple(cursor)
+
+    def count(self, project_id=None):
+        """Número de registros (de un proyecto, si se indica)"""
+        where, params = self._where([], [], project_id)
+        return self._connection().execute(f'SELECT COUNT(*) FROM images {where}', params).fetchone()[0]
+
+    def version(self):
+        """Versión actual de la colección"""
+        return self._connection().execute('SELECT version FROM collection WHERE id = 1').fetchone()[0]
+
+    def changes_since(self, version, fields=FIELDS, project_id=None):
+        """
+        Obtener los cambios de la colección posteriores a una versión
+
+        Args:
+            version (int): Versión conocida por el cliente
+            fields (list): Campos de los registros devueltos
+            project_id (str): Opcional, proyecto cuyos cambios se devuelven. Los
+                ids eliminados abarcan todos los proyectos (el cliente ignora
+                los que no tiene).
+
+        Returns:
+            tuple: (versión actual, registros creados o modificados ordenados por
+                nombre de archivo, ids de registros eliminados)
+        """
+        conn = self._connection()
+        # Una sola transacción de lectura: versión y cambios del mismo estado
+        conn.execute('BEGIN')
+        try:
+            current = self.version()
+            where, params = self._where(['version > ?'], [version], project_id)
+            records = self._select(where, params, fields, 'ORDER BY original_filename, id')
+            deleted = [row[0] for row in conn.execute(
+                'SELECT id FROM tombstones WHERE version > ? ORDER BY version', (version,)
+            )]
+        finally:
+            conn.commit()
+        return current, records, deleted
+
+    def __contains__(self, image_id):
+        row = self._connection().execute('SELECT 1 FROM images WHERE id = ?', (image_id,)).fetchone()
+        return row is not None
+
+    # --- Proyectos ---
+
+    @staticmethod
+    def _project_row(row):
+        return {'id': row[0], 'name': row[1], 'created_at': row[2], 'total': row[3]}
+
+    def list_projects(self):
+        """
+        Proyectos con su número de imágenes
+
+        Returns:
+            list: [{'id', 'name', 'created_at', 'total'}] por fecha de creación
+        """
+        rows = self._connection().execute('''
+            SELECT p.id, p.name, p.created_at,
+                   (SELECT COUNT(*) FROM images WHERE project_id = p.id)
+            FROM projects p ORDER BY p.created_at, p.id
+        ''').fetchall()
+        return [self._project_row(row) for row in rows]
+
+    def get_project(self, project_id):
+        """
+        Obtener un proyecto por id
+
+        Returns:
+            dict: {'id', 'name', 'created_at', 'total'} o None si no existe
+        """
+        row = self._connection().execute('''
+            SELECT p.id, p.name, p.created_at,
+                   (SELECT COUNT(*) FROM images WHERE project_id = p.id)
+            FROM projects p WHERE p.id = ?
+        ''', (project_id,)).fetchone()
+        return self._project_row(row) if row else None
+
+    def has_project(self, project_id):
+        """Comprobar si existe un proyecto"""
+        row = self._connection().execute('SELECT 1 FROM projects WHERE id = ?', (project_id,)).fetchone()
+        return row is not None
+
+    def create_project(self, name):
+        """
+        Crear un proyecto (un libro) vacío
+
+        Args:
+            name (str): Nombre del proyecto
+
+        Returns:
+            dict: Proyecto creado
+        """
+        project_id = uuid.uuid4().hex
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'INSERT INTO projects (id, name, created_at) VALUES (?, ?, ?)',
+                (project_id, name, datetime.now().isoformat())
+            )
+        return self.get_project(project_id)
+
+    # --- Escritura ---
+
+    @staticmethod
+    def _next_version(conn):
+        """Aumentar la versión de la colección dentro de la transacción en curso"""
+        conn.execute('UPDATE collection SET version = version + 1 WHERE id = 1')
+        return conn.execute('SELECT version FROM collection WHERE id = 1').fetchone()[0]
+
+    def add(self, record):
+        """Insertar un registro nuevo"""
+        return self.add_many([record])
+
+    def add_many(self, records):
+        """
+        Insertar varios registros en una sola transacción
+
+        Returns:
+            int: Versión de la colección tras la inserción
+        """
+        records = list(records)
+        if not records:
+            return self.version()
+
+        placeholders = ', '.join('?' * len(FIELDS))
+        conn = self._connection()
+        with conn:
+            version = self._next_version(conn)
+            rows = []
+            for record in records:
+                row = [self._encode(field, record.get(field)) for field in FIELDS]
+                row[FIELDS.index('version')] = version
+                row[FIELDS.index('project_id')] = record.get('project_id') or DEFAULT_PROJECT
+                rows.append(row)
+            conn.executemany(f"INSERT INTO images ({', '.join(FIELDS)}) VALUES ({placeholders})", rows)
+            conn.executemany('DELETE FROM tombstones WHERE id = ?', [(record['id'],) for record in records])
+        return version
+
+    def update(self, image_id, fields):
+        """
+        Actualizar campos de un registro
+
+        Args:
+            image_id (str): Id del registro
+            fields (dict): Campos y valores nuevos
+
+        Returns:
+            ImageRecord: Registro actualizado o None si no existe
+        """
+        updated = self.bulk_update([image_id], fields)
+        return updated[0] if updated else None
+
+    def bulk_update(self, image_ids, fields):
+        """
+        Aplicar los mismos campos a varios registros
+
+        Returns:
+            list: Registros actualizados (omite los ids inexistentes)
+        """
+        fields = {field: value for field, value in fields.items() if field in FIELDS and field not in MANAGED_FIELDS}
+        if fields:
+            assignments = ', '.join(f'{field} = ?' for field in [*fields, 'version'])
+            conn = self._connection()
+            with conn:
+                values = [self._encode(field, value) for field, value in fields.items()] + [self._next_version(conn)]
+                conn.executemany(
+                    f'UPDATE images SET {assignments} WHERE id = ?',
+                    [values + [image_id] for image_id in image_ids]
+                )
+        return self.get_many(list(image_ids))
+
+    def set_content_hash(self, image_id, content_hash):
+        """
+        Completar el hash de contenido de un registro anterior a ese campo
+
+        Es un dato derivado del archivo, no un cambio del registro: no aumenta
+        la versión de la colección, de modo que servir la imagen no hace que los
+        clientes vuelvan a descargar el registro con ?since=.
+
+        Args:
+            image_id (str): Id del registro
+            content_hash (str): Hash del archivo (el de ClassificationCache)
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'UPDATE images SET content_hash = ? WHERE id = ? AND content_hash IS NULL', (content_hash, image_id)
+            )
+
+    def save_fields(self, records, fields):
+        """
+        Guardar los valores de ciertos campos de varios registros
+
+        Args:
+            records (iterable): Registros con los valores nuevos
+            fields (list): Campos a guardar
+
+        Returns:
+            int: Versión de la colección tras la escritura
+        """
+        records = list(records)
+        if not records:
+            return self.version()
+
+        assignments = ', '.join(f'{field} = ?' for field in [*fields, 'version'])
+        conn = self._connection()
+        with conn:
+            version = self._next_version(conn)
+            conn.executemany(
+                f'UPDATE images SET {assignments} WHERE id = ?',
+                [[self._encode(field, record.get(field)) for field in fields] + [version, record['id']] for record in records]
+            )
+        return version
+
+    def delete_many(self, image_ids):
+        """
+        Eliminar registros dejando una marca para changes_since()
+
+        Returns:
+            int: Versión de la colección tras el borrado
+        """
+        conn = self._connection()
+        with conn:
+            version = self._next_version(conn)
+            conn.executemany('DELETE FROM images WHERE id = ?', [(image_id,) for image_id in image_ids])
+            conn.executemany(
+                'INSERT OR REPLACE INTO tombstones (id, version) VALUES (?, ?)',
+                [(image_id, version) for image_id in image_ids]
+            )
+        return version
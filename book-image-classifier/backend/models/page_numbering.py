@@ -1,5 +1,90 @@
 import re
-from typing import Dict, List, Optional
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class PageIndex:
+    """
+    Índice ordenado de páginas (por nombre de archivo original) con el estado
+    de los contadores de numeración antes de cada posición.
+    """
+    
+    def __init__(self, images: Iterable[Dict] = ()):
+        """
+        Args:
+            images (Iterable[Dict]): Registros de imágenes a indexar
+        """
+        self.records = sorted(images, key=self.key)
+        self.keys = [self.key(image) for image in self.records]
+        # Contadores (romano, arábigo) antes de cada posición y tras la última;
+        # solo son válidos hasta valid_upto
+        self.states: List[Tuple[int, int]] = [(1, 1)] * len(self.records)
+        self.end_state: Tuple[int, int] = (1, 1)
+        self.valid_upto = 0
+        # Estructura del libro de la última pasada (válida para las páginas antes de valid_upto)
+        self.structure: Optional[Dict] = None
+    
+    @staticmethod
+    def key(image: Dict) -> Tuple[str, str]:
+        return (image['original_filename'], image['id'])
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    def position(self, image: Dict) -> Optional[int]:
+        """Posición de una imagen en el índice, o None si no está indexada"""
+        key = self.key(image)
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return position
+        return None
+    
+    def insert(self, image: Dict) -> int:
+        """Insertar una imagen en orden (o sustituirla si ya está) y devolver su posición"""
+        key = self.key(image)
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            self.records[position] = image
+            self.invalidate_from(position)
+            return position
+        
+        self.keys.insert(position, key)
+        self.records.insert(position, image)
+        # Los contadores antes de la nueva página son los de la página que desplaza
+        state = self.states[position] if position < len(self.states) else self.end_state
+        self.states.insert(position, state)
+        self.invalidate_from(position)
+        return position
+    
+    def replace(self, image: Dict) -> Optional[int]:
+        """Sustituir el registro indexado de una imagen por una versión actualizada"""
+        position = self.position(image)
+        if position is not None:
+            self.records[position] = image
+            self.invalidate_from(position)
+        return position
+    
+    def remove(self, image: Dict) -> Optional[int]:
+        """Quitar una imagen del índice y devolver la posición que ocupaba"""
+        position = self.position(image)
+        if position is None:
+            return None
+        
+        # Los contadores antes de la página siguiente pasan a ser los de la eliminada
+        if position + 1 < len(self.states):
+            self.states[position + 1] = self.states[position]
+        else:
+            self.end_state = self.states[position]
+        del self.keys[position]
+        del self.records[position]
+        del self.states[position]
+        self.invalidate_from(position)
+        return position
+    
+    def invalidate_from(self, position: int) -> None:
+        """Marcar los contadores como no válidos a partir de una posición"""
+        self.valid_upto = min(self.valid_upto, position)
+
 
 class PageNumbering:
     """Sistema de numeración automática de páginas"""
@@ -21,74 +106,194 @@ class PageNumbering:
             'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X',
             'XI', 'XII', 'XIII', 'XIV', 'XV', 'XVI', 'XVII', 'XVIII', 'XIX', 'XX'
         ]
+        
+        # Índice ordenado de páginas para la numeración incremental
+        self.index: Optional[PageIndex] = None
     
-    def auto_number_pages(self, images_db: Dict) -> None:
+    @staticmethod
+    def _as_list(images_db) -> List[Dict]:
+        """Aceptar tanto un dict {id: imagen} como una lista de imágenes"""
+        return list(images_db.values() if isinstance(images_db, dict) else images_db)
+    
+    def auto_number_pages(self, images_db) -> List[Dict]:
         """
         Numerar páginas automáticamente basándose en orden y tipo
         
         Args:
-            images_db (Dict): Base de datos de imágenes
+            images_db (Dict | List[Dict]): Base de datos de imágenes
+            
+        Returns:
+            List[Dict]: Imágenes cuya numeración cambió
         """
-        # Ordenar imágenes por nombre de archivo
-        sorted_images = sorted(
-            images_db.values(),
-            key=lambda x: x['original_filename']
-        )
+        self.load_pages(images_db)
+        return self._renumber(0)
+    
+    def load_pages(self, images_db) -> None:
+        """
+        Construir el índice de páginas sin modificar su numeración. La siguiente
+        pasada incremental recalculará los contadores desde el principio.
         
-        # Primera pasada: identificar estructura del libro
-        structure = self._analyze_book_structure(sorted_images)
+        Args:
+            images_db (Dict | List[Dict]): Base de datos de imágenes
+        """
+        self.index = PageIndex(self._as_list(images_db))
+    
+    def add_pages(self, images: Iterable[Dict]) -> List[Dict]:
+        """
+        Añadir páginas al índice y renumerar solo desde la primera posición afectada
         
-        # Segunda pasada: aplicar numeración
-        self._apply_numbering(sorted_images, structure)
+        Args:
+            images (Iterable[Dict]): Imágenes nuevas
+            
+        Returns:
+            List[Dict]: Imágenes cuya numeración cambió
+        """
+        if self.index is None:
+            self.index = PageIndex()
+        
+        for image in images:
+            self.index.insert(image)
+        
+        return self._renumber(self.index.valid_upto)
     
-    def _analyze_book_structure(self, images: List[Dict]) -> Dict:
+    def remove_pages(self, images: Iterable[Dict]) -> List[Dict]:
+        """
+        Quitar páginas del índice y renumerar solo desde la primera posición afectada
+        
+        Args:
+            images (Iterable[Dict]): Imágenes eliminadas
+            
+        Returns:
+            List[Dict]: Imágenes cuya numeración cambió
+        """
+        if self.index is None:
+            return []
+        
+        for image in images:
+            self.index.remove(image)
+        
+        return self._renumber(self.index.valid_upto)
+    
+    def update_pages(self, images: Iterable[Dict]) -> None:
+        """
+        Sustituir páginas ya indexadas por su versión actualizada. No renumera:
+        la siguiente pasada recalculará desde la primera página modificada.
+        
+        Args:
+            images (Iterable[Dict]): Imágenes actualizadas
+        """
+        if self.index is None:
+            return
+        
+        for image in images:
+            self.index.replace(image)
+    
+    def _renumber(self, start: int) -> List[Dict]:
+        """Recalcular la numeración del índice desde una posición"""
+        images = self.index.records
+        start = min(start, self.index.valid_upto)
+        
+        # La estructura depende solo de las páginas hasta el inicio del contenido
+        # principal: se reutiliza la anterior si ese tramo no cambió
+        structure = self._analyze_book_structure(images, start, self.index.structure)
+        changed = self._apply_numbering(images, structure, start)
+        self.index.structure = structure
+        self.index.valid_upto = len(images)
+        return changed
+    
+    def _analyze_book_structure(self, images: List[Dict], start: int = 0,
+                                previous: Optional[Dict] = None) -> Dict:
         """
         Analizar la estructura del libro para determinar esquema de numeración
         
+        Con la estructura anterior solo se examinan las páginas desde start: las
+        anteriores no cambiaron. Si el contenido principal empieza antes de start
+        la estructura es la misma.
+        
         Args:
             images (List[Dict]): Lista ordenada de imágenes
+            start (int): Primera posición modificada desde el análisis anterior
+            previous (Dict): Estructura del análisis anterior (None = analizar todo)
             
         Returns:
             Dict: Información sobre la estructura del libro
         """
+        if previous is None:
+            start = 0
+        elif previous['first_numbered_index'] is not None and previous['first_numbered_index'] < start:
+            return dict(previous, total_images=len(images))
+        
+        # Las páginas antes de start no están numeradas: se conserva su primera preliminar
+        first_preliminary = previous['first_preliminary_index'] if previous is not None else None
+        if first_preliminary is not None and first_preliminary >= start:
+            first_preliminary = None
+        
+        # Buscar inicio del contenido principal y la primera página preliminar anterior
+        first_numbered = None
+        for i in range(start, len(images)):
+            page_type = images[i]['type']
+            if page_type in self.numbered_types:
+                first_numbered = i
+                break
+            if first_preliminary is None and page_type in ('frontispicio', 'guardia'):
+                first_preliminary = i
+        
         structure = {
             'has_preliminaries': False,
             'preliminary_end_index': 0,
-            'main_content_start_index': 0,
-            'total_images': len(images)
+            'main_content_start_index': first_numbered if first_numbered is not None else 0,
+            'total_images': len(images),
+            'first_numbered_index': first_numbered,
+            'first_preliminary_index': first_preliminary
         }
         
-        # Buscar inicio del contenido principal
-        for i, image in enumerate(images):
-            if image['type'] in self.numbered_types:
-                structure['main_content_start_index'] = i
-                break
-        
         # Determinar si hay páginas preliminares
-        preliminary_count = 0
-        for i in range(structure['main_content_start_index']):
-            if images[i]['type'] in ['frontispicio', 'guardia']:
-                preliminary_count += 1
-        
-        if preliminary_count > 0:
+        if first_numbered is not None and first_preliminary is not None:
             structure['has_preliminaries'] = True
-            structure['preliminary_end_index'] = structure['main_content_start_index'] - 1
+            structure['preliminary_end_index'] = first_numbered - 1
         
         return structure
     
-    def _apply_numbering(self, images: List[Dict], structure: Dict) -> None:
+    def _apply_numbering(self, images: List[Dict], structure: Dict, start: int = 0) -> List[Dict]:
         """
         Aplicar numeración a las páginas según la estructura identificada
         
+        Las páginas con excepción (bis, ter...) o número fantasma conservan su
+        número. Una página fantasma arábiga hace continuar la secuencia a partir
+        de su número; una excepción no consume número.
+        
         Args:
             images (List[Dict]): Lista ordenada de imágenes
             structure (Dict): Estructura del libro
+            start (int): Posición desde la que se recalcula
+            
+        Returns:
+            List[Dict]: Imágenes cuya numeración cambió
         """
-        # Contadores de páginas
-        roman_counter = 1
-        arabic_counter = 1
-        
-        for i, image in enumerate(images):
+        # Contadores de páginas en la posición de inicio
+        states = self.index.states if self.index is not None and self.index.records is images else None
+        if states and start < len(states):
+            roman_counter, arabic_counter = states[start]
+        elif states is not None and start > 0:
+            # Tras la última página (p. ej. al eliminarla)
+            roman_counter, arabic_counter = self.index.end_state
+        else:
+            roman_counter, arabic_counter = (1, 1)
+        changed = []
+        
+        for i in range(start, len(images)):
+            image = images[i]
+            if states is not None:
+                states[i] = (roman_counter, arabic_counter)
+            previous = (image.get('page_number'), image.get('number_type'), image.get('phantom_number'))
+            
+            # Numeración manual que se respeta
+            if image.get('number_exception') or image.get('phantom_number'):
+                if (image.get('phantom_number') and image.get('number_type', 'arabic') == 'arabic'
+                        and isinstance(image.get('page_number'), int)):
+                    arabic_counter = image['page_number'] + 1
+                continue
+            
             # Resetear numeración
             image['page_number'] = None
             image['number_type'] = 'arabic'
@@ -96,6 +301,8 @@ class PageNumbering:
             
             # Páginas sin numeración
             if image['type'] in self.non_numbered_types:
+                if previous != (None, 'arabic', False):
+                    changed.append(image)
                 continue
             
             # Determinar tipo de numeración
@@ -119,9 +326,16 @@ class PageNumbering:
                 image['page_number'] = arabic_counter
                 image['number_type'] = 'arabic'
                 arabic_counter += 1
+            
+            if previous != (image['page_number'], image['number_type'], image['phantom_number']):
+                changed.append(image)
+        
+        if states is not None:
+            self.index.end_state = (roman_counter, arabic_counter)
+        return changed
     
     def renumber_from_page(self, images_db: Dict, start_image_id: str, 
-                        start_number: int, number_type: str = 'arabic') -> None:
+                        start_number: int, number_type: str = 'arabic') -> List[Dict]:
         """
         Renumerar páginas a partir de una página específica
         
@@ -130,28 +344,27 @@ class PageNumbering:
             start_image_id (str): ID de la imagen desde donde empezar
             start_number (int): Número inicial
             number_type (str): Tipo de numeración ('arabic' o 'roman')
+            
+        Returns:
+            List[Dict]: Imágenes renumeradas
         """
         if start_image_id not in images_db:
             raise ValueError("Image ID not found")
         
-        # Ordenar imágenes por nombre de archivo
-        sorted_images = sorted(
-            images_db.values(),
-            key=lambda x: x['original_filename']
-        )
-        
-        # Encontrar índice de inicio
-        start_index = None
-        for i, image in enumerate(sorted_images):
-            if image['id'] == start_image_id:
-                start_index = i
-                break
+        # Usar el índice ordenado (se reconstruye si no contiene estas mismas imágenes)
+        start_image = images_db[start_image_id]
+        start_index = self.index.position(start_image) if self.index is not None else None
+        if start_index is None or self.index.records[start_index] is not start_image:
+            self.load_pages(images_db)
+            start_index = self.index.position(start_image)
         
         if start_index is None:
             raise ValueError("Start image not found in sorted list")
         
         # Aplicar renumeración
+        sorted_images = self.index.records
         current_number = start_number
+        renumbered = []
         
         for i in range(start_index, len(sorted_images)):
             image = sorted_images[i]
@@ -164,6 +377,11 @@ class PageNumbering:
                 
                 image['number_type'] = number_type
                 current_number += 1
+                renumbered.append(image)
+        
+        # Los contadores guardados ya no reflejan esta numeración manual
+        self.index.invalidate_from(start_index)
+        return renumbered
     
     def detect_page_exceptions(self, images_db: Dict) -> List[Dict]:
         """
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic_pages import make_page, page_seed, page_size, write_page
+from models.analysis_context import ImageAnalysisContext
+from models.classifier import ImageClassifier
+
+PROXY_MAX_DIMENSION = 2000
+
+# Característica -> (tolerancia absoluta, tolerancia relativa al mayor de los dos valores).
+# La reducción suaviza los degradados (más bordes en ilustraciones) y une o separa
+# letras vecinas (palabras, líneas y parches estimados); el resto debe coincidir.
+TOLERANCES = {
+    'mean_intensity': (1.0, 0),
+    'std_dev': (0.8, 0.1),
+    'intensity_range': (5, 0.2),
+    'entropy': (0.8, 0),
+    'edge_density': (0.003, 0.15),
+    'very_light_pixels': (0.07, 0),
+    'color_entropy': (0.2, 0.05),
+    'color_edge_density': (0.003, 0.15),
+    'word_count': (10, 0.15),
+    'text_lines': (3, 0.1),
+    'rectangular_patches': (5, 0.25),
+    'regular_patches': (2, 0),
+    'color_variety': (0.02, 0),
+}
+
+# (página, formato, dpi): a 400 dpi el proxy es 1/2 y a 700 dpi 1/4.
+# PNG se decodifica y reduce igual que TIFF.
+CASES = [
+    (kind, image_format, 400)
+    for kind in ('blank', 'noisy_blank', 'text', 'illustration', 'it8', 'grain1.5', 'grain2.5', 'grain4')
+    for image_format in ('jpeg', 'tiff')
+] + [
+    ('text', 'jpeg', 700), ('noisy_blank', 'tiff', 700), ('grain1.5', 'jpeg', 700), ('grain2.5', 'tiff', 700)
+]
+
+
+def _page(kind, dpi):
+    """Página sintética; grainX es papel liso con grano gaussiano de desviación X"""
+    if not kind.startswith('grain'):
+        return make_page(kind, dpi, 1)
+    width, height = page_size(dpi)
+    rng = np.random.default_rng(page_seed(kind, dpi, 0))
+    grain = rng.normal(0, float(kind[5:]), (height, width, 1))
+    return np.clip(244 + grain, 0, 255).astype(np.uint8).repeat(3, axis=2)
+
+
+def _features(classifier, context):
+    """Valores que usa el clasificador, tipo asignado y detección de página blanca"""
+    blank = classifier._detect_blank_page(context)
+    color = classifier._analyze_color_complexity(context)
+    text = classifier._estimate_text(context)
+    target = classifier._detect_calibration_target(context)
+    features = dict(blank['metrics'])
+    features.update({
+        'color_entropy': color['color_entropy'], 'color_edge_density': color['edge_density'],
+        'word_count': text['word_count'], 'text_lines': text['text_lines'],
+        'rectangular_patches': target['rectangular_patches'], 'regular_patches': target['regular_patches'],
+        'color_variety': target['color_variety'],
+    })
+    return features, blank['is_blank'], classifier._classify_by_content(context)['type']
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    return ImageClassifier()
+
+
+@pytest.mark.parametrize('kind,image_format,dpi', CASES)
+def test_proxy_features_match_full_resolution(classifier, tmp_path, kind, image_format, dpi):
+    path = write_page(_page(kind, dpi), str(tmp_path / kind), image_format)
+    proxy_context = ImageAnalysisContext(path, proxy_max_dimension=PROXY_MAX_DIMENSION)
+    assert proxy_context.proxy_factor == (2 if dpi == 400 else 4)
+
+    full, full_blank, full_type = _features(classifier, ImageAnalysisContext(path))
+    proxy, proxy_blank, proxy_type = _features(classifier, proxy_context)
+
+    assert (proxy_blank, proxy_type) == (full_blank, full_type)
+    for name, (absolute, relative) in TOLERANCES.items():
+        tolerance = absolute + relative * max(abs(full[name]), abs(proxy[name]))
+        assert abs(proxy[name] - full[name]) <= tolerance, f'{name}: {full[name]} (completa) / {proxy[name]} (proxy)'
+
+
+def test_only_jpeg_uses_reduced_decoding(tmp_path):
+    page = _page('text', 400)
+    for image_format in ('jpeg', 'tiff', 'png'):
+        context = ImageAnalysisContext(
+            write_page(page, str(tmp_path / 'page'), image_format), proxy_max_dimension=PROXY_MAX_DIMENSION
+        )
+        context.gray_stats
+        assert ('full_image' in context.__dict__) == (image_format != 'jpeg')
+
+    # El proxy de los demás formatos es el promedio exacto de bloques de 2x2
+    expected = page[:page.shape[0] // 2 * 2, :page.shape[1] // 2 * 2].reshape(
+        page.shape[0] // 2, 2, page.shape[1] // 2, 2, 3
+    ).mean(axis=(1, 3))
+    assert np.abs(context.image - expected).max() <= 0.5 + 1e-6
+
+
+@pytest.mark.parametrize('sigma', [1.5, 4])
+def test_noise_sigma_estimates_grain(tmp_path, sigma):
+    path = write_page(_page(f'grain{sigma}', 150), str(tmp_path / 'grain'), 'png')
+    assert ImageAnalysisContext(path).noise_sigma == pytest.approx(sigma, rel=0.05)
+
+
+def test_proxy_histogram_counts_full_resolution_pixels(tmp_path):
+    path = write_page(_page('grain4', 400), str(tmp_path / 'grain'), 'tiff')
+    full = ImageAnalysisContext(path)
+    proxy = ImageAnalysisContext(path, proxy_max_dimension=PROXY_MAX_DIMENSION)
+    assert proxy.gray_hist.sum() == pytest.approx(full.gray_hist.sum(), rel=0.01)
+    assert proxy.gray_stats['std'] == pytest.approx(full.gray_stats['std'], rel=0.05)
+    # Sin compensación el proxy tendría la mitad de desviación
+    assert ImageAnalysisContext(path, image=proxy.image).gray_stats['std'] < 0.6 * full.gray_stats['std']
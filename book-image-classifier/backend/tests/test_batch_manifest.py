@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+
+import cv2
+import pytest
+
+import cli
+import utils.processing_pool as processing_pool
+from benchmarks.synthetic_pages import make_page
+from config import Config
+from utils.batch_manifest import BatchManifest
+
+
+def _touch(path, content=b'page'):
+    path.write_bytes(content)
+    return os.stat(path)
+
+
+def test_manifest_resumes_pages_and_books(tmp_path):
+    stat = _touch(tmp_path / 'page_00001.jpg')
+    manifest = BatchManifest(str(tmp_path / 'manifest.jsonl'))
+    manifest.record_page('libro', 'page_00001.jpg', stat, type='texto', confidence=0.7)
+    manifest.record_page('libro', 'page_00002.jpg', stat, error='cannot identify image file')
+    manifest.record_book('libro', 2, failed=1)
+    manifest.close()
+
+    resumed = BatchManifest(manifest.path)
+    assert resumed.page('libro', 'page_00001.jpg', stat)['type'] == 'texto'
+    # Los fallos se reintentan
+    assert resumed.page('libro', 'page_00002.jpg', stat) is None
+    assert resumed.book_done('libro', 2) and not resumed.book_done('libro', 3)
+
+    # Una página modificada en disco se vuelve a analizar
+    os.utime(tmp_path / 'page_00001.jpg', ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert resumed.page('libro', 'page_00001.jpg', os.stat(tmp_path / 'page_00001.jpg')) is None
+
+
+def test_interrupted_line_is_ignored_and_terminated(tmp_path):
+    stat = _touch(tmp_path / 'page_00001.jpg')
+    manifest = BatchManifest(str(tmp_path / 'manifest.jsonl'))
+    manifest.record_page('libro', 'page_00001.jpg', stat, type='texto')
+    manifest.close()
+    with open(manifest.path, 'a', encoding='utf-8') as f:
+        f.write('{"kind": "page", "book": "libro", "fi')
+
+    resumed = BatchManifest(manifest.path)
+    assert list(resumed.pages) == [('libro', 'page_00001.jpg')]
+    resumed.record_page('libro', 'page_00002.jpg', stat, type='portada')
+    resumed.close()
+
+    assert set(BatchManifest(manifest.path).pages) == {('libro', 'page_00001.jpg'), ('libro', 'page_00002.jpg')}
+    with open(manifest.path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 3 and json.loads(lines[-1])['file'] == 'page_00002.jpg'
+
+
+@pytest.fixture
+def scans(tmp_path, monkeypatch):
+    monkeypatch.setattr(processing_pool, '_classifier', None)
+    monkeypatch.setattr(Config, 'OCR_PROBE_CACHE_PATH', str(tmp_path / 'ocr_probe.json'))
+    for book in ('BO0624_001', 'BO0624_002'):
+        (tmp_path / 'scans' / book).mkdir(parents=True)
+        for n in (1, 2):
+            cv2.imwrite(str(tmp_path / 'scans' / book / f'{book}_{n:06d}_r.jpg'), make_page('text', 72, n))
+    return tmp_path / 'scans'
+
+
+def test_cli_run_resumes_from_the_manifest(scans, tmp_path):
+    args = argparse.Namespace(
+        source=str(scans), output=str(tmp_path / 'out'), pattern=None, mode='json', workers=0,
+        manifest=None, cache=None, no_cache=True
+    )
+    first = cli.run(args)
+    assert (first['books'], first['pages'], first['failed']) == (2, 4, 0)
+    assert os.path.isfile(tmp_path / 'out' / 'BO0624_001' / 'metadata.json')
+
+    again = cli.run(args)
+    assert (again['books'], again['pages'], again['skipped_books']) == (0, 0, 2)
+
+    # Solo se analiza la página modificada y se reescribe la salida de su libro
+    page = scans / 'BO0624_002' / 'BO0624_002_000002_r.jpg'
+    cv2.imwrite(str(page), make_page('text', 72, 7))
+    changed = cli.run(args)
+    assert (changed['books'], changed['pages'], changed['skipped_books']) == (1, 1, 1)
@@ -0,0 +1,62 @@
+import cv2
+import pytest
+
+import utils.processing_pool as processing_pool
+from benchmarks.synthetic_pages import make_page
+from utils.processing_pool import ProcessingPool
+
+
+@pytest.fixture
+def local_pool(tmp_path, monkeypatch):
+    """Pool en el proceso actual con su propia caché (se reinicia el estado del módulo)"""
+    monkeypatch.setattr(processing_pool, '_classifier', None)
+    pool = ProcessingPool(workers=0, analysis_max_dimension=512, cache_path=str(tmp_path / 'cache.sqlite3'))
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def page(tmp_path):
+    path = str(tmp_path / 'page.jpg')
+    cv2.imwrite(path, make_page('text', 72, 1))
+    return path
+
+
+def _analyze(pool, path, filename):
+    result = pool.analyze_batch([(path, filename)])[0]
+    assert not isinstance(result, Exception)
+    return result
+
+
+def test_filename_rules_apply_to_cached_content(local_pool, page):
+    content = _analyze(local_pool, page, 'BO0624_000005_r.jpg')
+    assert not content['cached'] and content['classification']['type'] != 'portada'
+
+    cover = _analyze(local_pool, page, 'book_cover.jpg')
+    assert cover['cached']
+    assert cover['classification'] == {'type': 'portada', 'confidence': 0.9}
+
+    again = _analyze(local_pool, page, 'BO0624_000006_r.jpg')
+    assert again['cached'] and again['classification'] == content['classification']
+
+
+def test_filename_decision_is_not_cached(local_pool, page):
+    assert _analyze(local_pool, page, 'book_cover.jpg')['classification']['type'] == 'portada'
+    result = _analyze(local_pool, page, 'BO0624_000005_r.jpg')
+    assert not result['cached'] and result['classification']['type'] != 'portada'
+
+
+def test_failed_analysis_is_not_cached(local_pool, page, monkeypatch):
+    local_pool.warm_up()
+    classifier = processing_pool._classifier
+
+    def fail(*args):
+        raise RuntimeError('fallo simulado')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(classifier, '_classify_by_content', fail)
+        fallback = _analyze(local_pool, page, 'BO0624_000005_r.jpg')
+    assert fallback['classification'] == {'type': 'texto', 'confidence': 0.1}
+
+    result = _analyze(local_pool, page, 'BO0624_000005_r.jpg')
+    assert not result['cached'] and result['classification']['confidence'] > 0.1
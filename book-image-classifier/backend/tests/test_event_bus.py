@@ -0,0 +1,48 @@
+import json
+
+from utils.event_bus import EventBus
+
+
+def _received(subscription):
+    events, overflowed = subscription.get(timeout=0)
+    assert not overflowed
+    return [(event.type, json.loads(event.data)) for event in events]
+
+
+def _publish_all(bus):
+    bus.publish('classified', {'image': 'a1'}, 'a')
+    bus.publish('classified', {'image': 'b1'}, 'b')
+    bus.publish('job', {'id': 'j1'})
+
+
+def test_project_subscription_receives_its_events_and_general_ones():
+    bus = EventBus()
+    project_a, everything = bus.subscribe('a'), bus.subscribe()
+    _publish_all(bus)
+
+    assert _received(project_a) == [
+        ('classified', {'image': 'a1', 'project_id': 'a'}), ('job', {'id': 'j1'})
+    ]
+    assert [data.get('project_id') for _, data in _received(everything)] == ['a', 'b', None]
+
+
+def test_replay_after_reconnect_keeps_the_project_filter():
+    bus = EventBus()
+    _publish_all(bus)
+    bus.publish('classified', {'image': 'a2'}, 'a')
+
+    resumed = bus.subscribe('a', last_event_id=1)
+    assert [data for _, data in _received(resumed)] == [{'id': 'j1'}, {'image': 'a2', 'project_id': 'a'}]
+
+
+def test_slow_client_is_asked_to_resync():
+    bus = EventBus(buffer_size=2)
+    subscription = bus.subscribe('a')
+    for n in range(3):
+        bus.publish('classified', {'image': n}, 'a')
+    events, overflowed = subscription.get(timeout=0)
+    assert overflowed and [event.id for event in events] == [2, 3]
+
+    subscription.close()
+    bus.publish('classified', {'image': 3}, 'a')
+    assert subscription.get(timeout=0) == ([], False)
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from utils.hot_folder import HotFolderScanner
+
+
+@pytest.fixture
+def folder(tmp_path):
+    root = tmp_path / 'hot'
+    (root / 'libro').mkdir(parents=True)
+    (root / 'libro' / 'page_00001.jpg').write_bytes(b'uno')
+    (root / 'libro' / 'page_00002.jpg').write_bytes(b'dos')
+    (root / 'notas.txt').write_bytes(b'no es una imagen')
+    return root
+
+
+def _scanner(folder, tmp_path):
+    return HotFolderScanner(str(folder), str(tmp_path / 'state.sqlite3'), settle_seconds=0, extensions={'jpg'})
+
+
+def _ready(scanner):
+    """Archivos listos: la primera exploración solo los anota como candidatos"""
+    scanner.scan()
+    return scanner.scan()
+
+
+def _rewrite(path, content):
+    stat = os.stat(path)
+    path.write_bytes(content)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_rescan_skips_ingested_files(folder, tmp_path):
+    scanner = _scanner(folder, tmp_path)
+    ready = _ready(scanner)
+    assert [item.relpath for item in ready] == [os.path.join('libro', f'page_0000{n}.jpg') for n in (1, 2)]
+    assert all(item.previous is None for item in ready)
+
+    scanner.mark_ingested([(item, f'hash{n}', f'id{n}') for n, item in enumerate(ready)])
+    assert _ready(scanner) == []
+    # El estado persiste entre procesos
+    assert _ready(_scanner(folder, tmp_path)) == []
+
+    _rewrite(folder / 'libro' / 'page_00002.jpg', b'dos, corregida')
+    changed = _ready(scanner)
+    assert [item.relpath for item in changed] == [os.path.join('libro', 'page_00002.jpg')]
+    assert changed[0].previous == {'content_hash': 'hash1', 'image_id': 'id1'}
+
+
+def test_in_flight_files_are_not_delivered_twice(folder, tmp_path):
+    scanner = _scanner(folder, tmp_path)
+    ready = _ready(scanner)
+    scanner.mark_in_flight(ready[:1])
+    assert [item.path for item in scanner.scan()] == [ready[1].path]
+
+
+def test_failed_files_wait_until_they_change(folder, tmp_path):
+    scanner = _scanner(folder, tmp_path)
+    ready = _ready(scanner)
+    scanner.mark_in_flight(ready)
+    scanner.mark_failed(ready[:1])
+    scanner.mark_ingested([(ready[1], 'hash', 'id')])
+    assert _ready(scanner) == []
+    assert scanner.status()['failed'] == 1
+
+    _rewrite(folder / 'libro' / 'page_00001.jpg', b'uno, escaneada de nuevo')
+    assert [item.path for item in _ready(scanner)] == [ready[0].path]
+    assert scanner.status()['failed'] == 0
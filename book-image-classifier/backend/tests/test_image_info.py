@@ -0,0 +1,53 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import utils.processing_pool as processing_pool
+from models.analysis_context import ImageAnalysisContext
+from models.image_store import ImageStore
+from utils.batch_manifest import BatchManifest
+from utils.image_processing import ImageProcessor
+from utils.processing_pool import ProcessingPool
+
+
+@pytest.fixture
+def tiff_with_dpi(tmp_path):
+    """TIFF de archivo con resolución declarada (PIL la lee como IFDRational)"""
+    path = str(tmp_path / 'page_00005.tif')
+    Image.fromarray(np.full((300, 200, 3), 240, dtype=np.uint8)).save(path, dpi=(600, 600))
+    return path
+
+
+def test_image_info_dpi_is_json_serializable(tiff_with_dpi):
+    processor = ImageProcessor()
+    for info in (processor.get_image_info(tiff_with_dpi),
+                 processor.get_image_info(tiff_with_dpi, ImageAnalysisContext(tiff_with_dpi))):
+        assert info['dpi'] == (600.0, 600.0)
+        assert json.loads(json.dumps(info))['dpi'] == [600.0, 600.0]
+
+
+def test_tiff_with_dpi_is_cached_stored_and_recorded(tiff_with_dpi, tmp_path, monkeypatch):
+    monkeypatch.setattr(processing_pool, '_classifier', None)
+    pool = ProcessingPool(workers=0, analysis_max_dimension=512, cache_path=str(tmp_path / 'cache.sqlite3'))
+    try:
+        first, second = (pool.analyze_batch([(tiff_with_dpi, 'page_00005.tif')])[0] for _ in range(2))
+    finally:
+        pool.shutdown()
+    assert not isinstance(first, Exception) and not isinstance(second, Exception)
+    assert second['cached'] and list(second['image_info']['dpi']) == [600.0, 600.0]
+
+    store = ImageStore(str(tmp_path / 'images.sqlite3'))
+    store.add({
+        'id': 'a', 'original_filename': 'page_00005.tif', 'filepath': tiff_with_dpi,
+        **first['classification'], **first['image_info']
+    })
+    assert tuple(store.get('a')['dpi']) == (600.0, 600.0)
+
+    manifest = BatchManifest(str(tmp_path / 'manifest.jsonl'))
+    stat = os.stat(tiff_with_dpi)
+    manifest.record_page('libro', 'page_00005.tif', stat, image_info=first['image_info'])
+    manifest.close()
+    assert BatchManifest(manifest.path).page('libro', 'page_00005.tif', stat)['image_info']['dpi'] == [600.0, 600.0]
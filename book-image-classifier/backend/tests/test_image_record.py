@@ -0,0 +1,48 @@
+import pickle
+
+import pytest
+
+import models.image_record as image_record
+from models.image_record import ImageRecord
+
+
+def test_repeated_dimensions_share_one_object():
+    first = ImageRecord(id='a', width=2481, dpi=[300, 300])
+    second = ImageRecord.from_row(['id', 'width', 'dpi'], ['b', 2481, (300, 300)])
+    assert second['width'] is first['width'] and second['dpi'] is first['dpi']
+    assert second['dpi'] == (300, 300)
+
+
+def test_shared_values_are_bounded(monkeypatch):
+    monkeypatch.setattr(image_record, '_shared_values', {})
+    monkeypatch.setattr(image_record, 'SHARED_VALUES_LIMIT', 100)
+    records = [ImageRecord(id=str(n), width=10000 + n, height=3508) for n in range(1000)]
+    assert len(image_record._shared_values) <= 100
+    assert [record['width'] for record in records] == list(range(10000, 11000))
+    assert ImageRecord(id='x', height=3508)['height'] == 3508
+
+
+def test_record_behaves_like_the_api_dict():
+    record = ImageRecord({'type': 'texto', 'id': 'a'}, page_number=3)
+    assert record.to_dict() == {'id': 'a', 'type': 'texto', 'page_number': 3}
+    assert list(record) == ['id', 'type', 'page_number'] and len(record) == 3
+    assert 'number_type' not in record and record.get('number_type', 'arabic') == 'arabic'
+
+    record['number_type'] = 'roman'
+    del record['page_number']
+    assert {**record} == {'id': 'a', 'type': 'texto', 'number_type': 'roman'}
+    with pytest.raises(KeyError):
+        record['no_es_un_campo'] = 1
+    with pytest.raises(KeyError):
+        record['page_number']
+
+
+def test_copies_and_pickles_are_independent():
+    record = ImageRecord(id='a', type='texto', dpi=(300, 300))
+    copy = record.copy()
+    copy['type'] = 'portada'
+    assert record['type'] == 'texto'
+
+    restored = pickle.loads(pickle.dumps(record))
+    assert isinstance(restored, ImageRecord) and restored == record
+    assert restored['type'] is record['type']
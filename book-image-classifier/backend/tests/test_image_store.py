@@ -0,0 +1,86 @@
+import pytest
+
+from models.image_store import ImageStore, DEFAULT_PROJECT
+
+
+def _record(image_id, filename, project_id=DEFAULT_PROJECT, **fields):
+    return {
+        'id': image_id, 'original_filename': filename, 'filepath': f'/tmp/{filename}', 'type': 'texto',
+        'confidence': 0.7, 'validated': False, 'project_id': project_id, **fields
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ImageStore(str(tmp_path / 'images.sqlite3'))
+
+
+def test_each_write_bumps_the_collection_version(store):
+    assert store.version() == 0
+    v1 = store.add_many([_record('a', 'p1.jpg'), _record('b', 'p2.jpg')])
+    assert v1 == 1 and store.get('a')['version'] == 1
+
+    store.update('a', {'validated': True, 'version': 99})
+    v2 = store.version()
+    assert v2 == 2 and store.get('a')['version'] == 2 and store.get('b')['version'] == 1
+
+    v3 = store.save_fields([dict(store.get('b'), page_number=7)], ['page_number'])
+    assert v3 == 3 and store.get('b')['page_number'] == 7
+
+    # Completar el hash no es un cambio del registro
+    store.set_content_hash('a', 'abc')
+    assert store.version() == 3 and store.get('a')['content_hash'] == 'abc'
+
+
+def test_changes_since_returns_modified_records_and_tombstones(store):
+    store.add_many([_record('a', 'p1.jpg'), _record('b', 'p2.jpg'), _record('c', 'p3.jpg')])
+    known = store.version()
+    store.update('c', {'type': 'portada'})
+    store.delete_many(['b'])
+
+    version, records, deleted = store.changes_since(known)
+    assert version == store.version()
+    assert [record['id'] for record in records] == ['c'] and deleted == ['b']
+    assert store.changes_since(version) == (version, [], [])
+
+    # Volver a añadir un registro elimina su marca de borrado
+    store.add(_record('b', 'p2.jpg'))
+    _, records, deleted = store.changes_since(known)
+    assert [record['id'] for record in records] == ['b', 'c'] and deleted == []
+
+
+def test_changes_since_is_scoped_to_a_project(store):
+    project = store.create_project('Libro 2')
+    store.add_many([_record('a', 'p1.jpg'), _record('x', 'p1.jpg', project['id'])])
+    _, records, _ = store.changes_since(0, fields=['id'], project_id=project['id'])
+    assert [record['id'] for record in records] == ['x']
+    assert store.count(project['id']) == 1 and store.count() == 2
+
+
+def test_page_cursor_walks_the_collection_in_order(store):
+    store.add_many([_record(f'id{n}', f'p{n:03d}.jpg') for n in range(25, 0, -1)])
+    seen, cursor = [], None
+    while True:
+        records, cursor = store.page(10, store.decode_cursor(store.encode_cursor(cursor)) if cursor else None,
+                                     fields=['id'])
+        seen.extend(record['id'] for record in records)
+        if cursor is None:
+            break
+    assert seen == [f'id{n}' for n in range(1, 26)]
+    with pytest.raises(ValueError):
+        store.decode_cursor('no es un cursor')
+
+
+def test_projects_partition_the_collection(store):
+    other = store.create_project('BO0624_002')
+    assert [project['id'] for project in store.list_projects()] == [DEFAULT_PROJECT, other['id']]
+    assert store.has_project(other['id']) and not store.has_project('no-existe')
+
+    # Los nombres de archivo solo son únicos dentro de un libro
+    store.add_many([_record('a', 'p1.jpg'), _record('b', 'p1.jpg', other['id']), _record('c', 'p2.jpg', other['id'])])
+    assert store.get_by_filenames(['p1.jpg'], other['id'])['p1.jpg']['id'] == 'b'
+    assert store.get_by_filenames(['p1.jpg'], DEFAULT_PROJECT)['p1.jpg']['id'] == 'a'
+    assert [record['id'] for record in store.list(project_id=other['id'])] == ['b', 'c']
+    assert [record['id'] for record in store.page(10, fields=['id'], project_id=DEFAULT_PROJECT)[0]] == ['a']
+    totals = {project['id']: project['total'] for project in store.list_projects()}
+    assert totals == {DEFAULT_PROJECT: 1, other['id']: 2}
@@ -0,0 +1,108 @@
+import copy
+import random
+
+import pytest
+
+from models.page_numbering import PageNumbering
+
+TYPES = ['texto', 'texto', 'texto', 'ilustracion', 'portada', 'guardia', 'pagina_blanca', 'frontispicio']
+FIELDS = ('page_number', 'number_type', 'phantom_number')
+
+
+def _page(n, page_type):
+    return {'id': f'id{n:05d}', 'original_filename': f'page_{n:05d}.jpg', 'type': page_type}
+
+
+def _numbering(pages):
+    return {page['id']: tuple(page.get(field) for field in FIELDS) for page in pages}
+
+
+def _full_numbering(pages):
+    """Numeración de referencia: una pasada completa sobre una copia"""
+    pages = copy.deepcopy(list(pages))
+    PageNumbering().auto_number_pages(pages)
+    return _numbering(pages)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_numbering_matches_full_pass(seed):
+    rng = random.Random(seed)
+    numberer = PageNumbering()
+    pages = {}
+    numbers = list(range(400))
+    rng.shuffle(numbers)
+
+    for step in range(60):
+        action = rng.random()
+        if action < 0.6 or len(pages) < 5:
+            new = [_page(numbers.pop(), rng.choice(TYPES)) for _ in range(rng.randint(1, 8))]
+            pages.update((page['id'], page) for page in new)
+            numberer.add_pages(new)
+        elif action < 0.8:
+            removed = [pages.pop(page_id) for page_id in rng.sample(sorted(pages), rng.randint(1, 3))]
+            numberer.remove_pages(removed)
+        else:
+            page_id = rng.choice(sorted(pages))
+            pages[page_id] = dict(pages[page_id], type=rng.choice(TYPES))
+            numberer.update_pages([pages[page_id]])
+            numberer.add_pages([])
+
+        assert _numbering(numberer.index.records) == _full_numbering(pages.values()), f'paso {step}'
+        assert numberer.index.structure == numberer._analyze_book_structure(numberer.index.records)
+
+
+def test_changed_pages_are_returned():
+    numberer = PageNumbering()
+    first = [_page(n, 'texto') for n in (1, 3, 4)]
+    assert numberer.add_pages(first) == first
+
+    inserted = _page(2, 'texto')
+    assert numberer.add_pages([inserted]) == [inserted, first[1], first[2]]
+    assert [page['page_number'] for page in numberer.index.records] == [1, 2, 3, 4]
+
+    assert numberer.remove_pages([inserted]) == first[1:]
+    assert [page['page_number'] for page in numberer.index.records] == [1, 2, 3]
+
+    # Eliminar la última página no cambia nada, y la siguiente continúa la secuencia
+    assert numberer.remove_pages([first[2]]) == []
+    assert numberer.add_pages([_page(9, 'texto')])[0]['page_number'] == 3
+
+
+class _CountingPage(dict):
+    """Registro que cuenta las lecturas de su tipo"""
+    reads = 0
+
+    def __getitem__(self, key):
+        if key == 'type':
+            _CountingPage.reads += 1
+        return super().__getitem__(key)
+
+
+def _pages(numbers, page_type):
+    return [_CountingPage(_page(n, page_type)) for n in numbers]
+
+
+def test_structure_analysis_only_reads_changed_pages(monkeypatch):
+    numberer = PageNumbering()
+    analysis_reads = []
+    analyze = numberer._analyze_book_structure
+
+    def counting_analyze(*args):
+        _CountingPage.reads = 0
+        structure = analyze(*args)
+        analysis_reads.append(_CountingPage.reads)
+        return structure
+
+    monkeypatch.setattr(numberer, '_analyze_book_structure', counting_analyze)
+
+    # Sin páginas numeradas el primer análisis recorre todo el libro; los siguientes, solo lo añadido
+    numberer.add_pages(_pages(range(1000), 'pagina_blanca'))
+    numberer.add_pages(_pages(range(1000, 1010), 'pagina_blanca'))
+    assert analysis_reads == [1000, 10]
+
+    # Con el contenido principal antes de los cambios no se examina nada
+    numberer.add_pages(_pages([2000], 'texto'))
+    last = _pages([3000], 'texto')
+    numberer.add_pages(last)
+    numberer.remove_pages(last)
+    assert analysis_reads[2:] == [1, 0, 0]
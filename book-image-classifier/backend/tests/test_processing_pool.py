@@ -0,0 +1,68 @@
+import os
+import signal
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import pytest
+
+from benchmarks.synthetic_pages import make_page
+from utils.processing_pool import ProcessingPool, analyze_image
+
+
+def _crash(_):
+    """Tarea que termina su proceso de trabajo sin responder"""
+    os._exit(1)
+
+
+def _wait_for_exit(pid, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return
+        time.sleep(0.05)
+    raise AssertionError(f'El proceso {pid} sigue vivo')
+
+
+@pytest.fixture
+def pages(tmp_path):
+    paths = []
+    for index, kind in enumerate(['text', 'blank', 'illustration']):
+        path = str(tmp_path / f'page_{index:05d}.jpg')
+        cv2.imwrite(path, make_page(kind, 72, index))
+        paths.append((path, os.path.basename(path)))
+    return paths
+
+
+@pytest.fixture
+def pool():
+    pool = ProcessingPool(workers=2, analysis_max_dimension=512)
+    yield pool
+    pool.shutdown()
+
+
+def test_batch_succeeds_after_worker_is_killed(pool, pages):
+    assert pool.warm_up() == 2
+    executor = pool._executor
+    pid = next(iter(executor._processes))
+    os.kill(pid, signal.SIGKILL)
+    _wait_for_exit(pid)
+
+    results = pool.analyze_batch(pages)
+    if any(isinstance(result, BrokenProcessPool) for result in results):
+        # El pool pudo no haber detectado aún la muerte del proceso al enviar el lote
+        results = pool.analyze_batch(pages)
+
+    assert not [result for result in results if isinstance(result, Exception)]
+    assert pool._executor is not executor
+
+
+def test_broken_pool_is_replaced_after_crash_in_imap(pool, pages):
+    results = list(pool.imap(_crash, [(index,) for index in range(3)]))
+    assert all(isinstance(result, BrokenProcessPool) for result in results)
+    assert pool._executor is None
+
+    results = list(pool.imap(analyze_image, pages))
+    assert [result['image_info']['width'] > 0 for result in results] == [True] * len(pages)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from benchmarks.bench_classifier import STAGES, compare
+from benchmarks.synthetic_pages import PAGE_KINDS, generate_pages, make_page, page_seed, page_size
+
+
+@pytest.mark.parametrize('kind', PAGE_KINDS)
+def test_pages_are_deterministic(kind):
+    page = make_page(kind, 72, 3)
+    assert page.shape == (*page_size(72)[::-1], 3) and page.dtype == np.uint8
+    assert np.array_equal(page, make_page(kind, 72, 3))
+
+
+def test_seed_does_not_depend_on_the_process():
+    # crc32 de 'text:300:0': la semilla no cambia con PYTHONHASHSEED ni entre máquinas
+    assert page_seed('text', 300, 0) == 4179550747
+    assert not np.array_equal(make_page('text', 72, 0), make_page('text', 72, 1))
+    with pytest.raises(ValueError):
+        make_page('mapa', 72)
+
+
+def test_generated_set_and_comparison(tmp_path, capsys):
+    pages = generate_pages(str(tmp_path), kinds=('blank', 'text'), dpis=(72,), formats=('jpeg', 'png'))
+    assert [(page['kind'], page['format']) for page in pages] == [
+        ('blank', 'jpeg'), ('blank', 'png'), ('text', 'jpeg'), ('text', 'png')
+    ]
+    assert all(page['bytes'] > 0 and (page['width'], page['height']) == page_size(72) for page in pages)
+
+    def run(text_type):
+        return {
+            'environment': {'timestamp': '2026-01-01T00:00:00', 'classifier_version': 'x'},
+            'summary': {stage: {'median_ms': 10.0} for stage in STAGES},
+            'pages': [dict(page, type=text_type if page['kind'] == 'text' else 'pagina_blanca') for page in pages]
+        }
+
+    compare(run('texto'), run('ilustracion'))
+    output = capsys.readouterr().out
+    assert output.count('clasificación cambiada') == 2 and 'texto -> ilustracion' in output
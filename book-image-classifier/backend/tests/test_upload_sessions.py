@@ -0,0 +1,82 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+import utils.upload_sessions as upload_sessions
+from utils.upload_sessions import UploadSessionManager
+
+DATA = bytes(range(256)) * 40
+
+
+class _DroppedStream(io.BytesIO):
+    """Flujo de una petición que se corta tras entregar limit bytes"""
+
+    def __init__(self, data, limit):
+        super().__init__(data)
+        self.limit = limit
+
+    def read(self, size=-1):
+        if self.tell() >= self.limit:
+            raise OSError('conexión cortada')
+        return super().read(min(size, self.limit - self.tell()))
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_sessions, 'CHUNK_SIZE', 1000)
+    return UploadSessionManager(str(tmp_path / 'uploads'), max_size=len(DATA) * 2)
+
+
+def test_resume_after_dropped_connection(sessions, tmp_path):
+    upload = sessions.create('page_00001.tif', len(DATA))
+    upload_id = upload['upload_id']
+
+    with pytest.raises(OSError):
+        sessions.append(upload_id, 0, _DroppedStream(DATA, 2500))
+    # Lo recibido antes del corte cuenta: se reanuda desde ahí
+    offset = sessions.status(upload_id)['offset']
+    assert offset == 2500
+
+    sessions.append(upload_id, offset, io.BytesIO(DATA[offset:]))
+    image_id, filename, filepath, content_hash = sessions.finalize(upload_id, str(tmp_path / 'project'))
+    assert (image_id, filename) == (upload_id, 'page_00001.tif')
+    assert os.path.dirname(filepath) == str(tmp_path / 'project')
+    with open(filepath, 'rb') as f:
+        assert f.read() == DATA
+    assert content_hash == hashlib.sha256(DATA).hexdigest()
+    assert os.listdir(sessions.upload_dir) == []
+
+
+def test_offset_mismatch_and_oversized_chunks_are_rejected(sessions):
+    upload_id = sessions.create('page_00001.tif', len(DATA))['upload_id']
+    sessions.append(upload_id, 0, io.BytesIO(DATA[:3000]))
+
+    # Un reintento de un fragmento ya recibido no se duplica
+    with pytest.raises(ValueError, match='Offset 0'):
+        sessions.append(upload_id, 0, io.BytesIO(DATA[:3000]))
+    with pytest.raises(ValueError, match='tamaño declarado'):
+        sessions.append(upload_id, 3000, io.BytesIO(DATA[3000:] + b'extra'))
+    with pytest.raises(ValueError, match='incompleta'):
+        sessions.finalize(upload_id)
+    with pytest.raises(ValueError):
+        sessions.create('huge.tif', len(DATA) * 3)
+
+
+def test_upload_resumes_after_restart(sessions):
+    upload_id = sessions.create('page_00001.tif', len(DATA))['upload_id']
+    sessions.append(upload_id, 0, io.BytesIO(DATA[:4096]))
+
+    # Otro gestor (servidor reiniciado) recupera la carga y su hash del disco
+    restarted = UploadSessionManager(sessions.upload_dir, sessions.max_size)
+    assert restarted.status(upload_id) == {
+        'upload_id': upload_id, 'filename': 'page_00001.tif', 'size': len(DATA), 'offset': 4096
+    }
+    restarted.append(upload_id, 4096, io.BytesIO(DATA[4096:]))
+    assert restarted.finalize(upload_id)[3] == hashlib.sha256(DATA).hexdigest()
+
+    with pytest.raises(KeyError):
+        restarted.status(upload_id)
+    with pytest.raises(KeyError):
+        restarted.status('no-es-un-id')
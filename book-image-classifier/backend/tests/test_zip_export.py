@@ -0,0 +1,86 @@
+import io
+import json
+import zipfile
+
+import cv2
+import pytest
+
+import utils.processing_pool as processing_pool
+from benchmarks.synthetic_pages import make_page
+from utils.processing_pool import ProcessingPool
+from utils.zip_export import convert_entries, iter_zip, plan_export, write_zip
+
+
+@pytest.fixture
+def pages(tmp_path):
+    """Dos páginas de un libro (JPEG y PNG) con sus registros y metadatos de exportación"""
+    records, metadata = {}, []
+    for n, extension in ((1, 'jpg'), (2, 'png')):
+        filename = f'page_{n:05d}.{extension}'
+        path = str(tmp_path / filename)
+        cv2.imwrite(path, make_page('text', 72, n))
+        records[filename] = {'original_filename': filename, 'filepath': path}
+        metadata.append({'original_filename': filename, 'new_filename': f'libro_{n:04d}.{extension}', 'page_number': n})
+    return records, metadata
+
+
+@pytest.fixture
+def local_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(processing_pool, '_classifier', None)
+    pool = ProcessingPool(workers=0, cache_path=str(tmp_path / 'cache.sqlite3'))
+    yield pool
+    pool.shutdown()
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_written_and_streamed_zips_are_valid(pages, tmp_path):
+    records, metadata = pages
+    entries, missing = plan_export(metadata, records, {'imageFormat': 'original'})
+    assert missing == []
+
+    path = str(tmp_path / 'export.zip')
+    written = []
+    write_zip(path, entries, lambda entry, size: written.append(entry.arcname))
+    streamed = b''.join(iter_zip(entries))
+
+    for archive in (zipfile.ZipFile(path), zipfile.ZipFile(io.BytesIO(streamed))):
+        with archive:
+            assert archive.testzip() is None
+            assert archive.namelist() == written == ['metadata.json', 'libro_0001.jpg', 'libro_0002.png']
+            infos = {info.filename: info for info in archive.infolist()}
+            # Solo los metadatos se comprimen: las imágenes se guardan tal cual
+            assert infos['metadata.json'].compress_type == zipfile.ZIP_DEFLATED
+            assert infos['libro_0001.jpg'].compress_type == zipfile.ZIP_STORED
+            assert archive.read('libro_0002.png') == _read_file(records['page_00002.png']['filepath'])
+            assert json.loads(archive.read('metadata.json')) == metadata
+
+
+def test_missing_files_are_reported_and_skipped(pages):
+    records, metadata = pages
+    records = dict(records, **{'page_00003.jpg': {'original_filename': 'page_00003.jpg', 'filepath': '/no/existe.jpg'}})
+    metadata = metadata + [{'original_filename': 'page_00003.jpg'}]
+    entries, missing = plan_export(metadata, records, {'includeMetadata': False, 'renameFiles': False})
+    assert missing == ['/no/existe.jpg']
+    assert [entry.arcname for entry in entries] == ['page_00001.jpg', 'page_00002.png']
+
+    with pytest.raises(ValueError):
+        plan_export(metadata, records, {'imageFormat': 'gif'})
+
+
+def test_converted_images_are_renamed_to_jpeg(pages, local_pool, tmp_path):
+    records, metadata = pages
+    entries, _ = plan_export(metadata, records, {'imageFormat': 'jpeg'})
+    tmp_dir = tmp_path / 'converted'
+    tmp_dir.mkdir()
+
+    with zipfile.ZipFile(io.BytesIO(b''.join(iter_zip(convert_entries(entries, local_pool, str(tmp_dir)))))) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ['metadata.json', 'libro_0001.jpg', 'libro_0002.jpg']
+        assert archive.read('libro_0002.jpg')[:3] == b'\xff\xd8\xff'
+        assert json.loads(archive.read('metadata.json'))[1]['new_filename'] == 'libro_0002.jpg'
+    # Los archivos convertidos se eliminan al escribirlos
+    assert list(tmp_dir.iterdir()) == []
@@ -0,0 +1,119 @@
+import json
+import os
+from datetime import datetime
+
+
+class BatchManifest:
+    """
+    Manifiesto reanudable (JSON Lines) de un procesamiento por lotes.
+
+    Cada línea registra una página analizada ('page') o un libro cuya salida
+    ya se escribió ('book'). Las líneas se vuelcan a disco una a una, de modo
+    que una ejecución interrumpida solo pierde la página en curso. Al reanudar,
+    una página cuyo tamaño y fecha de modificación no cambiaron no se vuelve a
+    analizar; las que fallaron se reintentan. Si una línea aparece varias
+    veces, prevalece la última.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Ruta del manifiesto (se crea al escribir la primera línea)
+        """
+        self.path = str(path)
+        self.pages = {}    # (libro, archivo) -> entrada
+        self.books = {}    # libro -> entrada
+        self._file = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Última línea a medio escribir de una ejecución interrumpida
+                    continue
+                if entry.get('kind') == 'page':
+                    self.pages[(entry['book'], entry['file'])] = entry
+                elif entry.get('kind') == 'book':
+                    self.books[entry['book']] = entry
+
+    def page(self, book, filename, stat):
+        """
+        Entrada vigente de una página
+
+        Args:
+            book (str): Libro (carpeta relativa)
+            filename (str): Nombre del archivo
+            stat (os.stat_result): Estado actual del archivo
+
+        Returns:
+            dict: Entrada del manifiesto, o None si la página no se analizó,
+                cambió en disco desde entonces o su análisis falló
+        """
+        entry = self.pages.get((book, filename))
+        if (entry is None or 'error' in entry or
+                entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns):
+            return None
+        return entry
+
+    def book_done(self, book, pages):
+        """Indica si la salida de un libro se escribió con su número actual de páginas"""
+        entry = self.books.get(book)
+        return entry is not None and entry['pages'] == pages
+
+    def record_page(self, book, filename, stat, **fields):
+        """
+        Registrar el análisis de una página
+
+        Args:
+            book (str): Libro (carpeta relativa)
+            filename (str): Nombre del archivo
+            stat (os.stat_result): Estado del archivo analizado
+            **fields: Resultado (type, confidence, ...) o error
+        """
+        entry = {
+            'kind': 'page', 'book': book, 'file': filename,
+            'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, **fields
+        }
+        self.pages[(book, filename)] = entry
+        self._write(entry)
+
+    def record_book(self, book, pages, **fields):
+        """
+        Registrar que la salida de un libro está completa
+
+        Args:
+            book (str): Libro (carpeta relativa)
+            pages (int): Páginas del libro en disco
+            **fields: Datos adicionales (archivos escritos, fallos...)
+        """
+        entry = {
+            'kind': 'book', 'book': book, 'pages': pages,
+            'completed_at': datetime.now().isoformat(timespec='seconds'), **fields
+        }
+        self.books[book] = entry
+        self._write(entry)
+
+    def _write(self, entry):
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Cerrar la línea incompleta que pudo dejar una interrupción
+            unterminated = False
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    unterminated = f.read(1) != b'\n'
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if unterminated:
+                self._file.write('\n')
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+class ClassificationCache:
+    """
+    Caché persistente (SQLite) de resultados de clasificación.
+
+    Las entradas se indexan por el hash del contenido del archivo y por una
+    huella de la versión del clasificador y de la configuración de análisis;
+    al cambiar la huella las entradas anteriores se descartan. Se expulsan
+    las entradas usadas menos recientemente al superar max_entries.
+
+    La conexión se abre de forma perezosa en cada proceso, por lo que la
+    instancia puede enviarse a los procesos del pool de clasificación.
+    """
+
+    def __init__(self, db_path, fingerprint, max_entries=200000):
+        """
+        Args:
+            db_path (str): Ruta del archivo SQLite
+            fingerprint (str): Huella de versión del clasificador y configuración
+            max_entries (int): Número máximo de entradas antes de expulsar
+        """
+        self.db_path = str(db_path)
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self._conn = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        return state
+
+    @staticmethod
+    def make_fingerprint(version, settings):
+        """
+        Calcular la huella de una versión del clasificador y su configuración
+
+        Args:
+            version (str): Versión de las reglas del clasificador
+            settings (dict): Parámetros que afectan al resultado
+
+        Returns:
+            str: Huella hexadecimal
+        """
+        payload = json.dumps({'version': version, 'settings': settings}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def hash_bytes(data):
+        """Hash de contenido usado como clave de la caché"""
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def hash_file(path, chunk_size=1024 * 1024):
+        """Hash de contenido de un archivo leído por bloques (igual a hash_bytes de su contenido)"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS classifications (
+                    content_hash TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (content_hash, fingerprint)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_classifications_last_used ON classifications (last_used)')
+            # Invalidar entradas de versiones o configuraciones anteriores
+            conn.execute('DELETE FROM classifications WHERE fingerprint != ?', (self.fingerprint,))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, content_hash):
+        """
+        Obtener el resultado guardado para un contenido
+
+        Returns:
+            dict: Resultado guardado o None si no está en caché
+        """
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT payload FROM classifications WHERE content_hash = ? AND fingerprint = ?',
+            (content_hash, self.fingerprint)
+        ).fetchone()
+        if row is None:
+            return None
+
+        conn.execute(
+            'UPDATE classifications SET last_used = ? WHERE content_hash = ? AND fingerprint = ?',
+            (time.time(), content_hash, self.fingerprint)
+        )
+        conn.commit()
+        return json.loads(row[0])
+
+    def put(self, content_hash, result):
+        """
+        Guardar el resultado de un contenido y expulsar entradas antiguas si hace falta
+
+        Args:
+            content_hash (str): Hash del contenido
+            result (dict): Resultado serializable en JSON
+        """
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO classifications (content_hash, fingerprint, payload, last_used) VALUES (?, ?, ?, ?)',
+            (content_hash, self.fingerprint, json.dumps(result), time.time())
+        )
+        excess = conn.execute('SELECT COUNT(*) FROM classifications').fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                'DELETE FROM classifications WHERE rowid IN '
+                '(SELECT rowid FROM classifications ORDER BY last_used LIMIT ?)',
+                (excess,)
+            )
+        conn.commit()
@@ -0,0 +1,154 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class DerivativeCache:
+    """
+    Caché en disco de derivados de imágenes (miniaturas y previsualizaciones web).
+
+    Los derivados se generan la primera vez que se piden y se guardan como JPEG
+    en cache_dir. El tamaño total está acotado por max_bytes: al superarlo se
+    eliminan los derivados usados menos recientemente. El orden de uso se
+    conserva entre reinicios a través de la fecha de modificación de los archivos.
+    """
+
+    def __init__(self, cache_dir, max_bytes, thumbnail_size=(200, 200), preview_widths=(600, 1200, 2000)):
+        """
+        Args:
+            cache_dir (str): Directorio de los derivados
+            max_bytes (int): Tamaño máximo total de la caché
+            thumbnail_size (tuple): Tamaño máximo de las miniaturas (width, height)
+            preview_widths (tuple): Anchos de previsualización admitidos
+        """
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = max_bytes
+        self.thumbnail_size = tuple(thumbnail_size)
+        self.preview_widths = tuple(sorted(preview_widths))
+        self._entries = OrderedDict()  # nombre de archivo -> tamaño, del menos al más reciente
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._processor = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Reconstruir el índice LRU a partir de los archivos existentes"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.jpg'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+            elif entry.is_file() and entry.name.endswith('.tmp'):
+                # Restos de una generación interrumpida
+                os.remove(entry.path)
+
+        for _, name, size in sorted(entries):
+            self._entries[name] = size
+            self._total_bytes += size
+
+    def _get_processor(self):
+        if self._processor is None:
+            # Importación diferida: ImageProcessor carga cv2
+            from utils.image_processing import ImageProcessor
+            self._processor = ImageProcessor()
+        return self._processor
+
+    def preview_width(self, width=None):
+        """
+        Ajustar un ancho pedido al ancho de previsualización admitido más próximo por arriba,
+        para que la caché no crezca con un derivado por cada ancho arbitrario
+
+        Returns:
+            int: Ancho admitido
+        """
+        if not width:
+            return self.preview_widths[len(self.preview_widths) // 2]
+        for allowed in self.preview_widths:
+            if width <= allowed:
+                return allowed
+        return self.preview_widths[-1]
+
+    def thumbnail(self, image_id, source_path):
+        """
+        Obtener la ruta de la miniatura de una imagen, generándola si no existe
+
+        Returns:
+            str: Ruta del JPEG en caché
+        """
+        name = f'{image_id}_thumb.jpg'
+        return self._get_or_create(
+            name, lambda output_path: self._get_processor().create_thumbnail(source_path, output_path, self.thumbnail_size)
+        )
+
+    def preview(self, image_id, source_path, width=None):
+        """
+        Obtener la ruta de la previsualización web de una imagen, generándola si no existe
+
+        Args:
+            width (int): Ancho deseado (se ajusta con preview_width)
+
+        Returns:
+            str: Ruta del JPEG en caché
+        """
+        width = self.preview_width(width)
+        name = f'{image_id}_w{width}.jpg'
+        return self._get_or_create(
+            name, lambda output_path: self._get_processor().resize_for_web(source_path, output_path, width)
+        )
+
+    def discard(self, image_ids):
+        """
+        Eliminar todos los derivados (miniatura y previsualizaciones) de imágenes borradas
+
+        Args:
+            image_ids (iterable): Ids de las imágenes
+        """
+        image_ids = set(image_ids)
+        with self._lock:
+            # Los nombres son '<id>_thumb.jpg' y '<id>_w<ancho>.jpg'
+            names = [name for name in self._entries if name.rsplit('_', 1)[0] in image_ids]
+            for name in names:
+                self._total_bytes -= self._entries.pop(name)
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    def _get_or_create(self, name, generate):
+        path = os.path.join(self.cache_dir, name)
+
+        with self._lock:
+            if name in self._entries and os.path.exists(path):
+                self._entries.move_to_end(name)
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return path
+
+        # Generar fuera del lock; el archivo temporal evita servir derivados a medias
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            generate(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._evict()
+        return path
+
+    def _evict(self):
+        """Eliminar los derivados menos recientes hasta respetar max_bytes (requiere el lock)"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
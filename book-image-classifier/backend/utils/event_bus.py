@@ -0,0 +1,135 @@
+import itertools
+import json
+import threading
+from collections import deque, namedtuple
+
+# Evento ya serializado: id consecutivo, tipo, proyecto (None = todos) y datos en JSON
+Event = namedtuple('Event', ['id', 'type', 'project_id', 'data'])
+
+
+class Subscription:
+    """
+    Cola de eventos de un cliente, acotada a buffer_size.
+
+    Si el cliente no consume a tiempo se descartan sus eventos más antiguos y
+    se marca la suscripción como desbordada: el cliente debe resincronizarse
+    (p. ej. con GET /api/images?since=<versión>) en lugar de recibir el resto.
+    """
+
+    def __init__(self, bus, buffer_size, project_id=None):
+        self._bus = bus
+        self._events = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self.project_id = project_id
+        self.overflowed = False
+
+    def _push(self, event):
+        if self.project_id is not None and event.project_id not in (None, self.project_id):
+            return
+        with self._condition:
+            if len(self._events) == self._events.maxlen:
+                self.overflowed = True
+            self._events.append(event)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Esperar eventos pendientes
+
+        Args:
+            timeout (float): Segundos máximos de espera
+
+        Returns:
+            tuple: (lista de Event, bool indicando si se perdieron eventos).
+                La lista vacía indica que venció el tiempo de espera.
+        """
+        with self._condition:
+            if not self._events and not self.overflowed:
+                self._condition.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            overflowed, self.overflowed = self.overflowed, False
+        return events, overflowed
+
+    def close(self):
+        """Dejar de recibir eventos"""
+        self._bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    Difusión de eventos en proceso a clientes suscritos (Server-Sent Events).
+
+    Cada evento se serializa una sola vez al publicarlo y se copia a la cola
+    acotada de cada suscriptor, por lo que un cliente lento no hace crecer la
+    memoria del servidor. Los últimos eventos se conservan para que un cliente
+    que se reconecta con Last-Event-ID reciba lo que se perdió.
+    """
+
+    def __init__(self, buffer_size=1000, serialize=json.dumps):
+        """
+        Args:
+            buffer_size (int): Eventos máximos pendientes por cliente y en el historial
+            serialize (callable): Conversión de los datos de un evento a JSON
+        """
+        self.buffer_size = buffer_size
+        self.serialize = serialize
+        self._subscribers = set()
+        self._history = deque(maxlen=buffer_size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data, project_id=None):
+        """
+        Publicar un evento para todos los suscriptores
+
+        Args:
+            event_type (str): Tipo de evento ('classified', 'numbered', ...)
+            data (dict): Datos serializables del evento
+            project_id (str): Proyecto al que se refiere (None = a todos). Se
+                añade a los datos como project_id para que el cliente pueda comprobarlo.
+        """
+        payload = self.serialize(data if project_id is None else {**data, 'project_id': project_id})
+        with self._lock:
+            event = Event(next(self._ids), event_type, project_id, payload)
+            self._history.append(event)
+            # Dentro del lock: todos los clientes reciben los eventos en orden de id
+            for subscription in self._subscribers:
+                subscription._push(event)
+
+    def subscribe(self, project_id=None, last_event_id=None):
+        """
+        Suscribir un cliente
+
+        Args:
+            project_id (str): Opcional, recibir solo los eventos de un proyecto
+            last_event_id (int): Opcional, último evento recibido antes de reconectarse;
+                se reenvían los posteriores o se marca la suscripción como desbordada
+                si ya no están en el historial
+
+        Returns:
+            Subscription: Cola de eventos del cliente
+        """
+        subscription = Subscription(self, self.buffer_size, project_id)
+        with self._lock:
+            if last_event_id is not None:
+                # Sin historial que cubra el hueco (o con ids de un arranque anterior
+                # del servidor) no se puede saber qué se perdió: hay que resincronizar
+                history = self._history
+                if not history or history[0].id > last_event_id + 1 or history[-1].id < last_event_id:
+                    subscription.overflowed = True
+                else:
+                    for event in history:
+                        if event.id > last_event_id:
+                            subscription._push(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @staticmethod
+    def format(event):
+        """Representación de un evento en el formato text/event-stream"""
+        return f'id: {event.id}\nevent: {event.type}\ndata: {event.data}\n\n'
@@ -0,0 +1,281 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Archivo estable listo para ingerir. previous es la versión ingerida antes
+# desde la misma ruta ({'content_hash', 'image_id'}) o None si es nuevo.
+ReadyFile = namedtuple('ReadyFile', ['path', 'relpath', 'size', 'mtime_ns', 'previous'])
+
+# Tamaño de los bloques al copiar y calcular el hash
+CHUNK_SIZE = 1024 * 1024
+
+
+class HotFolderScanner:
+    """
+    Exploración incremental de una carpeta vigilada (hot folder).
+
+    Guarda en SQLite la ruta, tamaño, fecha de modificación, hash e imagen de
+    cada archivo ingerido. Cada exploración solo consulta el estado de los
+    archivos (stat) y compara su tamaño y fecha con lo ingerido, de modo que
+    volver a recorrer un árbol grande no lee ni calcula el hash de nada que
+    no haya cambiado. Un archivo nuevo o modificado solo se entrega cuando
+    mantiene el mismo tamaño y fecha durante settle_seconds (el escáner
+    terminó de escribirlo). Un archivo cuya ingesta falló no se vuelve a
+    entregar mientras conserve el mismo tamaño y fecha (ver mark_failed).
+
+    Solo un proceso debe explorar la carpeta (otra instancia de la app o el
+    proceso padre del recargador de Flask importan la app): antes de explorar
+    hay que obtener el bloqueo exclusivo con acquire_lock.
+    """
+
+    def __init__(self, root, state_path, settle_seconds=5, extensions=None):
+        """
+        Args:
+            root (str): Carpeta vigilada
+            state_path (str): Ruta del SQLite con los archivos ingeridos
+            settle_seconds (float): Tiempo sin cambios para considerar un archivo completo
+            extensions (set): Extensiones admitidas, en minúsculas y sin punto (None = todas)
+        """
+        self.root = os.path.abspath(root)
+        self.state_path = str(state_path)
+        self.settle_seconds = settle_seconds
+        self.extensions = extensions
+        # ruta -> (tamaño, mtime_ns, hash, id de imagen) de lo ingerido
+        self._ingested = {}
+        # ruta -> ((tamaño, mtime_ns), momento en que se observó por primera vez así)
+        self._candidates = {}
+        # Rutas entregadas cuya ingesta aún no terminó
+        self._in_flight = set()
+        # ruta -> (tamaño, mtime_ns) con que falló su ingesta
+        self._failed = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._lock_file = None
+        self.last_scan = None
+        self._load()
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.state_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS ingested (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    image_id TEXT,
+                    ingested_at TEXT NOT NULL
+                )
+            ''')
+        return self._conn
+
+    def _load(self):
+        rows = self._connection().execute('SELECT path, size, mtime_ns, content_hash, image_id FROM ingested')
+        self._ingested = {row[0]: row[1:] for row in rows}
+
+    def acquire_lock(self):
+        """
+        Intentar obtener el bloqueo exclusivo de la carpeta vigilada, sin esperar
+
+        El bloqueo (sobre <state_path>.lock) dura mientras viva el proceso: si
+        el proceso que exploraba termina, otro puede tomar el relevo. Al
+        obtenerlo se recarga el estado que pudo escribir el anterior.
+
+        Returns:
+            bool: True si este proceso tiene el bloqueo
+        """
+        with self._lock:
+            if self._lock_file is not None:
+                return True
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+            lock_file = open(f'{self.state_path}.lock', 'a+b')
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            except OSError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+        self._load()
+        return True
+
+    def _iter_files(self):
+        """Archivos bajo la carpeta vigilada (se omiten los ocultos y las extensiones no admitidas)"""
+        stack = [self.root]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        if self.extensions is None or entry.name.rsplit('.', 1)[-1].lower() in self.extensions:
+                            yield entry
+
+    def scan(self):
+        """
+        Recorrer la carpeta vigilada
+
+        Returns:
+            list: ReadyFile de los archivos nuevos o modificados que ya no cambian,
+                por ruta relativa. Siguen apareciendo en cada exploración hasta
+                que se registran con mark_ingested, se reservan con mark_in_flight
+                o se descartan con mark_failed.
+        """
+        start = time.perf_counter()
+        now = time.monotonic()
+        ready = []
+        seen = set()
+        files = 0
+        for entry in self._iter_files():
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                # Eliminado o movido durante la exploración
+                continue
+            files += 1
+            signature = (stat.st_size, stat.st_mtime_ns)
+            known = self._ingested.get(entry.path)
+            if (known is not None and known[:2] == signature) or entry.path in self._in_flight:
+                continue
+            if entry.path in self._failed:
+                if self._failed[entry.path] == signature:
+                    continue
+                # Se volvió a escribir: se reintenta
+                with self._lock:
+                    self._failed.pop(entry.path, None)
+
+            seen.add(entry.path)
+            candidate = self._candidates.get(entry.path)
+            if candidate is None or candidate[0] != signature:
+                # Nuevo o todavía creciendo: se vuelve a comprobar en la próxima exploración
+                self._candidates[entry.path] = (signature, now)
+                continue
+            if now - candidate[1] >= self.settle_seconds:
+                previous = {'content_hash': known[2], 'image_id': known[3]} if known is not None else None
+                ready.append(ReadyFile(
+                    entry.path, os.path.relpath(entry.path, self.root), stat.st_size, stat.st_mtime_ns, previous
+                ))
+
+        # Candidatos que desaparecieron antes de estabilizarse
+        for path in [path for path in self._candidates if path not in seen]:
+            del self._candidates[path]
+
+        ready.sort(key=lambda item: item.relpath)
+        with self._lock:
+            self.last_scan = {
+                'at': datetime.now().isoformat(timespec='seconds'),
+                'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+                'files': files,
+                'waiting': len(self._candidates) - len(ready),
+                'ready': len(ready)
+            }
+        return ready
+
+    def mark_in_flight(self, items):
+        """
+        Reservar archivos cuya ingesta está en curso: no se vuelven a entregar
+        hasta que se registran con mark_ingested o mark_failed
+
+        Args:
+            items (list): ReadyFile entregados por scan
+        """
+        with self._lock:
+            self._in_flight.update(item.path for item in items)
+
+    def mark_failed(self, items):
+        """
+        Registrar archivos cuya ingesta falló (p. ej. imagen dañada o ilegible)
+
+        No se vuelven a entregar hasta que cambian su tamaño o su fecha. El
+        registro es solo en memoria: al reiniciar el proceso se reintentan.
+
+        Args:
+            items (list): ReadyFile entregados por scan
+        """
+        with self._lock:
+            for item in items:
+                self._failed[item.path] = (item.size, item.mtime_ns)
+                self._candidates.pop(item.path, None)
+                self._in_flight.discard(item.path)
+
+    def mark_ingested(self, items):
+        """
+        Registrar archivos ingeridos (o cuyo contenido resultó no haber cambiado)
+
+        Args:
+            items (list): Tuplas (ReadyFile, content_hash, image_id)
+        """
+        if not items:
+            return
+        ingested_at = datetime.now().isoformat(timespec='seconds')
+        conn = self._connection()
+        with self._lock, conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO ingested (path, size, mtime_ns, content_hash, image_id, ingested_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(item.path, item.size, item.mtime_ns, content_hash, image_id, ingested_at)
+                 for item, content_hash, image_id in items]
+            )
+            for item, content_hash, image_id in items:
+                self._ingested[item.path] = (item.size, item.mtime_ns, content_hash, image_id)
+                self._candidates.pop(item.path, None)
+                self._in_flight.discard(item.path)
+
+    def status(self):
+        """Estado de la carpeta vigilada y de la última exploración"""
+        with self._lock:
+            return {
+                'root': self.root, 'watching': self._lock_file is not None,
+                'ingested': len(self._ingested), 'failed': len(self._failed), 'last_scan': self.last_scan
+            }
+
+    @staticmethod
+    def copy_file(item, target_path):
+        """
+        Copiar un archivo listo calculando su hash en la misma lectura
+
+        Args:
+            item (ReadyFile): Archivo a copiar
+            target_path (str): Ruta de la copia
+
+        Returns:
+            str: Hash de contenido (el de ClassificationCache)
+
+        Raises:
+            ValueError: Si el archivo cambió mientras se copiaba (la copia se elimina)
+        """
+        digest = hashlib.sha256()
+        try:
+            with open(item.path, 'rb') as src, open(target_path, 'wb') as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    dst.write(chunk)
+            stat = os.stat(item.path)
+            if (stat.st_size, stat.st_mtime_ns) != (item.size, item.mtime_ns):
+                raise ValueError(f'El archivo cambió durante la copia: {item.relpath}')
+        except BaseException:
+            if os.path.exists(target_path):
+                os.remove(target_path)
+            raise
+        return digest.hexdigest()
@@ -10,17 +10,21 @@ class ImageProcessor:
     def __init__(self):
         self.supported_formats = {'.jpg', '.jpeg', '.png', '.tiff', '.tif'}
     
-    def get_image_info(self, image_path):
+    def get_image_info(self, image_path, context=None):
         """
         Obtener información básica de una imagen
         
         Args:
             image_path (str): Ruta a la imagen
+            context (ImageAnalysisContext): Contexto de análisis ya cargado (opcional)
             
         Returns:
             dict: Información de la imagen
         """
         try:
+            if context is not None:
+                return dict(context.image_info)
+            
             with Image.open(image_path) as img:
                 file_stats = os.stat(image_path)
                 
@@ -31,7 +35,8 @@ class ImageProcessor:
                     'mode': img.mode,
                     'size_bytes': file_stats.st_size,
                     'has_transparency': img.mode in ('RGBA', 'LA') or 'transparency' in img.info,
-                    'dpi': img.info.get('dpi', (72, 72))
+                    # TIFF da la resolución como IFDRational, que no se puede serializar en JSON
+                    'dpi': tuple(float(value) for value in img.info.get('dpi', (72, 72)))
                 }
                 
         except Exception as e:
@@ -48,6 +53,10 @@ class ImageProcessor:
         """
         try:
             with Image.open(image_path) as img:
+                # JPEG: decodificar directamente a escala reducida (DCT)
+                img.draft('RGB', size)
+                img = self._to_web_mode(img)
+                
                 # Mantener aspecto ratio
                 img.thumbnail(size, Image.Resampling.LANCZOS)
                 
@@ -269,6 +278,11 @@ class ImageProcessor:
         """
         try:
             with Image.open(image_path) as img:
+                # JPEG: decodificar directamente a escala reducida (DCT)
+                if img.width > max_width:
+                    img.draft('RGB', (max_width, int(img.height * max_width / img.width)))
+                img = self._to_web_mode(img)
+                
                 # Calcular nuevo tamaño manteniendo aspecto ratio
                 if img.width > max_width:
                     ratio = max_width / img.width
@@ -291,6 +305,44 @@ class ImageProcessor:
         except Exception as e:
             raise ValueError(f"Cannot resize image {image_path}: {str(e)}")
     
+    def convert_to_jpeg(self, image_path, output_path, quality=90):
+        """
+        Convertir una imagen (TIFF, PNG...) a JPEG sin cambiar su tamaño
+        
+        Args:
+            image_path (str): Ruta a la imagen original
+            output_path (str): Ruta para guardar el JPEG
+            quality (int): Calidad JPEG
+        """
+        try:
+            with Image.open(image_path) as img:
+                dpi = img.info.get('dpi')
+                img = self._to_web_mode(img)
+                
+                # Crear fondo blanco para transparencias
+                if img.mode in ('RGBA', 'LA'):
+                    background = Image.new('RGB', img.size, (255, 255, 255))
+                    background.paste(img, mask=img.split()[-1])
+                    img = background
+                
+                # Conservar la resolución declarada del escaneo
+                options = {'dpi': dpi} if dpi else {}
+                img.save(output_path, 'JPEG', quality=quality, **options)
+                
+        except Exception as e:
+            raise ValueError(f"Cannot convert image {image_path}: {str(e)}")
+    
+    def _to_web_mode(self, img):
+        """Convertir modos que JPEG no admite (paleta, 16 bits, CMYK...) a RGB"""
+        if img.mode in ('RGB', 'L', 'RGBA', 'LA'):
+            return img
+        if img.mode == 'P' and 'transparency' in img.info:
+            return img.convert('RGBA')
+        if img.mode.startswith('I;16') or img.mode in ('I', 'F'):
+            # Escalar los 16 bits al rango de 8 bits antes de convertir
+            return img.convert('I').point(lambda value: value / 256).convert('L')
+        return img.convert('RGB')
+    
     def validate_image_file(self, file_path):
         """
         Validar que un archivo sea una imagen válida
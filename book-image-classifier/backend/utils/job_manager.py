@@ -0,0 +1,127 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class JobManager:
+    """Ejecución de trabajos en segundo plano con seguimiento de progreso"""
+
+    def __init__(self, workers=2, history_limit=100, on_finish=None):
+        """
+        Args:
+            workers (int): Hilos disponibles para ejecutar trabajos
+            history_limit (int): Trabajos terminados que se conservan para consulta
+            on_finish (callable): Opcional, recibe el estado final (get) de cada
+                trabajo al terminar, con éxito o con error
+        """
+        self.history_limit = history_limit
+        self.on_finish = on_finish
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+
+    def submit(self, kind, total, func, *args):
+        """
+        Crear un trabajo y ejecutarlo en segundo plano
+
+        Args:
+            kind (str): Tipo de trabajo ('upload', 'export', ...)
+            total (int): Número de elementos a procesar
+            func (callable): Función a ejecutar, recibe el id del trabajo y *args
+
+        Returns:
+            str: Id del trabajo
+        """
+        job_id = str(uuid.uuid4())
+        job = {
+            'id': job_id,
+            'kind': kind,
+            'status': 'pending',
+            'total': total,
+            'processed': 0,
+            'results': [],
+            'failures': [],
+            'stats': {},
+            'error': None,
+            'created_at': datetime.now().isoformat(),
+            'finished_at': None
+        }
+
+        with self._lock:
+            self._jobs[job_id] = job
+            self._prune()
+
+        self._executor.submit(self._run, job_id, func, *args)
+        return job_id
+
+    def _run(self, job_id, func, *args):
+        self.update(job_id, status='running')
+        try:
+            func(job_id, *args)
+            self.update(job_id, status='completed', finished_at=datetime.now().isoformat())
+        except Exception as e:
+            self.update(job_id, status='failed', error=str(e), finished_at=datetime.now().isoformat())
+        if self.on_finish:
+            self.on_finish(self.get(job_id))
+
+    def _prune(self):
+        """Descartar los trabajos terminados más antiguos (requiere el lock)"""
+        finished = [job_id for job_id, job in self._jobs.items() if job['finished_at']]
+        for job_id in finished[:max(0, len(finished) - self.history_limit)]:
+            del self._jobs[job_id]
+
+    def update(self, job_id, **fields):
+        """Actualizar campos de un trabajo"""
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def add_result(self, job_id, result):
+        """Registrar un elemento procesado correctamente"""
+        with self._lock:
+            job = self._jobs[job_id]
+            job['results'].append(result)
+            job['processed'] += 1
+
+    def add_failure(self, job_id, filename, error):
+        """Registrar un elemento que no se pudo procesar"""
+        with self._lock:
+            job = self._jobs[job_id]
+            job['failures'].append({'filename': filename, 'error': str(error)})
+            job['processed'] += 1
+
+    def increment(self, job_id, counter, amount=1):
+        """Incrementar un contador de estadísticas del trabajo"""
+        with self._lock:
+            stats = self._jobs[job_id]['stats']
+            stats[counter] = stats.get(counter, 0) + amount
+
+    def set_stats(self, job_id, **values):
+        """Fijar valores de estadísticas del trabajo"""
+        with self._lock:
+            self._jobs[job_id]['stats'].update(values)
+
+    def get(self, job_id):
+        """
+        Obtener una copia del estado de un trabajo
+
+        Returns:
+            dict: Estado del trabajo o None si no existe
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+
+            snapshot = dict(job)
+            snapshot['results'] = [dict(result) for result in job['results']]
+            snapshot['failures'] = list(job['failures'])
+            snapshot['stats'] = dict(job['stats'])
+            snapshot['progress'] = job['processed'] / job['total'] if job['total'] else 1.0
+            return snapshot
+
+    def shutdown(self):
+        """Esperar a que terminen los trabajos en curso"""
+        self._executor.shutdown(wait=True)
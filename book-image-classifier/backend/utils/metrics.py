@@ -0,0 +1,190 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+# Límites (s) de los histogramas de duración: de etapas de milisegundos a OCR y exportaciones largas
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Contexto vacío reutilizable cuando no se recogen tiempos
+_NOT_TIMED = nullcontext()
+
+
+class _StageTimer:
+    __slots__ = ('timings', 'stage', 'start')
+
+    def __init__(self, timings, stage):
+        self.timings = timings
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.timings[self.stage] = self.timings.get(self.stage, 0.0) + time.perf_counter() - self.start
+
+
+def timed(timings, stage):
+    """
+    Medir la duración de una etapa y acumularla en timings[stage]
+
+    Se usa en los procesos de trabajo, donde no hay registro de métricas: los
+    tiempos viajan con el resultado y el proceso principal los registra.
+
+    Args:
+        timings (dict): Tiempos en segundos por etapa (None = no medir, sin coste)
+        stage (str): Nombre de la etapa
+
+    Returns:
+        Gestor de contexto (with timed(timings, 'blank'): ...)
+    """
+    if timings is None:
+        return _NOT_TIMED
+    return _StageTimer(timings, stage)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labels=()):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            series = sorted(self._series.items())
+            lines.extend(self._render_series(series))
+        return lines
+
+
+class Counter(_Metric):
+    """Contador acumulado, opcionalmente por etiquetas"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """
+        Incrementar el contador
+
+        Args:
+            amount (float): Incremento (no negativo)
+            **labels: Valor de cada etiqueta declarada
+        """
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._series.get(self._key(labels), 0)
+
+    def _render_series(self, series):
+        for key, value in series:
+            yield f'{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}'
+
+
+class Histogram(_Metric):
+    """Histograma de valores (p. ej. duraciones en segundos) con límites fijos"""
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """
+        Registrar un valor
+
+        Args:
+            value (float): Valor observado
+            **labels: Valor de cada etiqueta declarada
+        """
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        # Se cuenta solo en el primer límite >= value; render acumula
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def _render_series(self, series):
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == '+Inf' else f'le="{_format_number(bound)}"'
+                yield f'{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}'
+            labels = _format_labels(self.label_names, key)
+            yield f'{self.name}_sum{labels} {_format_number(total)}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas en proceso con salida en formato de texto de Prometheus.
+
+    Con enabled=False los contadores e histogramas siguen existiendo pero
+    inc/observe vuelven de inmediato, de modo que el código instrumentado no
+    necesita comprobar si las métricas están activas.
+    """
+
+    def __init__(self, enabled=True):
+        """
+        Args:
+            enabled (bool): Registrar valores
+        """
+        self.enabled = enabled
+        self._metrics = []
+
+    def counter(self, name, documentation, labels=()):
+        """Crear y registrar un Counter"""
+        metric = Counter(self, name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        """Crear y registrar un Histogram"""
+        metric = Histogram(self, name, documentation, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        Exponer todas las métricas
+
+        Returns:
+            str: Formato de texto de Prometheus (text/plain; version=0.0.4)
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
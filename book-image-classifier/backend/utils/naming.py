@@ -0,0 +1,28 @@
+import os
+
+
+def generate_new_filename(image):
+    """
+    Generar el nombre de archivo de una página a partir de sus metadatos
+    ("<nombre> <tipo> p <número>", p. ej. "BO0624_00012 texto p [8] bis.tif")
+
+    Compartido por el servidor (app.py) y el procesamiento por lotes (cli.py).
+
+    Args:
+        image (dict): Registro con original_filename, type y los campos de numeración
+
+    Returns:
+        str: Nuevo nombre, con la extensión original
+    """
+    base_name, extension = os.path.splitext(image['original_filename'])
+    new_name = f"{base_name} {image.get('type', 'unknown')}"
+    
+    if image.get('page_number') is not None:
+        page_num_str = str(image['page_number'])
+        if image.get('phantom_number', False):
+            page_num_str = f"[{page_num_str}]"
+        if image.get('number_exception'):
+            page_num_str = f"{page_num_str} {image['number_exception']}"
+        new_name += f" p {page_num_str}"
+        
+    return f"{new_name}{extension}"
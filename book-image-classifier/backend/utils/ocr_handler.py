@@ -1,19 +1,41 @@
-import pytesseract
 from PIL import Image
-import os
+
+from utils.ocr_service import OCRService
 
 class OCRHandler:
-    def __init__(self):
-        # Configurar path de Tesseract si es necesario
-        tesseract_cmd = os.environ.get('TESSERACT_CMD')
-        if tesseract_cmd:
-            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    """Extracción de texto de archivos de imagen sobre el servicio OCR"""
+
+    def __init__(self, service=None, ocr_config=None, workers=0):
+        """
+        Args:
+            service (OCRService): Servicio OCR compartido (p. ej. el de la app)
+            ocr_config (dict): Configuración de Tesseract ({'lang', 'psm', 'oem'})
+                del servicio propio, si no se indica service
+            workers (int): Procesos OCR persistentes del servicio propio
+        """
+        # El path de Tesseract (TESSERACT_CMD) lo aplica el propio servicio
+        self._owns_service = service is None
+        self.service = service or OCRService(workers=workers, **(ocr_config or {}))
     
-    def extract_text(self, image_path, lang='spa+eng'):
+    def extract_text(self, image_path, lang=None):
+        """
+        Extraer el texto de un archivo de imagen
+
+        Args:
+            image_path (str): Ruta a la imagen
+            lang (str): Idiomas (por defecto los del servicio)
+
+        Returns:
+            str: Texto reconocido, o cadena vacía si falla el OCR
+        """
         try:
             with Image.open(image_path) as img:
-                text = pytesseract.image_to_string(img, lang=lang)
-                return text.strip()
+                return self.service.recognize(img.copy(), lang=lang).strip()
         except Exception as e:
             print(f"OCR error: {e}")
-            return ""
\ No newline at end of file
+            return ""
+    
+    def close(self):
+        """Detener el servicio propio (un servicio compartido lo cierra quien lo creó)"""
+        if self._owns_service:
+            self.service.close()
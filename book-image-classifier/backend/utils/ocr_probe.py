@@ -0,0 +1,126 @@
+import glob
+import json
+import os
+import shutil
+import subprocess
+
+# Tiempo máximo para cada invocación del ejecutable durante el sondeo
+PROBE_TIMEOUT = 10
+
+
+def _find_binary(tesseract_cmd=None):
+    """Ruta absoluta del ejecutable de Tesseract o None si no está instalado"""
+    return shutil.which(tesseract_cmd or os.environ.get('TESSERACT_CMD') or 'tesseract')
+
+
+def _tessdata_dirs(binary):
+    """
+    Directorios de idiomas que puede usar la instalación, sin ejecutar Tesseract
+
+    El directorio por defecto se fija al compilar Tesseract, así que se
+    consideran TESSDATA_PREFIX y las ubicaciones habituales junto al ejecutable
+    y del sistema que existan.
+    """
+    candidates = []
+    tessdata_prefix = os.environ.get('TESSDATA_PREFIX')
+    if tessdata_prefix:
+        # Tesseract 4+ espera el propio directorio tessdata; 3.x, el que lo contiene
+        candidates += [tessdata_prefix, os.path.join(tessdata_prefix, 'tessdata')]
+    bin_dir = os.path.dirname(os.path.realpath(binary))
+    for prefix in [os.path.dirname(bin_dir), '/usr', '/usr/local']:
+        candidates += [
+            os.path.join(prefix, 'share', 'tessdata'), os.path.join(prefix, 'share', 'tesseract-ocr', 'tessdata')
+        ]
+        candidates += glob.glob(os.path.join(prefix, 'share', 'tesseract-ocr', '*', 'tessdata'))
+    # Instalaciones de Windows: tessdata junto al ejecutable
+    candidates.append(os.path.join(bin_dir, 'tessdata'))
+    return sorted({os.path.realpath(path) for path in candidates if os.path.isdir(path)})
+
+
+def _signature(binary):
+    """
+    Identificar la instalación: si cambia el ejecutable o los idiomas instalados
+    (p. ej. se añade un .traineddata), se vuelve a sondear
+    """
+    if binary is None:
+        return None
+    stat = os.stat(binary)
+    tessdata = []
+    for path in _tessdata_dirs(binary):
+        try:
+            languages = sorted(name for name in os.listdir(path) if name.endswith('.traineddata'))
+            tessdata.append([path, os.stat(path).st_mtime_ns, languages])
+        except OSError:
+            continue
+    return [binary, stat.st_size, stat.st_mtime, os.environ.get('TESSDATA_PREFIX'), tessdata]
+
+
+def _run(binary, *args):
+    completed = subprocess.run(
+        [binary, *args], capture_output=True, text=True, timeout=PROBE_TIMEOUT
+    )
+    # Según la versión, Tesseract escribe en stdout o en stderr
+    return (completed.stdout or completed.stderr).strip()
+
+
+def _probe(binary):
+    if binary is None:
+        return {'available': False, 'path': None, 'version': None, 'languages': []}
+
+    try:
+        version_lines = _run(binary, '--version').splitlines()
+        version = version_lines[0].split()[-1] if version_lines else None
+        # La primera línea de --list-langs es una cabecera
+        languages = sorted(line.strip() for line in _run(binary, '--list-langs').splitlines()[1:] if line.strip())
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"Warning: Tesseract probe failed: {e}")
+        return {'available': False, 'path': binary, 'version': None, 'languages': []}
+
+    return {'available': True, 'path': binary, 'version': version, 'languages': languages}
+
+
+def probe_ocr(cache_path=None, tesseract_cmd=None):
+    """
+    Obtener las capacidades OCR instaladas (ejecutable, versión e idiomas)
+
+    El resultado se guarda en disco junto con una firma del ejecutable, de modo
+    que los arranques siguientes no lanzan Tesseract mientras la instalación no
+    cambie.
+
+    Args:
+        cache_path (str): Archivo JSON de caché (None desactiva la caché)
+        tesseract_cmd (str): Ejecutable de Tesseract (por defecto TESSERACT_CMD o el PATH)
+
+    Returns:
+        dict: {'available': bool, 'path': str, 'version': str, 'languages': list}
+    """
+    binary = _find_binary(tesseract_cmd)
+    signature = _signature(binary)
+
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('signature') == signature:
+                return cached['result']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    result = _probe(binary)
+
+    if cache_path:
+        try:
+            os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+            tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'signature': signature, 'result': result}, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Warning: could not cache OCR probe: {e}")
+
+    return result
+
+
+def supports_languages(probe, lang):
+    """Comprobar que están instalados todos los idiomas de una cadena 'spa+eng'"""
+    return probe['available'] and all(code in probe['languages'] for code in lang.split('+'))
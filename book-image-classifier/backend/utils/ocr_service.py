@@ -0,0 +1,225 @@
+import multiprocessing
+import os
+import queue
+import threading
+
+# numpy, PIL, pytesseract y tesserocr se importan al crear el motor (ver OCREngine),
+# en el proceso que hace el OCR: importar el servicio (p. ej. desde la app) no los carga.
+
+
+class OCREngine:
+    """Motor OCR de un solo proceso, configurado una vez y reutilizado"""
+
+    def __init__(self, lang='spa+eng', psm=6, oem=3, tesseract_cmd=None):
+        """
+        Args:
+            lang (str): Idiomas de Tesseract
+            psm (int): Modo de segmentación de página
+            oem (int): Modo de motor OCR
+            tesseract_cmd (str): Ruta al ejecutable de Tesseract (solo pytesseract)
+        """
+        import pytesseract
+
+        # tesserocr (en requirements.txt) mantiene la API de Tesseract cargada en memoria
+        # entre llamadas. Si no se puede importar (p. ej. se instaló sin las bibliotecas
+        # de Tesseract) se usa pytesseract, que lanza un proceso tesseract por página.
+        try:
+            import tesserocr
+        except ImportError:
+            tesserocr = None
+            print("Warning: tesserocr not available. OCR will start one tesseract process per page.")
+
+        self.lang = lang
+        self.psm = psm
+        self.oem = oem
+        self._pytesseract = pytesseract
+        self._tesserocr = tesserocr
+        self._apis = {}
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    def _api(self, lang):
+        """API de tesserocr por idioma, creada la primera vez que se usa"""
+        if lang not in self._apis:
+            self._apis[lang] = self._tesserocr.PyTessBaseAPI(lang=lang, psm=self.psm, oem=self.oem)
+        return self._apis[lang]
+
+    def recognize(self, image, lang=None):
+        """
+        Extraer el texto de una imagen
+
+        Args:
+            image (numpy.ndarray | PIL.Image): Imagen a reconocer
+            lang (str): Idiomas (por defecto los del motor)
+
+        Returns:
+            str: Texto reconocido
+        """
+        import numpy as np
+        from PIL import Image
+
+        lang = lang or self.lang
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+
+        if self._tesserocr is not None:
+            api = self._api(lang)
+            api.SetImage(image)
+            return api.GetUTF8Text()
+
+        return self._pytesseract.image_to_string(image, lang=lang, config=f'--psm {self.psm} --oem {self.oem}')
+
+    def close(self):
+        for api in self._apis.values():
+            api.End()
+        self._apis.clear()
+
+
+def _worker_main(conn, engine_options):
+    """Bucle de un proceso OCR persistente: recibe imágenes por el pipe y devuelve texto"""
+    engine = OCREngine(**engine_options)
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            image, lang = message
+            try:
+                conn.send(('ok', engine.recognize(image, lang)))
+            except Exception as e:
+                conn.send(('error', str(e)))
+    finally:
+        engine.close()
+        conn.close()
+
+
+class OCRService:
+    """
+    Servicio OCR del clasificador, creado una vez desde la configuración (OCR_CONFIG, OCR_WORKERS).
+
+    Con workers > 0 mantiene ese número de procesos OCR persistentes, cada uno
+    con su motor ya inicializado, y les envía las páginas por pipes. Con
+    workers = 0 usa un único motor en el proceso actual (p. ej. dentro de los
+    procesos del pool de clasificación, que ya son persistentes).
+    """
+
+    def __init__(self, workers=0, lang='spa+eng', psm=6, oem=3, tesseract_cmd=None):
+        """
+        Args:
+            workers (int): Procesos OCR persistentes (0 = en el proceso actual)
+            lang (str): Idiomas de Tesseract
+            psm (int): Modo de segmentación de página
+            oem (int): Modo de motor OCR
+            tesseract_cmd (str): Ruta al ejecutable de Tesseract
+        """
+        self.workers = workers
+        self.engine_options = {
+            'lang': lang,
+            'psm': psm,
+            'oem': oem,
+            'tesseract_cmd': tesseract_cmd or os.environ.get('TESSERACT_CMD')
+        }
+        self._engine = None
+        self._processes = []
+        self._idle = queue.Queue()
+        self._start_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, ocr_config, workers=0):
+        """Crear el servicio a partir de Config.OCR_CONFIG ({'lang', 'psm', 'oem'})"""
+        return cls(workers=workers, **ocr_config)
+
+    def _spawn(self):
+        """Arrancar un proceso OCR y dejar su conexión disponible (requiere _start_lock)"""
+        context = multiprocessing.get_context()
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(target=_worker_main, args=(child_conn, self.engine_options), daemon=True)
+        process.start()
+        child_conn.close()
+        self._processes.append((process, parent_conn))
+        self._idle.put(parent_conn)
+
+    def _replace(self, conn):
+        """Cerrar la conexión de un proceso OCR que dejó de responder, recogerlo y arrancar otro"""
+        conn.close()
+        with self._start_lock:
+            for entry in self._processes:
+                if entry[1] is conn:
+                    self._processes.remove(entry)
+                    process = entry[0]
+                    process.join(timeout=1)
+                    if process.is_alive():
+                        process.kill()
+                        process.join()
+                    # Tras close() ya no está en la lista: no se arranca otro
+                    self._spawn()
+                    break
+
+    def _start(self):
+        """Arrancar los procesos OCR la primera vez que se necesitan"""
+        with self._start_lock:
+            if self._processes:
+                return
+            for _ in range(self.workers):
+                self._spawn()
+
+    def recognize(self, image, lang=None):
+        """
+        Extraer el texto de una imagen
+
+        Args:
+            image (numpy.ndarray | PIL.Image): Imagen a reconocer
+            lang (str): Idiomas (por defecto los de la configuración)
+
+        Returns:
+            str: Texto reconocido
+        """
+        if self.workers <= 0:
+            if self._engine is None:
+                self._engine = OCREngine(**self.engine_options)
+            return self._engine.recognize(image, lang)
+
+        if not self._processes:
+            self._start()
+
+        # Por el pipe viajan arrays (una imagen PIL se convierte aquí)
+        if not hasattr(image, 'shape'):
+            import numpy as np
+
+            image = np.asarray(image)
+
+        conn = self._idle.get()
+        healthy = False
+        try:
+            conn.send((image, lang))
+            status, payload = conn.recv()
+            healthy = True
+        except (EOFError, OSError) as e:
+            # El proceso terminó (p. ej. Tesseract abortó con esta página)
+            raise RuntimeError(f'El proceso OCR terminó inesperadamente: {e!r}') from e
+        finally:
+            # Solo vuelven al grupo las conexiones que completaron el intercambio:
+            # las demás pueden estar cerradas o tener una respuesta pendiente
+            if healthy:
+                self._idle.put(conn)
+            else:
+                self._replace(conn)
+
+        if status == 'error':
+            raise RuntimeError(payload)
+        return payload
+
+    def close(self):
+        """Detener los procesos OCR"""
+        if self._engine is not None:
+            self._engine.close()
+            self._engine = None
+
+        for process, conn in self._processes:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=5)
+        self._processes = []
+        self._idle = queue.Queue()
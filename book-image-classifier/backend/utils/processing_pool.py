@@ -0,0 +1,306 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+from utils.classification_cache import ClassificationCache
+from utils.metrics import timed
+
+# cv2, numpy y el clasificador se importan al inicializar cada proceso de trabajo
+# (ver _init_worker), no al importar este módulo: el servidor arranca sin cargarlos.
+
+# Forma de las entradas de la caché de clasificación (forma parte de su huella:
+# cambiarla descarta las entradas anteriores)
+CACHE_PAYLOAD_VERSION = 3
+
+# Componentes cargados una sola vez por proceso de trabajo (ver _init_worker)
+_classifier = None
+_image_processor = None
+_analysis_max_dimension = None
+_cache = None
+_collect_timings = False
+
+
+def _init_worker(analysis_max_dimension=None, cache=None, classifier_options=None, collect_timings=False,
+                 ocr_service=None):
+    """Inicializar los componentes pesados al arrancar cada proceso de trabajo"""
+    global _classifier, _image_processor, _analysis_max_dimension, _cache, _collect_timings
+    from models.classifier import ImageClassifier
+    from utils.image_processing import ImageProcessor
+
+    _classifier = ImageClassifier(**(classifier_options or {}), ocr_service=ocr_service)
+    _image_processor = ImageProcessor()
+    _analysis_max_dimension = analysis_max_dimension
+    _cache = cache
+    _collect_timings = collect_timings
+
+
+def analyze_image(filepath, filename, content_hash=None):
+    """
+    Obtener información y clasificación de una imagen ya guardada en disco
+
+    Args:
+        filepath (str): Ruta a la imagen
+        filename (str): Nombre original del archivo
+        content_hash (str): Opcional, hash ya calculado durante la carga; si el
+            resultado está en caché el archivo no llega a leerse
+
+    Returns:
+        dict: {'image_info': dict, 'classification': dict,
+               'content_hash': str, 'cached': bool}, más 'timings' (segundos
+               por etapa) si el pool mide tiempos y la imagen no estaba en caché
+
+    La caché guarda la información de la imagen y su clasificación por
+    contenido, que no depende del nombre: las reglas del nombre del archivo se
+    aplican de nuevo en cada consulta. Las páginas que no se pudieron analizar
+    o cuyo nombre decidió sin analizar el contenido no se guardan.
+    """
+    from models.analysis_context import ImageAnalysisContext
+
+    timings = {} if _collect_timings else None
+    if content_hash is not None and _cache is not None:
+        cached = _cache.get(content_hash)
+        if cached is not None:
+            return _cached_result(cached, filename, content_hash)
+
+    # El archivo se lee una sola vez y se comparte entre hash, inspección y clasificación
+    context = ImageAnalysisContext(filepath, proxy_max_dimension=_analysis_max_dimension)
+    if content_hash is None:
+        with timed(timings, 'read'):
+            content_hash = ClassificationCache.hash_bytes(context.data)
+
+        if _cache is not None:
+            cached = _cache.get(content_hash)
+            if cached is not None:
+                return _cached_result(cached, filename, content_hash)
+
+    with timed(timings, 'info'):
+        image_info = _image_processor.get_image_info(filepath, context)
+    classification, content_classification = _classifier.classify(filepath, filename, context, timings)
+
+    if _cache is not None and content_classification is not None:
+        _cache.put(content_hash, {'image_info': image_info, 'content_classification': content_classification})
+
+    result = {
+        'image_info': image_info, 'classification': classification, 'content_hash': content_hash, 'cached': False
+    }
+    if timings is not None:
+        result['timings'] = timings
+    return result
+
+
+def _cached_result(cached, filename, content_hash):
+    """Resultado de analyze_image a partir de una entrada de la caché"""
+    return {
+        'image_info': cached['image_info'],
+        'classification': _classifier.combine_with_filename(filename, cached['content_classification']),
+        'content_hash': content_hash,
+        'cached': True
+    }
+
+
+def _worker_pid(_):
+    """Tarea vacía usada por warm_up; el inicializador ya cargó el clasificador"""
+    time.sleep(0.05)
+    return os.getpid()
+
+
+class ProcessingPool:
+    """Pool de procesos con clasificador precargado para procesar lotes de imágenes"""
+
+    def __init__(self, workers=None, analysis_max_dimension=None, cache_path=None, cache_max_entries=200000,
+                 classifier_options=None, collect_timings=False, ocr_service=None):
+        """
+        Args:
+            workers (int): Número de procesos. 0 procesa en el proceso actual.
+            analysis_max_dimension (int): Lado mayor mínimo del proxy de análisis
+            cache_path (str): Ruta de la caché de clasificación (None la desactiva)
+            cache_max_entries (int): Tamaño máximo de la caché
+            classifier_options (dict): Argumentos para construir ImageClassifier
+            collect_timings (bool): Devolver con cada análisis la duración de sus etapas
+            ocr_service (OCRService): Servicio OCR del clasificador cuando se procesa
+                en el proceso actual (workers = 0). Sus pipes no se pueden compartir
+                con otros procesos: con workers > 0 cada proceso del pool mantiene
+                su propio motor OCR persistente.
+        """
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.analysis_max_dimension = analysis_max_dimension
+        self.classifier_options = classifier_options or {}
+        self.cache_path = cache_path
+        self.cache_max_entries = cache_max_entries
+        self.collect_timings = collect_timings
+        self.ocr_service = ocr_service
+        self._cache = None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_cache(self):
+        """Crear la caché la primera vez que se necesita (la huella requiere importar el clasificador)"""
+        if self._cache is None and self.cache_path:
+            from models.classifier import ImageClassifier
+
+            fingerprint = ClassificationCache.make_fingerprint(
+                ImageClassifier.VERSION,
+                {
+                    'analysis_max_dimension': self.analysis_max_dimension, 'classifier': self.classifier_options,
+                    'payload': CACHE_PAYLOAD_VERSION
+                }
+            )
+            self._cache = ClassificationCache(self.cache_path, fingerprint, self.cache_max_entries)
+        return self._cache
+
+    def _worker_args(self):
+        return (self.analysis_max_dimension, self._get_cache(), self.classifier_options, self.collect_timings)
+
+    def _init_local(self):
+        """Inicializar en el proceso actual el estado de los procesos del pool (workers = 0)"""
+        if _classifier is None:
+            _init_worker(*self._worker_args(), self.ocr_service)
+
+    def _get_executor(self):
+        """Crear el pool la primera vez que se necesita"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=self._worker_args()
+                )
+            return self._executor
+
+    def _discard_executor(self, executor):
+        """
+        Descartar un pool roto (un proceso de trabajo murió, p. ej. por falta de
+        memoria): sus tareas pendientes fallan con BrokenProcessPool y la
+        siguiente tarea arranca un pool nuevo
+        """
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, func, *args):
+        """
+        Enviar una tarea al pool, sustituyéndolo si se rompió desde la última
+
+        Returns:
+            tuple: (pool, future) para _result
+        """
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(func, *args)
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            executor = self._get_executor()
+            return executor, executor.submit(func, *args)
+
+    def _result(self, executor, future):
+        """Resultado de una tarea o la excepción que produjo (descarta su pool si se rompió)"""
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            self._discard_executor(executor)
+            return e
+        except Exception as e:
+            return e
+
+    def analyze_batch(self, items, on_result=None):
+        """
+        Analizar un lote de imágenes en paralelo
+
+        Args:
+            items (list): Lista de tuplas (filepath, filename) o
+                (filepath, filename, content_hash) si el hash ya se conoce
+            on_result (callable): Opcional, recibe (índice, resultado) a medida
+                que los resultados están disponibles, en el orden de items
+
+        Returns:
+            list: Resultados en el mismo orden que items. Cada elemento es el dict
+                de analyze_image o la excepción producida por ese archivo.
+        """
+        tasks = None
+        if self.workers <= 0:
+            self._init_local()
+        else:
+            tasks = [self._submit(analyze_image, *item) for item in items]
+
+        results = []
+        for index, item in enumerate(items):
+            if tasks is not None:
+                result = self._result(*tasks[index])
+            else:
+                try:
+                    result = analyze_image(*item)
+                except Exception as e:
+                    result = e
+            results.append(result)
+            if on_result:
+                on_result(index, result)
+        return results
+
+    def imap(self, func, items, window=None):
+        """
+        Ejecutar func(*item) en el pool para cada elemento, con resultados en orden
+
+        Se mantienen como mucho window tareas en curso, de modo que un lote
+        grande no acumula resultados (p. ej. archivos temporales) sin consumir.
+        Las primeras tareas se envían al llamar, antes de pedir el primer resultado.
+
+        Args:
+            func (callable): Función de nivel de módulo (se ejecuta en otro proceso)
+            items (iterable): Tuplas de argumentos
+            window (int): Tareas en curso como máximo (por defecto 2 por proceso)
+
+        Returns:
+            iterator: Resultado de cada elemento, o la excepción producida, en el orden de items
+        """
+        items = iter(items)
+        if self.workers <= 0:
+            # Mismo estado que el inicializador de los procesos del pool (p. ej. para analyze_image)
+            self._init_local()
+            return self._imap_local(func, items)
+
+        pending = deque(self._submit(func, *item) for item in islice(items, window or self.workers * 2))
+        return self._imap_pending(func, items, pending)
+
+    @staticmethod
+    def _imap_local(func, items):
+        for item in items:
+            try:
+                yield func(*item)
+            except Exception as e:
+                yield e
+
+    def _imap_pending(self, func, items, pending):
+        while pending:
+            result = self._result(*pending.popleft())
+            for item in islice(items, 1):
+                pending.append(self._submit(func, *item))
+            yield result
+
+    def warm_up(self):
+        """
+        Arrancar los procesos de trabajo y cargar en ellos el clasificador
+        antes de la primera petición
+
+        Returns:
+            int: Procesos inicializados
+        """
+        if self.workers <= 0:
+            self._init_local()
+            return 1
+
+        # Una tarea por proceso, a la vez, para que el pool arranque todos sus procesos
+        tasks = [self._submit(_worker_pid, index) for index in range(self.workers)]
+        pids = [self._result(*task) for task in tasks]
+        return len({pid for pid in pids if not isinstance(pid, Exception)})
+
+    def shutdown(self):
+        """Detener los procesos de trabajo"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
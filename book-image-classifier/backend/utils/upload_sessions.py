@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+# Tamaño de los bloques leídos de cada petición y escritos en disco
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadSessionManager:
+    """
+    Cargas de archivos por fragmentos, reanudables tras un corte de conexión.
+
+    Cada carga se escribe directamente en un archivo .part dentro de upload_dir
+    a medida que llegan los fragmentos, con memoria constante, y su hash SHA-256
+    se calcula de forma incremental. Los datos de la carga se guardan junto al
+    archivo (.part.json), de modo que una carga puede reanudarse también tras
+    reiniciar el servidor: el hash se reconstruye leyendo lo ya recibido.
+    """
+
+    def __init__(self, upload_dir, max_size, ttl=24 * 3600):
+        """
+        Args:
+            upload_dir (str): Directorio de destino de los archivos
+            max_size (int): Tamaño máximo de cada archivo
+            ttl (int): Segundos sin actividad tras los que se descarta una carga
+        """
+        self.upload_dir = str(upload_dir)
+        self.max_size = max_size
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+        # Cargas que se están recuperando del disco -> lock propio de cada una
+        self._recovering = {}
+
+    def _meta_path(self, part_path):
+        return f'{part_path}.json'
+
+    def _public(self, session):
+        return {
+            'upload_id': session['upload_id'],
+            'filename': session['filename'],
+            'size': session['size'],
+            'offset': session['offset']
+        }
+
+    def create(self, filename, size):
+        """
+        Iniciar una carga
+
+        Args:
+            filename (str): Nombre del archivo (ya saneado con secure_filename)
+            size (int): Tamaño total declarado por el cliente
+
+        Returns:
+            dict: {'upload_id', 'filename', 'size', 'offset'}
+        """
+        if size < 0 or size > self.max_size:
+            raise ValueError(f'Tamaño de archivo no admitido: {size} (máximo {self.max_size})')
+
+        self.purge_expired()
+        os.makedirs(self.upload_dir, exist_ok=True)
+
+        image_id = str(uuid.uuid4())
+        part_path = os.path.join(self.upload_dir, f'{image_id}_{filename}.part')
+        session = {
+            'upload_id': image_id,
+            'image_id': image_id,
+            'filename': filename,
+            'size': size,
+            'part_path': part_path,
+            'offset': 0,
+            'digest': hashlib.sha256(),
+            'lock': threading.Lock(),
+            'touched_at': time.time()
+        }
+        open(part_path, 'wb').close()
+        with open(self._meta_path(part_path), 'w', encoding='utf-8') as f:
+            json.dump({'image_id': image_id, 'filename': filename, 'size': size}, f)
+
+        with self._lock:
+            self._sessions[image_id] = session
+        return self._public(session)
+
+    def _get(self, upload_id):
+        """Obtener una carga en memoria o recuperarla del disco (KeyError si no existe)"""
+        with self._lock:
+            session = self._sessions.get(upload_id)
+            if session is not None:
+                return session
+        try:
+            uuid.UUID(upload_id)
+        except ValueError:
+            raise KeyError(upload_id)
+
+        # Recuperar la carga lee todo lo recibido: se hace fuera del lock global,
+        # de modo que solo esperan las peticiones de esta misma carga
+        with self._lock:
+            recovery_lock = self._recovering.setdefault(upload_id, threading.Lock())
+        with recovery_lock:
+            try:
+                with self._lock:
+                    session = self._sessions.get(upload_id)
+                if session is None:
+                    session = self._load(upload_id)
+                    with self._lock:
+                        session = self._sessions.setdefault(upload_id, session)
+                return session
+            finally:
+                with self._lock:
+                    self._recovering.pop(upload_id, None)
+
+    def _load(self, upload_id):
+        """Tras un reinicio: recuperar una carga de los datos guardados junto a su archivo .part"""
+        prefix = f'{upload_id}_'
+        names = os.listdir(self.upload_dir) if os.path.isdir(self.upload_dir) else []
+        matches = [name for name in names if name.startswith(prefix) and name.endswith('.part.json')]
+        if not matches:
+            raise KeyError(upload_id)
+
+        meta_path = os.path.join(self.upload_dir, matches[0])
+        part_path = meta_path[:-len('.json')]
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+
+            # El hash se reconstruye con lo ya recibido
+            digest = hashlib.sha256()
+            offset = 0
+            with open(part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    offset += len(chunk)
+        except FileNotFoundError:
+            # Completada, cancelada o caducada mientras tanto
+            raise KeyError(upload_id)
+
+        return {
+            'upload_id': upload_id,
+            'image_id': meta['image_id'],
+            'filename': meta['filename'],
+            'size': meta['size'],
+            'part_path': part_path,
+            'offset': offset,
+            'digest': digest,
+            'lock': threading.Lock(),
+            'touched_at': time.time()
+        }
+
+    def status(self, upload_id):
+        """
+        Consultar una carga; offset indica desde dónde reanudarla
+
+        Returns:
+            dict: {'upload_id', 'filename', 'size', 'offset'}
+        """
+        return self._public(self._get(upload_id))
+
+    def append(self, upload_id, offset, stream, length=None):
+        """
+        Añadir un fragmento al final del archivo
+
+        El fragmento se copia por bloques del flujo de la petición al archivo y al
+        hash. Si la conexión se corta a mitad, lo escrito hasta entonces cuenta y
+        status() indica el offset desde el que continuar.
+
+        Args:
+            upload_id (str): Id de la carga
+            offset (int): Posición del fragmento; debe coincidir con lo ya recibido
+            stream: Flujo con los datos del fragmento (request.stream)
+            length (int): Opcional, tamaño del fragmento (Content-Length)
+
+        Returns:
+            dict: Estado de la carga tras el fragmento
+        """
+        session = self._get(upload_id)
+        # Un reintento del cliente no debe intercalarse con la petición anterior
+        if not session['lock'].acquire(blocking=False):
+            raise ValueError('La carga está recibiendo otro fragmento')
+        try:
+            if offset != session['offset']:
+                raise ValueError(f"Offset {offset} no coincide con lo recibido ({session['offset']})")
+            remaining = session['size'] - session['offset']
+            if length is not None and length > remaining:
+                raise ValueError(f'El fragmento supera el tamaño declarado ({session["size"]})')
+
+            with open(session['part_path'], 'ab') as f:
+                while True:
+                    chunk = stream.read(min(CHUNK_SIZE, remaining + 1))
+                    if not chunk:
+                        break
+                    if len(chunk) > remaining:
+                        raise ValueError(f'El fragmento supera el tamaño declarado ({session["size"]})')
+                    f.write(chunk)
+                    session['digest'].update(chunk)
+                    session['offset'] += len(chunk)
+                    remaining -= len(chunk)
+            session['touched_at'] = time.time()
+            return self._public(session)
+        finally:
+            session['lock'].release()
+
+    def finalize(self, upload_id, target_dir=None):
+        """
+        Completar una carga: el archivo .part pasa a su nombre definitivo
+
+        Args:
+            upload_id (str): Id de la carga
+            target_dir (str): Opcional, directorio de destino (p. ej. la carpeta
+                de un proyecto); por defecto upload_dir
+
+        Returns:
+            tuple: (image_id, filename, filepath, content_hash)
+        """
+        session = self._get(upload_id)
+        if not session['lock'].acquire(blocking=False):
+            raise ValueError('La carga está recibiendo otro fragmento')
+        try:
+            if session['offset'] != session['size']:
+                raise ValueError(f"Carga incompleta: {session['offset']} de {session['size']} bytes")
+            filepath = session['part_path'][:-len('.part')]
+            if target_dir is not None:
+                os.makedirs(target_dir, exist_ok=True)
+                filepath = os.path.join(str(target_dir), os.path.basename(filepath))
+            os.replace(session['part_path'], filepath)
+            self._discard(session)
+            return session['image_id'], session['filename'], filepath, session['digest'].hexdigest()
+        finally:
+            session['lock'].release()
+
+    def abort(self, upload_id):
+        """Cancelar una carga y eliminar lo recibido"""
+        session = self._get(upload_id)
+        self._discard(session)
+        try:
+            os.remove(session['part_path'])
+        except FileNotFoundError:
+            pass
+
+    def _discard(self, session):
+        with self._lock:
+            self._sessions.pop(session['upload_id'], None)
+        try:
+            os.remove(self._meta_path(session['part_path']))
+        except FileNotFoundError:
+            pass
+
+    def purge_expired(self):
+        """Eliminar las cargas sin actividad durante más de ttl segundos"""
+        if not os.path.isdir(self.upload_dir):
+            return
+        limit = time.time() - self.ttl
+        with self._lock:
+            active = {session['part_path'] for session in self._sessions.values() if session['touched_at'] >= limit}
+        for entry in os.scandir(self.upload_dir):
+            if not entry.name.endswith('.part.json'):
+                continue
+            part_path = entry.path[:-len('.json')]
+            if part_path in active:
+                continue
+            try:
+                touched_at = max(entry.stat().st_mtime, os.path.getmtime(part_path))
+            except FileNotFoundError:
+                touched_at = entry.stat().st_mtime
+            if touched_at >= limit:
+                continue
+            with self._lock:
+                self._sessions = {
+                    key: session for key, session in self._sessions.items() if session['part_path'] != part_path
+                }
+            for path in (part_path, entry.path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
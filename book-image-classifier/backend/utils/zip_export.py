@@ -0,0 +1,226 @@
+import json
+import os
+import time
+import zipfile
+from collections import namedtuple
+
+# Tamaño de los bloques leídos de cada imagen y entregados al cliente
+CHUNK_SIZE = 1024 * 1024
+
+# Elemento del archivo: una imagen en disco (path) o datos en memoria (data).
+# convert indica la conversión previa ((formato, ancho) o None) y temporary que
+# path es un archivo convertido que se elimina tras escribirlo.
+ExportEntry = namedtuple('ExportEntry', ['arcname', 'path', 'data', 'convert', 'temporary'], defaults=(None, False))
+
+# Formatos de imagen de la exportación: original (sin conversión), jpeg (los
+# que no son JPEG se convierten) o web (JPEG redimensionado con resize_for_web)
+IMAGE_FORMATS = ('original', 'jpeg', 'web')
+JPEG_EXTENSIONS = {'.jpg', '.jpeg'}
+
+
+def _conversion(filepath, image_format, web_width):
+    if image_format == 'web':
+        return ('web', web_width)
+    if image_format == 'jpeg' and os.path.splitext(filepath)[1].lower() not in JPEG_EXTENSIONS:
+        return ('jpeg', None)
+    return None
+
+
+def plan_export(metadata_list, records_by_filename, config, web_width=1200):
+    """
+    Resolver el contenido del ZIP a partir de la petición de exportación
+
+    Args:
+        metadata_list (list): Metadatos enviados por el frontend, uno por imagen
+        records_by_filename (dict): {original_filename: registro} (ImageStore.get_by_filenames)
+        config (dict): Opciones de exportación (includeMetadata, includeImages,
+            renameFiles, imageFormat)
+        web_width (int): Ancho de las imágenes con imageFormat 'web'
+
+    Returns:
+        tuple: (lista de ExportEntry, lista de rutas que no existen en disco)
+    """
+    image_format = config.get('imageFormat', 'original')
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Formato de imagen no soportado: {image_format}")
+
+    entries = []
+    missing = []
+    # Nombre final de cada imagen convertida (cambia la extensión a .jpg)
+    converted_names = {}
+
+    # 1. Imágenes (renombradas si es necesario)
+    if config.get('includeImages', True):
+        for metadata_item in metadata_list:
+            image_record = records_by_filename.get(metadata_item['original_filename'])
+            if not image_record:
+                continue
+
+            filepath = image_record['filepath']
+            if not os.path.exists(filepath):
+                missing.append(filepath)
+                continue
+
+            # Determinar el nombre del archivo dentro del ZIP
+            arcname = metadata_item.get('new_filename') if config.get('renameFiles', True) else None
+            arcname = arcname or image_record['original_filename']
+
+            convert = _conversion(filepath, image_format, web_width)
+            if convert:
+                arcname = f'{os.path.splitext(arcname)[0]}.jpg'
+                converted_names[metadata_item['original_filename']] = arcname
+            entries.append(ExportEntry(arcname, filepath, None, convert))
+
+    # 2. Archivo de metadatos (el primero del ZIP)
+    if config.get('includeMetadata', True):
+        # Usamos un diccionario para asegurar que cada imagen solo aparezca una vez
+        final_metadata = {item['original_filename']: item for item in metadata_list}
+        for original_filename, arcname in converted_names.items():
+            final_metadata[original_filename] = {**final_metadata[original_filename], 'new_filename': arcname}
+        data = json.dumps(list(final_metadata.values()), indent=4).encode('utf-8')
+        entries.insert(0, ExportEntry('metadata.json', None, data))
+
+    return entries, missing
+
+
+def convert_for_export(source_path, output_path, convert):
+    """
+    Convertir una imagen para la exportación (se ejecuta en el pool de procesos)
+
+    Returns:
+        str: Ruta del archivo convertido
+    """
+    # Importación diferida: ImageProcessor carga cv2
+    from utils.image_processing import ImageProcessor
+
+    image_format, width = convert
+    processor = ImageProcessor()
+    if image_format == 'web':
+        processor.resize_for_web(source_path, output_path, width)
+    else:
+        processor.convert_to_jpeg(source_path, output_path)
+    return output_path
+
+
+def convert_entries(entries, pool, tmp_dir, on_error=None):
+    """
+    Resolver las conversiones de los elementos en el pool de procesos
+
+    Las conversiones se ejecutan en paralelo y los elementos se entregan en el
+    orden original a medida que sus conversiones terminan. Si una conversión
+    falla, el elemento se omite y se notifica con on_error(elemento, excepción).
+
+    Args:
+        entries (list): Elementos de plan_export
+        pool (ProcessingPool): Pool donde ejecutar las conversiones
+        tmp_dir (str): Directorio de los archivos convertidos
+
+    Yields:
+        ExportEntry: Elementos listos para escribir
+    """
+    jobs = [
+        (entry.path, os.path.join(tmp_dir, f'{index:06d}.jpg'), entry.convert)
+        for index, entry in enumerate(entries) if entry.convert
+    ]
+    results = pool.imap(convert_for_export, jobs) if jobs else iter(())
+
+    for entry in entries:
+        if not entry.convert:
+            yield entry
+            continue
+
+        result = next(results)
+        if isinstance(result, Exception):
+            if on_error:
+                on_error(entry, result)
+            continue
+        yield ExportEntry(entry.arcname, result, None, None, True)
+
+
+class _StreamBuffer:
+    """Destino no posicionable de zipfile que acumula lo escrito hasta entregarlo"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _write_entries(zipf, entries):
+    """
+    Escribir los elementos en el ZIP, cediendo el control tras cada bloque
+    (None) y al terminar cada elemento (el propio elemento)
+
+    Las imágenes (JPEG, PNG, TIFF) se guardan sin recomprimir (ZIP_STORED);
+    solo los metadatos se comprimen. ZIP64 se activa por elemento según su
+    tamaño y para el directorio central al superar los 4 GB.
+    """
+    for entry in entries:
+        if entry.path is None:
+            info = zipfile.ZipInfo(entry.arcname, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            zipf.writestr(info, entry.data)
+            yield entry
+            continue
+
+        # from_file toma tamaño y fecha del archivo; el tamaño decide si hace falta ZIP64
+        info = zipfile.ZipInfo.from_file(entry.path, entry.arcname)
+        info.compress_type = zipfile.ZIP_STORED
+        with open(entry.path, 'rb') as src, zipf.open(info, 'w') as dst:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                dst.write(chunk)
+                yield None
+        if entry.temporary:
+            os.remove(entry.path)
+        yield entry
+
+
+def write_zip(path, entries, on_entry=None):
+    """
+    Escribir el ZIP completo en un archivo
+
+    Args:
+        path (str): Ruta del ZIP
+        entries (iterable): Elementos a escribir (ExportEntry)
+        on_entry (callable): Opcional, recibe (elemento, bytes escritos hasta ahora)
+            tras escribir cada elemento
+    """
+    with zipfile.ZipFile(path, 'w', allowZip64=True) as zipf:
+        for entry in _write_entries(zipf, entries):
+            if entry is not None and on_entry:
+                on_entry(entry, zipf.fp.tell())
+
+
+def iter_zip(entries):
+    """
+    Generar el ZIP por bloques para enviarlo al cliente a medida que se construye
+
+    Como el destino no es posicionable, zipfile escribe tamaños y CRC en
+    descriptores de datos tras cada elemento; nada se guarda en disco.
+
+    Yields:
+        bytes: Fragmentos consecutivos del archivo ZIP
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', allowZip64=True) as zipf:
+        for _ in _write_entries(zipf, entries):
+            data = buffer.drain()
+            if data:
+                yield data
+    # Directorio central
+    yield buffer.drain()
@@ -0,0 +1,13 @@
+"""
+Punto de entrada WSGI para servidores de producción.
+
+Uso (desde backend/, con gunicorn.conf.py: un proceso con varios hilos):
+    gunicorn wsgi:app
+"""
+from app import app, start_background_tasks
+
+__all__ = ['app']
+
+# Lanza la precarga y la vigilancia de la carpeta en el proceso que sirve. Si otro
+# proceso (p. ej. otra instancia) ya explora la carpeta, esta espera su bloqueo.
+start_background_tasks()
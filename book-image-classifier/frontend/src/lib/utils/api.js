@@ -1,6 +1,9 @@
 // Configuración base de la API
 const API_BASE_URL = 'http://localhost:5001'; // Base URL for the Flask backend
 
+// Project used by the unscoped routes (/api/upload, /api/images, /api/export)
+export const DEFAULT_PROJECT = 'default';
+
 // --- API Wrapper Object ---
 // Provides clean methods like api.get(), api.post(), etc.
 async function fetchWithTimeout(resource, options = {}, timeout = 60000) {
@@ -100,6 +103,172 @@ export function uploadImages(formData, onProgress) {
     });
 }
 
+/**
+ * Sends one file through the resumable chunked upload protocol.
+ * A failed chunk is retried from the offset the backend reports, so a dropped
+ * connection only repeats the bytes that did not arrive.
+ * @param {File} file - The file to upload.
+ * @param {(bytesSent: number) => void} onProgress - Callback with the bytes stored so far.
+ * @param {number} retries - Attempts per chunk before giving up.
+ * @returns {Promise<string>} The upload ID, ready to be finalized.
+ */
+export async function uploadFileChunked(file, onProgress, retries = 5) {
+    const session = await api.post('/api/uploads', { filename: file.name, size: file.size });
+    const chunkSize = session.chunk_size;
+    let offset = session.offset;
+    let failures = 0;
+
+    while (offset < file.size) {
+        try {
+            const response = await fetchWithTimeout(
+                `${API_BASE_URL}/api/uploads/${session.upload_id}?offset=${offset}`,
+                {
+                    method: 'PUT',
+                    headers: { 'Content-Type': 'application/octet-stream' },
+                    body: file.slice(offset, offset + chunkSize)
+                },
+                120000
+            );
+            const status = await response.json();
+            // On 409 the backend already has a different offset: continue from there.
+            // The same offset means a previous request is still writing; back off and retry.
+            if (!response.ok && (response.status !== 409 || status.offset === offset)) {
+                throw new Error(status.error || 'Chunk upload failed');
+            }
+            offset = status.offset;
+            failures = 0;
+        } catch (error) {
+            if (++failures > retries) throw error;
+            await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+            offset = (await api.get(`/api/uploads/${session.upload_id}`)).offset;
+        }
+        if (onProgress) onProgress(offset);
+    }
+    return session.upload_id;
+}
+
+/**
+ * Uploads several files in resumable chunks and starts their classification as one batch.
+ * @param {File[]} files - The files to upload.
+ * @param {(progress: number) => void} onProgress - Callback with the overall percentage.
+ * @returns {Promise<any>} The finalize response with the classification job ID.
+ */
+export async function uploadImagesChunked(files, onProgress) {
+    const total = files.reduce((sum, file) => sum + file.size, 0) || 1;
+    let done = 0;
+    const uploadIds = [];
+    for (const file of files) {
+        uploadIds.push(
+            await uploadFileChunked(file, (sent) => {
+                if (onProgress) onProgress(Math.round(((done + sent) / total) * 100));
+            })
+        );
+        done += file.size;
+    }
+    return api.post('/api/uploads/finalize', { upload_ids: uploadIds });
+}
+
+/**
+ * Polls a background job until it finishes.
+ * @param {string} jobId - The ID returned by the backend when the job was created.
+ * @param {(job: any) => void} onProgress - Callback invoked with every status snapshot.
+ * @param {number} interval - Polling interval in milliseconds.
+ * @returns {Promise<any>} The final job status.
+ */
+export async function waitForJob(jobId, onProgress, interval = 1000) {
+    while (true) {
+        const job = await api.get(`/api/jobs/${jobId}`);
+        if (onProgress) onProgress(job);
+        if (job.status === 'completed') return job;
+        if (job.status === 'failed') throw new Error(job.error || 'Job failed');
+        await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+}
+
+/**
+ * Loads every image record page by page using the backend cursor.
+ * @param {(images: any[]) => void} onPage - Callback invoked with all records loaded so far.
+ * @param {number} pageSize - Records per request.
+ * @returns {Promise<{images: any[], version: number}>} All image records, sorted by
+ *   original filename, and the collection version they are current as of.
+ */
+export async function fetchAllImages(onPage, pageSize = 1000) {
+    let loaded = [];
+    let cursor = null;
+    let version = null;
+    do {
+        const query = new URLSearchParams({ limit: String(pageSize) });
+        if (cursor) query.set('cursor', cursor);
+        const response = await api.get(`/api/images?${query}`);
+        // The first page's version is the safe one to sync from later
+        if (version === null) version = response.version;
+        loaded = loaded.concat(response.images || []);
+        if (onPage) onPage(loaded);
+        cursor = response.next_cursor;
+    } while (cursor);
+    return { images: loaded, version };
+}
+
+/**
+ * Applies the changes made to the collection since a known version.
+ * @param {any[]} current - Image records currently loaded.
+ * @param {number} since - Collection version of `current`.
+ * @returns {Promise<{images: any[], version: number}>} Updated records, sorted by
+ *   original filename, and the new collection version.
+ */
+export async function syncImages(current, since) {
+    const { images: changed, deleted, version } = await api.get(`/api/images?since=${since}`);
+    return { images: mergeImages(current, changed, deleted), version };
+}
+
+/**
+ * Merges changed records into the loaded collection, keeping the backend order.
+ * Partial records (e.g. numbering fields only) are applied over the loaded ones;
+ * partial records for images that are not loaded are ignored.
+ * @param {any[]} current - Image records currently loaded.
+ * @param {any[]} changed - New, updated or partial records.
+ * @param {string[]} deleted - IDs of removed records.
+ * @returns {any[]} The merged records, sorted by original filename.
+ */
+export function mergeImages(current, changed, deleted = []) {
+    if (changed.length === 0 && deleted.length === 0) return current;
+
+    const byId = new Map(current.map((img) => [img.id, img]));
+    for (const id of deleted) byId.delete(id);
+    for (const img of changed) {
+        const existing = byId.get(img.id);
+        if (existing || img.original_filename !== undefined) byId.set(img.id, { ...existing, ...img });
+    }
+
+    return [...byId.values()].sort((a, b) =>
+        a.original_filename === b.original_filename
+            ? (a.id < b.id ? -1 : a.id > b.id ? 1 : 0)
+            : (a.original_filename < b.original_filename ? -1 : 1)
+    );
+}
+
+/**
+ * Subscribes to the backend progress events (Server-Sent Events) of one project.
+ * Event types: classified, failed, numbered, updated, deleted, job and resync.
+ * The browser reconnects on its own and the backend replays missed events;
+ * `resync` means events were lost and the collection must be re-synced.
+ * @param {Record<string, (data: any) => void>} handlers - Callback per event type.
+ * @param {string} [projectId] - Project whose events are received.
+ * @returns {() => void} Function that closes the subscription.
+ */
+export function subscribeEvents(handlers, projectId = DEFAULT_PROJECT) {
+    const source = new EventSource(`${API_BASE_URL}/api/events?project=${encodeURIComponent(projectId)}`);
+    for (const [type, handler] of Object.entries(handlers)) {
+        source.addEventListener(type, (event) => {
+            const data = JSON.parse(event.data);
+            // Project events carry their project_id; general ones (job, resync) do not
+            if (data.project_id !== undefined && data.project_id !== projectId) return;
+            handler(data);
+        });
+    }
+    return () => source.close();
+}
+
 /**
  * Gets the direct URL for an image file from the backend.
  * @param {string|number} imageId - The ID of the image.
@@ -109,6 +278,26 @@ export function getImageUrl(imageId) {
     return `${API_BASE_URL}/api/images/${imageId}/file`;
 }
 
+/**
+ * Gets the URL of a cached thumbnail for an image (gallery use).
+ * @param {string|number} imageId - The ID of the image.
+ * @returns {string}
+ */
+export function getThumbnailUrl(imageId) {
+    return `${API_BASE_URL}/api/images/${imageId}/thumbnail`;
+}
+
+/**
+ * Gets the URL of a web-sized preview for an image.
+ * @param {string|number} imageId - The ID of the image.
+ * @param {number} [width] - Desired width; the backend rounds it up to a cached size.
+ * @returns {string}
+ */
+export function getPreviewUrl(imageId, width) {
+    const query = width ? `?w=${width}` : '';
+    return `${API_BASE_URL}/api/images/${imageId}/preview${query}`;
+}
+
 
 // --- Formatter Utilities ---
 export const formatters = {